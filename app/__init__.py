@@ -1,15 +1,29 @@
 from flask import Flask
 from flask_login import LoginManager
 from dotenv import load_dotenv
+from contextlib import contextmanager
+from jinja2 import FileSystemBytecodeCache
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
 import logging
+import tempfile
+import time
+import datetime as dt
 
-from .db import get_db
-from .models.user import User
+from .db import get_db, ensure_indexes, prewarm_pool
+from .models.user import User, configure_cache as configure_user_cache
+from .models.application import format_date
+from . import passwords, ratelimit, fragments, sessions, metrics, jsonapi
 
 login_manager = LoginManager()
 login_manager.login_view = "auth.login"
 
+logger = logging.getLogger(__name__)
+
+# pid that already ran the once-per-process startup work (.env, Mongo)
+_dotenv_pid = None
+_mongo_ready_pid = None
+
 
 @login_manager.user_loader
 def load_user(user_id: str):
@@ -17,30 +31,187 @@ def load_user(user_id: str):
     return User.get(db, user_id)
 
 
+class _StartupTimer:
+    """Collects how long each phase of create_app() took."""
+
+    def __init__(self):
+        self.phases = {}
+        self._t0 = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - t0
+
+    def report(self) -> str:
+        total = time.perf_counter() - self._t0
+        parts = ", ".join(f"{k} {v * 1000:.1f}ms" for k, v in self.phases.items())
+        return f"Startup {total * 1000:.1f}ms: {parts}"
+
+
+def _mongo_startup(production: bool):
+    """Connect and create indexes once per worker process (not per create_app call)."""
+    global _mongo_ready_pid
+    if _mongo_ready_pid == os.getpid():
+        return
+    _mongo_ready_pid = os.getpid()
+    default = "1" if production else "0"
+    # opt in outside production so dev startup doesn't block on Mongo
+    try:
+        if os.getenv("MONGO_AUTO_INDEX", default) == "1":
+            ensure_indexes(get_db())
+        if os.getenv("MONGO_PREWARM", default) == "1":
+            prewarm_pool()
+    except Exception:
+        logger.exception("Mongo startup tasks failed")
+
+
+def _precompile_templates(app):
+    """Compile every template now; with a bytecode cache later workers just load it."""
+    env = app.jinja_env
+    for name in env.list_templates(extensions=("html",)):
+        try:
+            env.get_template(name)
+        except Exception:
+            logger.warning("Could not precompile template %s", name, exc_info=True)
+
+
 def create_app():
-    load_dotenv()
+    global _dotenv_pid
+    timer = _StartupTimer()
+
+    with timer.phase("config"):
+        if _dotenv_pid != os.getpid():
+            load_dotenv()
+            _dotenv_pid = os.getpid()
+        # FLASK_ENV=production turns on Mongo/template warm-up and drops the
+        # debug dumps; unset or anything else keeps the development behaviour
+        production = os.getenv("FLASK_ENV", "development") == "production"
+        level = (os.getenv("LOG_LEVEL") or "INFO").upper()
+        known = isinstance(logging.getLevelName(level), int)
+        logging.basicConfig(level=level if known else "INFO")
+        if not known:   # a typo shouldn't stop the app from starting
+            logging.getLogger(__name__).warning("Unknown LOG_LEVEL %r, using INFO", level)
 
     app = Flask(__name__, template_folder="templates", static_folder="static")
+    app.config["PRODUCTION"] = production
+
+    # Compiled templates persist across worker starts in JINJA_CACHE_DIR
+    # (production default: a directory under the system temp dir). Must be
+    # set before anything touches app.jinja_env.
+    jinja_cache = os.getenv("JINJA_CACHE_DIR") or (
+        os.path.join(tempfile.gettempdir(), "jobtrackr-jinja") if production else "")
+    if jinja_cache:
+        os.makedirs(jinja_cache, exist_ok=True)
+        app.jinja_options = {**app.jinja_options,
+                             "bytecode_cache": FileSystemBytecodeCache(jinja_cache)}
     app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "dev-secret-key")
     app.config["SESSION_COOKIE_NAME"] = os.getenv(
         "SESSION_COOKIE_NAME", "jobtrackr_session")
 
-    from .auth import auth_bp
-    from .dashboard import dashboard_bp
-    from .profile import bp as profile_bp
-    from .stats import stats_bp
-    app.register_blueprint(auth_bp)
-    app.register_blueprint(dashboard_bp)
-    app.register_blueprint(profile_bp)
-    app.register_blueprint(stats_bp)
+    # Behind N reverse proxies, trust the last N X-Forwarded-For/-Proto/-Host
+    # hops so remote_addr (the per-IP rate-limit key) is the real client.
+    trusted_proxies = int(os.getenv("TRUSTED_PROXIES") or 0)
+    if trusted_proxies > 0:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=trusted_proxies,
+                                x_proto=trusted_proxies, x_host=trusted_proxies)
+
+    with timer.phase("services"):
+        # SESSION_BACKEND=memory|mongo keeps session data server-side with only
+        # an id in the cookie; "cookie" is Flask's signed-cookie default.
+        session_backend = os.getenv("SESSION_BACKEND", "cookie")
+        app.config["SERVER_SESSIONS"] = session_backend != "cookie"
+        if app.config["SERVER_SESSIONS"]:
+            app.config["PERMANENT_SESSION_LIFETIME"] = dt.timedelta(
+                days=float(os.getenv("SESSION_LIFETIME_DAYS") or 30))
+            app.extensions["session_store"] = sessions.init_app(
+                app, session_backend,
+                maxsize=int(os.getenv("SESSION_CACHE_SIZE") or 10000),
+                touch_interval=dt.timedelta(
+                    seconds=float(os.getenv("SESSION_TOUCH_INTERVAL") or 3600)),
+            )
+
+        # Process-wide user cache used by load_user; USER_CACHE_TTL=0 disables it.
+        configure_user_cache(
+            maxsize=int(os.getenv("USER_CACHE_SIZE", "1024")),
+            ttl=float(os.getenv("USER_CACHE_TTL", "60")),
+        )
+
+        # Password hashing: werkzeug method string, and a process pool so the KDF
+        # doesn't hold the GIL on request threads (PASSWORD_HASH_WORKERS=0: inline).
+        passwords.configure(
+            method=os.getenv("PASSWORD_HASH_METHOD", "scrypt"),
+            workers=int(os.getenv("PASSWORD_HASH_WORKERS") or 0),
+            max_pending=int(os.getenv("PASSWORD_HASH_MAX_PENDING") or 0),
+        )
+
+        # Login/signup throttling; "mongo" shares counters across workers.
+        ratelimit.configure(
+            backend=os.getenv("RATE_LIMIT_BACKEND", "memory"),
+            login_ip=os.getenv("LOGIN_RATE_LIMIT_IP", ""),
+            login_email=os.getenv("LOGIN_RATE_LIMIT_EMAIL", ""),
+            signup_ip=os.getenv("SIGNUP_RATE_LIMIT_IP", ""),
+        )
+
+    with timer.phase("blueprints"):
+        from .auth import auth_bp
+        from .dashboard import dashboard_bp
+        from .profile import bp as profile_bp
+        from .stats import stats_bp
+        app.register_blueprint(auth_bp)
+        app.register_blueprint(dashboard_bp)
+        app.register_blueprint(profile_bp)
+        app.register_blueprint(stats_bp)
+
+    with timer.phase("extensions"):
+        # Server-Timing header, slow-request log and /metrics (per worker process).
+        metrics.init_app(
+            app,
+            slow_ms=float(os.getenv("SLOW_REQUEST_MS") or 500),
+            server_timing=os.getenv("SERVER_TIMING", "1") == "1",
+            token=os.getenv("METRICS_TOKEN", ""),
+            require_token=production,
+        )
+
+        # orjson-backed JSON (ObjectId/datetime aware) and JSON errors for /api/v1
+        jsonapi.init_app(app)
+
+        app.jinja_env.filters["datefmt"] = format_date
+
+        # {% cache %} blocks for per-user page sections; FRAGMENT_CACHE_MB=0 disables.
+        fragments.configure(
+            max_bytes=int(float(os.getenv("FRAGMENT_CACHE_MB") or 32) * (1 << 20)),
+            spill_dir=os.getenv("FRAGMENT_CACHE_DIR") or None,
+            disk_max_bytes=int(float(os.getenv("FRAGMENT_CACHE_DISK_MB") or 256) * (1 << 20)),
+        )
+        app.jinja_env.add_extension(fragments.FragmentCacheExtension)
+
+        # Async Motor path for the dashboard (needs the motor/asgiref extras).
+        if os.getenv("ASYNC_MONGO", "0") == "1":
+            from .dashboard.async_views import index_async
+            app.view_functions["dashboard.index"] = index_async
+
+        from .cli import register_cli
+        register_cli(app)
+
+        # Attach login manager to app
+        login_manager.init_app(app)
 
-    logging.basicConfig(level=logging.DEBUG)
+    with timer.phase("mongo"):
+        _mongo_startup(production)
 
-    # Attach login manager to app
-    login_manager.init_app(app)
-    print("== URL MAP ==")
-    print(app.url_map)
+    if production:
+        with timer.phase("templates"):
+            _precompile_templates(app)
+    else:
+        print("== URL MAP ==")
+        print(app.url_map)
 
-    print("Jinja search paths:", app.jinja_loader.searchpath)
+        print("Jinja search paths:", app.jinja_loader.searchpath)
 
+    app.extensions["startup_seconds"] = timer.phases
+    logger.info(timer.report())
     return app
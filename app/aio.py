@@ -0,0 +1,56 @@
+"""
+Async MongoDB access for the ASYNC_MONGO serving mode.
+
+Flask runs each async view in a short-lived event loop, and a Motor client
+is tied to the loop it was first used on. So every worker process keeps one
+long-lived loop on a background thread that owns the Motor client; views
+hand coroutines to it with run() and await the result.
+"""
+import asyncio
+import os
+import threading
+
+from .db import client_options
+
+_loop = None
+_loop_pid = None
+_client = None
+_lock = threading.Lock()
+
+
+def _start_loop():
+    global _loop, _loop_pid, _client
+    loop = asyncio.new_event_loop()
+    t = threading.Thread(target=loop.run_forever, name="mongo-async-loop", daemon=True)
+    t.start()
+    _loop, _loop_pid, _client = loop, os.getpid(), None
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """This process's background loop (a forked child starts its own)."""
+    if _loop is None or _loop_pid != os.getpid():
+        with _lock:
+            if _loop is None or _loop_pid != os.getpid():
+                _start_loop()
+    return _loop
+
+
+async def _make_client():
+    from motor.motor_asyncio import AsyncIOMotorClient
+    return AsyncIOMotorClient(os.getenv("MONGO_URI"), **client_options())
+
+
+def get_async_db():
+    """Motor database handle bound to the background loop."""
+    global _client
+    loop = get_loop()
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = asyncio.run_coroutine_threadsafe(_make_client(), loop).result()
+    return _client[os.getenv("DB_NAME", "job_trackr")]
+
+
+async def run(coro):
+    """Run coro on the background loop and await its result from any loop."""
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, get_loop()))
@@ -0,0 +1,10 @@
+"""
+ASGI entry point, e.g. `uvicorn app.asgi:asgi_app --workers 4`.
+
+Set ASYNC_MONGO=1 to serve the dashboard through the async Motor path.
+"""
+from asgiref.wsgi import WsgiToAsgi
+
+from app import create_app
+
+asgi_app = WsgiToAsgi(create_app())
@@ -1,9 +1,13 @@
 from urllib.parse import urlparse, urljoin
-from flask import render_template, request, redirect, url_for, flash
+from flask import render_template, request, redirect, url_for, flash, session, current_app
 from flask_login import login_user, logout_user, login_required
 from . import auth_bp
 from ..db import get_db
 from ..models.user import User
+from ..passwords import HashingBusy
+from .. import ratelimit
+
+BUSY_RETRY_AFTER = "2"
 
 def _is_safe_redirect(target):
     # Prevent open-redirects
@@ -11,6 +15,24 @@ def _is_safe_redirect(target):
     redirect_url = urlparse(urljoin(request.host_url, target))
     return redirect_url.scheme in ("http", "https") and host_url.netloc == redirect_url.netloc
 
+def _busy(template: str):
+    # Hash pool is saturated: tell the client to back off instead of queueing.
+    flash("We're handling a lot of sign-ins right now. Please try again in a moment.", "error")
+    return (render_template(template, next=request.form.get("next")), 503,
+            {"Retry-After": BUSY_RETRY_AFTER})
+
+def _throttled(template: str, retry_after: int):
+    flash(f"Too many attempts. Please try again in {retry_after} seconds.", "error")
+    return (render_template(template, next=request.form.get("next")), 429,
+            {"Retry-After": str(retry_after)})
+
+def _login(user):
+    # Server-side sessions are permanent and revocable, so they stand in for
+    # the remember-me cookie (which could not be revoked).
+    server_side = current_app.config["SERVER_SESSIONS"]
+    session.permanent = server_side
+    login_user(user, remember=not server_side)
+
 def _redirect_next_or(endpoint_fallback: str, **values):
     nxt = request.args.get("next") or request.form.get("next")
     if nxt and _is_safe_redirect(nxt):
@@ -25,14 +47,26 @@ def login():
 def login_post():
     email = (request.form.get("email") or "")
     password = (request.form.get("password") or "")
+    # Throttle before any DB lookup or password hashing.
+    retry_after = ratelimit.limiter.hit([
+        (ratelimit.LOGIN_PER_IP, request.remote_addr),
+        (ratelimit.LOGIN_PER_EMAIL, email.strip().lower()),
+    ])
+    if retry_after:
+        return _throttled("login.html", retry_after)
     db = get_db()
 
     user = User.get_by_email(db, email)
-    if not user or not user.check_password(password):
+    try:
+        ok = user is not None and user.check_password(password)
+    except HashingBusy:
+        return _busy("login.html")
+    if not ok:
         flash("Invalid email or password", "error")
         return redirect(url_for("auth.login", next=request.form.get("next")))
 
-    login_user(user, remember=True)
+    user.rehash_if_needed(db, password)
+    _login(user)
     return _redirect_next_or("profile.index")
 
 @auth_bp.get("/signup")
@@ -46,15 +80,21 @@ def signup_post():
     if len(password) < 6:
         flash("Password must be at least 6 characters.", "error")
         return redirect(url_for("auth.signup", next=request.form.get("next")))
+    retry_after = ratelimit.limiter.hit([(ratelimit.SIGNUP_PER_IP, request.remote_addr)])
+    if retry_after:
+        return _throttled("signup.html", retry_after)
 
     db = get_db()
-    user, err = User.create(db, email, password)
+    try:
+        user, err = User.create(db, email, password)
+    except HashingBusy:
+        return _busy("signup.html")
     if err:
         flash(err, "error")
         return redirect(url_for("auth.signup", next=request.form.get("next")))
     
     flash("Your Account has been successfully created", "info")
-    login_user(user, remember=True)
+    _login(user)
     return _redirect_next_or("auth.login")
 
 @auth_bp.post("/logout")
@@ -0,0 +1,173 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Small thread-safe LRU cache whose entries also expire after `ttl`
+    seconds. A ttl of 0 (or less) disables it: every get() misses.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def items(self):
+        """Snapshot of the unexpired (key, value) pairs."""
+        now = time.monotonic()
+        with self._lock:
+            return [(k, v) for k, (exp, v) in self._data.items() if exp >= now]
+
+    def __len__(self):
+        return len(self._data)
+
+
+class FragmentCache:
+    """
+    LRU of rendered strings capped at `max_bytes` of UTF-8. With `spill_dir`
+    set, entries evicted from memory are written there (up to
+    `disk_max_bytes`) and read back on a memory miss. Keeps hit/miss
+    counters and the render time hits saved.
+    """
+
+    def __init__(self, max_bytes: int = 32 << 20, spill_dir: str = None,
+                 disk_max_bytes: int = 256 << 20):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._data = OrderedDict()      # key -> (text, size, render_seconds)
+        self._disk = OrderedDict()      # key -> size, spilled by this process
+        self._bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0,
+                         "render_seconds": 0.0, "saved_seconds": 0.0}
+
+    def _path(self, key):
+        return os.path.join(self.spill_dir, hashlib.sha1(key.encode()).hexdigest())
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                self._data.move_to_end(key)
+                self.counters["hits"] += 1
+                self.counters["saved_seconds"] += item[2]
+                return item[0]
+        if self.spill_dir:
+            try:
+                with open(self._path(key), encoding="utf-8") as fh:
+                    text = fh.read()
+            except OSError:
+                pass
+            else:
+                with self._lock:
+                    self.counters["disk_hits"] += 1
+                self._store(key, text, 0.0)
+                return text
+        with self._lock:
+            self.counters["misses"] += 1
+        return None
+
+    def set(self, key, text: str, render_seconds: float = 0.0):
+        with self._lock:
+            self.counters["render_seconds"] += render_seconds
+        self._store(key, text, render_seconds)
+
+    def _store(self, key, text, render_seconds):
+        size = len(text.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        evicted = []
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old:
+                self._bytes -= old[1]
+            self._data[key] = (text, size, render_seconds)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                k, (t, s, _) = self._data.popitem(last=False)
+                self._bytes -= s
+                self.counters["evictions"] += 1
+                evicted.append((k, t, s))
+        if self.spill_dir:
+            for k, t, s in evicted:
+                self._spill(k, t, s)
+
+    def _spill(self, key, text, size):
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            tmp = self._path(key) + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                fh.write(text)
+            os.replace(tmp, self._path(key))
+        except OSError:
+            return
+        with self._lock:
+            self._disk_bytes += size - self._disk.pop(key, 0)
+            self._disk[key] = size
+            doomed = []
+            while self._disk_bytes > self.disk_max_bytes and self._disk:
+                k, s = self._disk.popitem(last=False)
+                self._disk_bytes -= s
+                doomed.append(k)
+        for k in doomed:
+            self._unlink(k)
+
+    def _unlink(self, key):
+        try:
+            os.unlink(self._path(key))
+        except OSError:
+            pass
+
+    def drop_prefix(self, prefix: str):
+        """Forget every entry whose key starts with prefix (memory and disk)."""
+        with self._lock:
+            for k in [k for k in self._data if k.startswith(prefix)]:
+                self._bytes -= self._data.pop(k)[1]
+            doomed = [k for k in self._disk if k.startswith(prefix)]
+            for k in doomed:
+                self._disk_bytes -= self._disk.pop(k)
+        for k in doomed:
+            self._unlink(k)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counters, "entries": len(self._data), "bytes": self._bytes,
+                    "disk_entries": len(self._disk), "disk_bytes": self._disk_bytes}
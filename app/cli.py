@@ -0,0 +1,205 @@
+import click
+from bson import ObjectId
+from flask import current_app
+from flask.cli import AppGroup
+
+from .db import get_db, ensure_indexes, migrate_legacy_types, migrate_user_ids, find_collscans
+from .models.user import User
+from .stats import buckets, events, rollup
+from .dashboard import transfer
+from .profile import photos
+from . import reminders
+
+db_cli = AppGroup("db", help="Database maintenance commands.")
+stats_cli = AppGroup("stats", help="user_stats rollup and stats_buckets maintenance.")
+apps_cli = AppGroup("applications", help="Bulk import / export of applications.")
+sessions_cli = AppGroup("sessions", help="Server-side sessions (SESSION_BACKEND=mongo).")
+events_cli = AppGroup("events", help="application_events status history.")
+reminders_cli = AppGroup("reminders", help="Deadline reminder scanner and delivery worker.")
+
+
+def _user_oid(db, email):
+    user = User.get_by_email(db, email)
+    if not user:
+        raise click.ClickException(f"No user with email {email}")
+    return ObjectId(user.id)
+
+
+@db_cli.command("init")
+def init_db():
+    """Create indexes on applications and users."""
+    created = ensure_indexes(get_db())
+    for coll, names in created.items():
+        click.echo(f"{coll}: {', '.join(names)}")
+
+
+@db_cli.command("migrate")
+@click.option("--batch-size", default=500, show_default=True)
+def migrate(batch_size):
+    """Convert legacy user ids, string user_id and ISO-string dates to BSON types."""
+    db = get_db()
+    click.echo(f"Re-keyed {migrate_user_ids(db)} user(s).")
+    n = migrate_legacy_types(db, batch_size=batch_size)
+    click.echo(f"Updated {n} application(s).")
+
+
+@db_cli.command("check-plans")
+def check_plans():
+    """Fail if any hot query would run as a COLLSCAN or sort in memory."""
+    offenders = find_collscans(get_db())
+    if offenders:
+        click.echo("COLLSCAN or in-memory SORT in: " + ", ".join(offenders), err=True)
+        raise SystemExit(1)
+    click.echo("All hot queries use an index.")
+
+
+@db_cli.command("gc-photos")
+@click.option("--min-age", default=3600, show_default=True,
+              help="Keep files younger than this many seconds.")
+def gc_photos(min_age):
+    """Delete profile photo files no user references."""
+    n = photos.collect_garbage(get_db(), photos.photo_dir(current_app), min_age=min_age)
+    click.echo(f"Removed {n} file(s).")
+
+
+@stats_cli.command("rebuild")
+@click.option("--email", default=None, help="Only rebuild this user's rollup.")
+def rebuild_stats(email):
+    """Recompute user_stats from applications to repair drift."""
+    db = get_db()
+    if email:
+        rollup.rebuild_user(db, _user_oid(db, email))
+        click.echo(f"Rebuilt stats for {email}.")
+        return
+    click.echo(f"Rebuilt stats for {rollup.rebuild_all(db)} user(s).")
+
+
+@stats_cli.command("backfill-buckets")
+@click.option("--email", default=None, help="Only rebuild this user's buckets.")
+@click.option("--batch-size", default=buckets.BACKFILL_BATCH, show_default=True)
+def backfill_buckets(email, batch_size):
+    """Rebuild the daily/weekly/monthly stats_buckets from applications."""
+    db = get_db()
+    user_oid = _user_oid(db, email) if email else None
+    n = buckets.backfill(db, batch_size=batch_size, user_oid=user_oid)
+    click.echo(f"Counted {n} application(s).")
+
+
+@stats_cli.command("compact")
+def compact_buckets():
+    """Fold aged daily buckets into weeks and aged weeks into months."""
+    counts = buckets.compact(get_db())
+    click.echo(f"Compacted {counts['d']} daily and {counts['w']} weekly bucket(s).")
+
+
+@events_cli.command("backfill")
+@click.option("--batch-size", default=events.BACKFILL_BATCH, show_default=True)
+def backfill_events(batch_size):
+    """Add a "created" event for applications older than the event log."""
+    click.echo(f"Added {events.backfill(get_db(), batch_size)} event(s).")
+
+
+@apps_cli.command("import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--email", required=True, help="Owner of the imported applications.")
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), default=None,
+              help="Defaults to the file extension.")
+@click.option("--batch-size", default=transfer.BATCH_SIZE, show_default=True)
+def import_applications(path, email, fmt, batch_size):
+    """Import applications from a CSV or JSON-lines file."""
+    db = get_db()
+    user_oid = _user_oid(db, email)
+    with open(path, "rb") as fh:
+        result = transfer.import_rows(db, user_oid,
+                                      transfer.iter_rows(fh, fmt or transfer.detect_format(path)),
+                                      batch_size=batch_size)
+    for line, msg in result.errors:
+        click.echo(f"line {line}: {msg}", err=True)
+    click.echo(f"Imported {result.inserted}, skipped {result.failed}.")
+    if result.file_error:
+        raise click.ClickException(result.file_error)
+
+
+@apps_cli.command("export")
+@click.option("--email", required=True)
+@click.option("--out", type=click.File("w"), default="-", help="Defaults to stdout.")
+def export_applications(email, out):
+    """Write a user's applications as CSV."""
+    db = get_db()
+    for chunk in transfer.export_csv(db, _user_oid(db, email)):
+        out.write(chunk)
+
+
+def _session_store():
+    store = current_app.extensions.get("session_store")
+    if store is None:
+        raise click.ClickException("Server-side sessions are off (SESSION_BACKEND=cookie).")
+    return store
+
+
+@sessions_cli.command("list")
+@click.option("--email", required=True)
+def list_sessions(email):
+    """Show a user's active sessions."""
+    for s in _session_store().list_user(str(_user_oid(get_db(), email))):
+        click.echo(f"{s['sid'][:8]}…  last write {s['updated_at']}  expires {s['expires_at']}")
+
+
+@sessions_cli.command("revoke")
+@click.option("--email", required=True)
+def revoke_sessions(email):
+    """Log a user out everywhere."""
+    n = _session_store().delete_user(str(_user_oid(get_db(), email)))
+    click.echo(f"Revoked {n} session(s).")
+
+
+def _days_option(f):
+    return click.option("--days", envvar="REMINDER_DAYS", default="7,1", show_default=True,
+                        help="Remind this many days before a deadline (comma-separated).")(f)
+
+
+@reminders_cli.command("run")
+@_days_option
+@click.option("--sink", envvar="REMINDER_SINK", default="console", show_default=True,
+              help='"console", "file:<path>" or "module:factory".')
+@click.option("--scan-interval", envvar="REMINDER_SCAN_INTERVAL", default=3600.0, show_default=True)
+@click.option("--poll-interval", envvar="REMINDER_POLL_INTERVAL", default=5.0, show_default=True)
+@click.option("--batch-size", envvar="REMINDER_BATCH_SIZE", default=reminders.BATCH_SIZE,
+              show_default=True)
+@click.option("--max-attempts", envvar="REMINDER_MAX_ATTEMPTS", default=reminders.MAX_ATTEMPTS,
+              show_default=True)
+@click.option("--backoff", envvar="REMINDER_BACKOFF_SECONDS", default=float(reminders.BACKOFF_SECONDS),
+              show_default=True, help="First retry delay; doubles per attempt.")
+@click.option("--once", is_flag=True, help="One scan and one drain of the queue, then exit.")
+def run_reminders(days, sink, scan_interval, poll_interval, batch_size, max_attempts, backoff, once):
+    """Run the reminder worker (separately from the web processes)."""
+    reminders.run_worker(get_db(), reminders.make_sink(sink), reminders.parse_days(days),
+                         scan_interval=scan_interval, poll_interval=poll_interval,
+                         batch_size=batch_size, max_attempts=max_attempts,
+                         base_backoff=backoff, once=once)
+
+
+@reminders_cli.command("scan")
+@_days_option
+@click.option("--batch-size", envvar="REMINDER_BATCH_SIZE", default=reminders.BATCH_SIZE,
+              show_default=True)
+def scan_reminders(days, batch_size):
+    """Enqueue reminders for upcoming deadlines without delivering them."""
+    counts = reminders.scan(get_db(), reminders.parse_days(days), batch_size)
+    click.echo(f"Scanned {counts['scanned']}, enqueued {counts['enqueued']}.")
+
+
+@reminders_cli.command("status")
+def reminder_status():
+    """Reminder jobs by status."""
+    for status, n in sorted(reminders.queue_stats(get_db()).items()):
+        click.echo(f"{status}: {n}")
+
+
+def register_cli(app):
+    app.cli.add_command(db_cli)
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(apps_cli)
+    app.cli.add_command(sessions_cli)
+    app.cli.add_command(events_cli)
+    app.cli.add_command(reminders_cli)
@@ -0,0 +1,109 @@
+"""
+Conditional GET (ETag / If-None-Match) for pages built from one user's
+applications.
+
+The ETag covers everything such a page depends on: the user, their data
+version (user_stats.version, bumped by every application write), the query
+string, today's date (upcoming-deadline windows and "last 7 days" move at
+midnight) and the deployed code. A matching If-None-Match gets a 304
+before any query runs or any template renders.
+"""
+import datetime as dt
+import functools
+import hashlib
+import inspect
+import os
+
+from bson import ObjectId
+from flask import g, request, session, make_response
+from flask_login import current_user
+
+from .db import get_db
+
+
+def _code_token() -> str:
+    # Newest mtime of the code and templates under app/: changes on every
+    # deploy, same in every worker. static/ (user uploads) is left out so a
+    # worker started after an upload agrees with the others.
+    build = os.getenv("APP_BUILD")
+    if build:
+        return build
+    root = os.path.dirname(__file__)
+    newest = 0.0
+    for d, dirs, files in os.walk(root):
+        dirs[:] = [x for x in dirs if x not in ("__pycache__", "static")]
+        in_templates = "templates" in os.path.relpath(d, root).split(os.sep)
+        for f in files:
+            if f.endswith(".py") or in_templates:
+                newest = max(newest, os.path.getmtime(os.path.join(d, f)))
+    return str(int(newest))
+
+
+CODE_TOKEN = _code_token()
+
+
+def data_version(db, user_oid) -> int:
+    """user_stats.version, read once per request."""
+    memo = g.setdefault("_data_versions", {})
+    if user_oid not in memo:
+        doc = db.user_stats.find_one({"_id": user_oid}, {"version": 1})
+        memo[user_oid] = (doc or {}).get("version", 0)
+    return memo[user_oid]
+
+
+def page_etag(user_oid) -> str:
+    parts = [
+        request.endpoint,
+        str(user_oid),
+        str(data_version(get_db(), user_oid)),
+        dt.datetime.utcnow().date().isoformat(),
+        request.query_string.decode("latin-1"),
+        CODE_TOKEN,
+    ]
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:24]
+
+
+def _begin(renders_flashes: bool):
+    """(etag, 304 response or None) for the current request."""
+    # Pending flash messages are part of the page: always render those.
+    if request.method != "GET" or (renders_flashes and session.get("_flashes")):
+        return None, None
+    etag = page_etag(ObjectId(current_user.id))
+    if request.if_none_match.contains_weak(etag):
+        return etag, _tag(make_response("", 304), etag)
+    return etag, None
+
+
+def _tag(resp, etag):
+    if etag:
+        resp.set_etag(etag, weak=True)
+        # cache privately but always revalidate
+        resp.cache_control.private = True
+        resp.cache_control.no_cache = True
+    return resp
+
+
+def conditional_get(view=None, *, renders_flashes: bool = True):
+    """
+    Wrap a login_required view (sync or async) with ETag revalidation.
+    Views that don't show flash messages (JSON) pass renders_flashes=False.
+    """
+    if view is None:
+        return functools.partial(conditional_get, renders_flashes=renders_flashes)
+
+    if inspect.iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapper(*args, **kwargs):
+            etag, not_modified = _begin(renders_flashes)
+            if not_modified is not None:
+                return not_modified
+            return _tag(make_response(await view(*args, **kwargs)), etag)
+        return wrapper
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        etag, not_modified = _begin(renders_flashes)
+        if not_modified is not None:
+            return not_modified
+        return _tag(make_response(view(*args, **kwargs)), etag)
+    return wrapper
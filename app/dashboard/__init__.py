@@ -7,4 +7,4 @@ dashboard_bp = Blueprint(
     template_folder="templates",
 )
 
-from . import routes
+from . import routes, api
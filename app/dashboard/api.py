@@ -0,0 +1,272 @@
+"""
+/api/v1 JSON endpoints for applications, so the UI and integrations can
+update rows in place instead of posting a form and re-rendering the page.
+
+    GET    /api/v1/applications          ?status= &q= &sort= &limit= &after= &before= &fields= &count=1
+    POST   /api/v1/applications          {company, role, status, deadline, ...}
+    GET    /api/v1/applications/<id>     ?fields=
+    PATCH  /api/v1/applications/<id>     only the fields to change, optionally "rev" (409 if stale)
+    DELETE /api/v1/applications/<id>
+    GET    /api/v1/applications/<id>/events
+    POST   /api/v1/batch                 {"ops": [{"op": "create"|"patch"|"delete", "id", "data"}]}
+
+Lists page by the same keyset cursors as the dashboard (searches by
+?page=). A batch applies its operations in order and folds all their
+rollup/cache side effects into one record_changes() call.
+"""
+import datetime as dt
+import logging
+
+from bson import ObjectId
+from flask import request
+from flask_login import current_user
+from pymongo import ReturnDocument
+
+from . import dashboard_bp
+from .changes import record_change, record_changes
+from .queries import decode_cursor, list_filter, page_plan, page_result, search_page, sort_spec
+from ..conditional import conditional_get
+from ..db import get_db
+from ..jsonapi import ApiError, api_login_required, json_body, parse_fields
+from ..models.application import (API_FIELDS, EDITABLE_FIELDS, clean_fields, doc_rev,
+                                  rev_match, to_object_id, to_public)
+from ..stats import events
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMIT = 25
+MAX_LIMIT = 100
+BATCH_LIMIT = 100
+
+
+def _user_oid():
+    return ObjectId(current_user.id)
+
+
+def _job_oid(job_id):
+    oid = to_object_id(job_id)
+    if oid is None:
+        raise ApiError(404, "Application not found.")
+    return oid
+
+
+def _check_fields(data: dict):
+    unknown = sorted(set(data) - set(EDITABLE_FIELDS))
+    if unknown:
+        raise ApiError(400, f"Unknown field(s): {', '.join(unknown)}.")
+    # every editable field, dates included, is a JSON string (or null)
+    not_text = sorted(f for f, v in data.items() if v is not None and not isinstance(v, str))
+    if not_text:
+        raise ApiError(400, f"Expected a string for: {', '.join(not_text)}.")
+
+
+def _create(db, user_oid, data: dict):
+    """Insert one application; returns (document, change)."""
+    _check_fields(data)
+    fields, error = clean_fields(data)
+    if error:
+        raise ApiError(400, error)
+    now = dt.datetime.utcnow()
+    doc = {"user_id": user_oid, **fields, "created_at": now, "updated_at": now, "rev": 1}
+    db.applications.insert_one(doc)
+    return doc, (None, doc)
+
+
+def _patch(db, user_oid, job_id, data: dict):
+    """
+    $set only the given fields; returns (updated document, change). With
+    "rev" the patch applies only to that revision of the application.
+    """
+    data = dict(data)
+    rev = data.pop("rev", None)
+    if rev is not None and (type(rev) is not int or rev < 0):
+        raise ApiError(400, "rev must be a non-negative integer.")
+    _check_fields(data)
+    query = {"_id": _job_oid(job_id), "user_id": user_oid}
+    job = db.applications.find_one(query)
+    if not job:
+        raise ApiError(404, "Application not found.")
+    if rev is not None and doc_rev(job) != rev:
+        raise ApiError(409, f"The application is at revision {doc_rev(job)}, not {rev}.")
+
+    # validate the document as it will be, but only write what changed
+    fields, error = clean_fields({f: data.get(f, job.get(f)) for f in EDITABLE_FIELDS})
+    if error:
+        raise ApiError(400, error)
+    update = {f: fields[f] for f in data}
+    update["updated_at"] = dt.datetime.utcnow()
+
+    # conditional on the revision validated above, so (job, after) is exact
+    after = db.applications.find_one_and_update(
+        {**query, **rev_match(doc_rev(job))}, {"$set": update, "$inc": {"rev": 1}},
+        return_document=ReturnDocument.AFTER)
+    if after is None:
+        raise ApiError(409, "The application was changed by another request; retry.")
+    return after, (job, after)
+
+
+def _delete(db, user_oid, job_id):
+    """Delete one application; returns (None, change)."""
+    deleted = db.applications.find_one_and_delete(
+        {"_id": _job_oid(job_id), "user_id": user_oid},
+        projection={"status": 1, "company": 1, "created_at": 1})
+    if not deleted:
+        raise ApiError(404, "Application not found.")
+    return None, (deleted, None)
+
+
+@dashboard_bp.get("/api/v1/applications")
+@api_login_required
+@conditional_get(renders_flashes=False)
+def api_list():
+    db = get_db()
+    user_oid = _user_oid()
+    fields = parse_fields(request.args.get("fields"), API_FIELDS)
+    q = (request.args.get("q") or "").strip()
+    status = (request.args.get("status") or "").strip().lower()
+    sort = (request.args.get("sort") or "deadline").lower()
+    try:
+        limit = min(max(int(request.args.get("limit") or DEFAULT_LIMIT), 1), MAX_LIMIT)
+        page = max(int(request.args.get("page") or 1), 1)
+    except ValueError:
+        raise ApiError(400, "limit and page must be integers.")
+    after = decode_cursor(request.args.get("after"))
+    before = None if after else decode_cursor(request.args.get("before"))
+    with_total = request.args.get("count") == "1"
+
+    base = list_filter(user_oid, q, status)
+    total = None
+    if q:
+        rows, total = search_page(db, base, page, limit, with_total)
+        after = before = None
+    else:
+        match, spec, skip, fetch = page_plan(base, sort, page, limit, after, before)
+        projection = None
+        if fields:
+            # the sort key is needed for the cursors even if not asked for
+            projection = {**fields, next(iter(sort_spec(sort))): 1}
+        rows = list(db.applications.find(match, projection)
+                    .sort(list(spec.items())).skip(skip).limit(fetch))
+        if with_total:
+            total = db.applications.count_documents(base)
+
+    result = page_result(rows, q=q, sort=sort, page=page, page_size=limit,
+                         after=after, before=before)
+    body = {
+        "data": [to_public(d, fields) for d in result["applications"]],
+        "next": result["next"],
+        "prev": result["prev"],
+        "has_next": result["has_next"],
+        "has_prev": result["has_prev"],
+    }
+    if q:
+        body["page"] = page
+    if with_total:
+        body["total"] = total
+    return body
+
+
+@dashboard_bp.post("/api/v1/applications")
+@api_login_required
+def api_create():
+    db = get_db()
+    user_oid = _user_oid()
+    doc, change = _create(db, user_oid, json_body())
+    record_change(db, user_oid, *change)
+    return to_public(doc), 201
+
+
+@dashboard_bp.get("/api/v1/applications/<job_id>")
+@api_login_required
+@conditional_get(renders_flashes=False)
+def api_get(job_id):
+    fields = parse_fields(request.args.get("fields"), API_FIELDS)
+    doc = get_db().applications.find_one(
+        {"_id": _job_oid(job_id), "user_id": _user_oid()}, fields)
+    if not doc:
+        raise ApiError(404, "Application not found.")
+    return to_public(doc, fields)
+
+
+@dashboard_bp.get("/api/v1/applications/<job_id>/events")
+@api_login_required
+@conditional_get(renders_flashes=False)
+def api_history(job_id):
+    """The application's status history, oldest first (kept after deletion)."""
+    history = events.history(get_db(), _user_oid(), _job_oid(job_id))
+    return {"data": [{"kind": events.KINDS[e["k"]], "ts": e["ts"],
+                      **{name: e[k] for k, name in (("s", "status"), ("p", "previous"),
+                                                    ("f", "fields")) if k in e}}
+                     for e in history]}
+
+
+@dashboard_bp.patch("/api/v1/applications/<job_id>")
+@api_login_required
+def api_patch(job_id):
+    db = get_db()
+    user_oid = _user_oid()
+    doc, change = _patch(db, user_oid, job_id, json_body())
+    record_change(db, user_oid, *change)
+    return to_public(doc)
+
+
+@dashboard_bp.delete("/api/v1/applications/<job_id>")
+@api_login_required
+def api_delete(job_id):
+    db = get_db()
+    user_oid = _user_oid()
+    _, change = _delete(db, user_oid, job_id)
+    record_change(db, user_oid, *change)
+    return "", 204
+
+
+_BATCH_OPS = {
+    "create": lambda db, user_oid, op: _create(db, user_oid, op.get("data") or {}),
+    "patch": lambda db, user_oid, op: _patch(db, user_oid, op.get("id"), op.get("data") or {}),
+    "delete": lambda db, user_oid, op: _delete(db, user_oid, op.get("id")),
+}
+
+
+@dashboard_bp.post("/api/v1/batch")
+@api_login_required
+def api_batch():
+    """
+    Run several operations in one request. Each gets its own result
+    ({"status", "data"} or {"status", "error"}); a failing operation
+    doesn't stop the ones after it.
+    """
+    ops = json_body().get("ops")
+    if not isinstance(ops, list) or not ops:
+        raise ApiError(400, "Expected a non-empty \"ops\" list.")
+    if len(ops) > BATCH_LIMIT:
+        raise ApiError(400, f"At most {BATCH_LIMIT} operations per batch.")
+
+    db = get_db()
+    user_oid = _user_oid()
+    results, changes = [], []
+    try:
+        for op in ops:
+            name = op.get("op") if isinstance(op, dict) else None
+            handler = _BATCH_OPS.get(name) if isinstance(name, str) else None
+            if handler is None:
+                results.append({"status": 400, "error": "Unknown operation."})
+                continue
+            if not isinstance(op.get("data") or {}, dict):
+                results.append({"status": 400, "error": "Expected \"data\" to be an object."})
+                continue
+            try:
+                doc, change = handler(db, user_oid, op)
+            except ApiError as e:
+                results.append({"status": e.status, "error": e.message})
+                continue
+            changes.append(change)
+            if doc is None:
+                results.append({"status": 204})
+            else:
+                results.append({"status": 201 if name == "create" else 200,
+                                "data": to_public(doc)})
+    finally:
+        # operations already written are counted even if a later one fails
+        record_changes(db, user_oid, changes)
+    logger.debug("Batch user=%s ops=%d ok=%d", user_oid, len(ops), len(changes))
+    return {"results": results}
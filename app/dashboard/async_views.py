@@ -0,0 +1,23 @@
+"""
+Async dashboard view for the ASYNC_MONGO serving mode; create_app() swaps it
+in for dashboard.index.
+"""
+from flask_login import login_required, current_user
+
+from .. import aio
+from ..conditional import conditional_get
+from ..db import get_db
+from .queries import dashboard_snapshot_async
+from .routes import PAGE_SIZE, _list_args, _render_dashboard, _user_match, logger
+
+
+@login_required
+@conditional_get
+async def index_async():
+    args = _list_args()
+    logger.debug("Dashboard (async): user=%s args=%s", current_user.id, args)
+
+    # rollup, upcoming, page and count run concurrently on the Motor loop
+    snap = await aio.run(dashboard_snapshot_async(
+        aio.get_async_db(), get_db(), _user_match(), page_size=PAGE_SIZE, **args))
+    return _render_dashboard(snap, args)
@@ -0,0 +1,21 @@
+"""Side effects every write to `applications` must trigger."""
+from .. import fragments
+from ..stats import buckets, events, rollup
+
+
+def record_change(db, user_oid, before: dict = None, after: dict = None):
+    """
+    Call after an application is inserted (before=None), updated or
+    deleted (after=None) so derived data stays in step.
+    """
+    record_changes(db, user_oid, [(before, after)])
+
+
+def record_changes(db, user_oid, changes):
+    """Batch form of record_change for a list of (before, after) pairs."""
+    changes = list(changes)
+    if changes:
+        rollup.apply_changes(db, user_oid, changes)
+        events.append(db, user_oid, changes)
+        buckets.apply_changes(db, user_oid, changes)
+        fragments.invalidate_user(user_oid)
@@ -0,0 +1,274 @@
+import asyncio
+import base64
+import binascii
+import datetime as dt
+import json
+import logging
+import re
+
+from pymongo.errors import OperationFailure
+
+from ..models.application import to_datetime, to_object_id
+from ..stats.rollup import get_rollup, rebuild_user
+
+logger = logging.getLogger(__name__)
+
+UPCOMING_DAYS = 14
+UPCOMING_LIMIT = 5
+
+# Status keys the dashboard template renders, in display order.
+STAT_KEYS = ("applied", "interviewing", "offer", "rejected", "accepted")
+
+def search_terms(q: str) -> str:
+    """
+    Plain words from q for a $text search. Quotes and '-' negation are
+    dropped so user input can't change the meaning of the query.
+    """
+    return " ".join(re.findall(r"\w+", q or ""))[:200]
+
+
+def list_filter(user_oid, q: str = "", status: str = "") -> dict:
+    """Match for the main application list."""
+    base = {"user_id": user_oid}
+    if status:
+        base["status"] = status
+    if q:
+        # served by the (user_id, company/role/notes text) index
+        base["$text"] = {"$search": search_terms(q)}
+    return base
+
+
+def search_page(db, base: dict, page: int, page_size: int, with_total: bool):
+    """
+    Ranked search results (best match first), offset-paginated: textScore
+    isn't stable enough to build keyset cursors from.
+    """
+    terms = base["$text"]["$search"]
+    if not terms:
+        return [], 0
+    try:
+        cursor = (db.applications.find(base, {"score": {"$meta": "textScore"}})
+                  .sort([("score", {"$meta": "textScore"})])
+                  .skip((page - 1) * page_size)
+                  .limit(page_size + 1))
+        rows = list(cursor)
+        total = db.applications.count_documents(base) if with_total else None
+    except OperationFailure:
+        # text index missing (`flask db init` not run yet): escaped regex fallback
+        logger.warning("Text index missing; falling back to regex search")
+        pattern = "|".join(re.escape(t) for t in terms.split())
+        fallback = {k: v for k, v in base.items() if k != "$text"}
+        fallback["$or"] = [{f: {"$regex": pattern, "$options": "i"}}
+                           for f in ("company", "role", "notes")]
+        rows = list(db.applications.find(fallback).sort("updated_at", -1)
+                    .skip((page - 1) * page_size).limit(page_size + 1))
+        total = db.applications.count_documents(fallback) if with_total else None
+    return rows, total
+
+
+def sort_spec(sort: str) -> dict:
+    if sort == "deadline":
+        return {"deadline": 1, "_id": 1}
+    return {"updated_at": -1, "_id": -1}
+
+
+def encode_cursor(doc: dict, sort: str) -> str:
+    """Opaque cursor for the (sort field, _id) position of doc."""
+    field = next(iter(sort_spec(sort)))
+    value = doc.get(field)
+    if isinstance(value, dt.datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, str(doc["_id"])], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str):
+    """Inverse of encode_cursor; None for anything malformed."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        value, oid = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError):
+        return None
+    oid = to_object_id(oid)
+    if oid is None:
+        return None
+    return (to_datetime(value) if value is not None else None), oid
+
+
+def _keyset_match(field: str, value, oid, op: str) -> dict:
+    """
+    Documents strictly past (value, oid) in the direction of op ("$gt" or
+    "$lt"). Nulls sort below every date, so they need their own branches.
+    """
+    if op == "$gt":
+        if value is None:
+            return {"$or": [{field: None, "_id": {"$gt": oid}}, {field: {"$ne": None}}]}
+        return {"$or": [{field: {"$gt": value}}, {field: value, "_id": {"$gt": oid}}]}
+    if value is None:
+        return {field: None, "_id": {"$lt": oid}}
+    return {"$or": [{field: {"$lt": value}}, {field: value, "_id": {"$lt": oid}},
+                    {field: None}]}
+
+
+def page_plan(base: dict, sort: str, page: int, page_size: int, after, before):
+    """(match, sort spec, skip, limit) for one page of the list."""
+    spec = sort_spec(sort)
+    field, direction = next(iter(spec.items()))
+    match = dict(base)
+    skip = 0
+    cursor = after or before
+    if cursor:
+        forward = (direction == 1) == (after is not None)
+        keyset = _keyset_match(field, cursor[0], cursor[1], "$gt" if forward else "$lt")
+        match = {"$and": [base, keyset]}
+        if before is not None:
+            # walk backwards from the cursor, flipped back in finish_snapshot
+            spec = {k: -v for k, v in spec.items()}
+    elif page > 1:
+        # legacy ?page=N links without a cursor
+        skip = (page - 1) * page_size
+    return match, spec, skip, page_size + 1
+
+
+def upcoming_filter() -> dict:
+    """Open applications due between today and UPCOMING_DAYS from now."""
+    today = dt.datetime.combine(dt.date.today(), dt.time())
+    return {
+        "deadline": {"$gte": today, "$lte": today + dt.timedelta(days=UPCOMING_DAYS)},
+        "status": {"$nin": ["rejected", "accepted"]},
+    }
+
+
+UPCOMING_PROJECTION = {"company": 1, "role": 1, "deadline": 1}
+
+
+def finish_snapshot(rollup: dict, upcoming: list, rows: list, total, *,
+                    q, sort, page, page_size, after, before) -> dict:
+    """Shape query results into what the dashboard template renders."""
+    counts = rollup.get("status") or {}
+    stats = {k: counts.get(k, 0) for k in STAT_KEYS}
+    stats["total"] = sum(stats.values())
+
+    return {
+        "stats": stats,
+        "upcoming": upcoming,
+        "total": total,
+        **page_result(rows, q=q, sort=sort, page=page, page_size=page_size,
+                      after=after, before=before),
+    }
+
+
+def page_result(rows: list, *, q, sort, page, page_size, after, before) -> dict:
+    """
+    Trim the page_size + 1 rows fetched for a page_plan() and work out the
+    neighbouring pages and their cursors.
+    """
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if before is not None:
+        rows.reverse()
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = (after is not None or page > 1), has_more
+
+    return {
+        "applications": rows,
+        "has_next": has_next,
+        "has_prev": has_prev,
+        # searches page by offset, so they carry no cursors
+        "next": encode_cursor(rows[-1], sort) if rows and has_next and not q else None,
+        "prev": encode_cursor(rows[0], sort) if rows and has_prev and not q else None,
+    }
+
+
+def dashboard_snapshot(db, user_oid, *, q="", status="", sort="deadline",
+                       page=1, page_size=10, after=None, before=None,
+                       with_total=False) -> dict:
+    """
+    Everything the dashboard renders: status stats (the user_stats rollup,
+    read by _id), upcoming deadlines and the requested page, each its own
+    indexed query so none of them scans the user's other applications.
+
+    The page is keyset-paginated when an after/before cursor (see
+    decode_cursor) is given: the cursor predicate and the sort go straight
+    to the (user_id, sort field) index. A search (q) is ranked by text score
+    and paged by offset. The list total comes free from the rollup when
+    there are no filters; otherwise it is only counted if with_total is set
+    and is None when unknown.
+    """
+    base = list_filter(user_oid, q, status)
+    filtered = bool(q or status)
+
+    rollup = get_rollup(db, user_oid)
+    upcoming = list(db.applications.find({"user_id": user_oid, **upcoming_filter()},
+                                         UPCOMING_PROJECTION)
+                    .sort("deadline", 1).limit(UPCOMING_LIMIT))
+
+    if q:
+        rows, total = search_page(db, base, page, page_size, with_total)
+        after = before = None
+    else:
+        match, spec, skip, limit = page_plan(base, sort, page, page_size, after, before)
+        rows = list(db.applications.find(match).sort(list(spec.items()))
+                    .skip(skip).limit(limit))
+        if not filtered:
+            total = rollup.get("total", 0)
+        elif with_total:
+            total = db.applications.count_documents(base)
+        else:
+            total = None
+
+    logger.debug("Snapshot user=%s match=%s", user_oid, base)
+    return finish_snapshot(rollup, upcoming, rows, total,
+                           q=q, sort=sort, page=page, page_size=page_size,
+                           after=after, before=before)
+
+
+async def dashboard_snapshot_async(adb, db, user_oid, *, q="", status="", sort="deadline",
+                                   page=1, page_size=10, after=None, before=None,
+                                   with_total=False) -> dict:
+    """
+    ASYNC_MONGO variant of dashboard_snapshot. The rollup, upcoming, page and
+    count are separate indexed queries on the Motor database adb, run
+    concurrently; db (sync) only serves rare rollup rebuilds and searches.
+    """
+    base = list_filter(user_oid, q, status)
+    filtered = bool(q or status)
+
+    async def rollup_doc():
+        doc = await adb.user_stats.find_one({"_id": user_oid})
+        if doc is None or doc.get("stale"):
+            return await asyncio.to_thread(rebuild_user, db, user_oid)
+        return doc
+
+    async def upcoming():
+        cursor = (adb.applications.find({"user_id": user_oid, **upcoming_filter()},
+                                        UPCOMING_PROJECTION)
+                  .sort("deadline", 1))
+        return await cursor.to_list(UPCOMING_LIMIT)
+
+    async def rows_and_total():
+        if q:
+            return await asyncio.to_thread(search_page, db, base, page, page_size, with_total)
+        match, spec, skip, limit = page_plan(base, sort, page, page_size, after, before)
+        cursor = adb.applications.find(match).sort(list(spec.items())).skip(skip).limit(limit)
+        return await cursor.to_list(limit), None
+
+    async def count():
+        if filtered and with_total and not q:
+            return await adb.applications.count_documents(base)
+        return None
+
+    rollup, upcoming_rows, (rows, total), counted = await asyncio.gather(
+        rollup_doc(), upcoming(), rows_and_total(), count())
+
+    if not q:
+        total = counted if filtered else rollup.get("total", 0)
+    else:
+        after = before = None
+
+    return finish_snapshot(rollup, upcoming_rows, rows, total,
+                           q=q, sort=sort, page=page, page_size=page_size,
+                           after=after, before=before)
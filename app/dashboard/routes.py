@@ -1,108 +1,103 @@
-from flask import request, render_template, flash, redirect, url_for
+from flask import request, render_template, flash, redirect, url_for, Response, stream_with_context
 from flask_login import login_required, current_user
 from . import dashboard_bp
 from ..db import get_db
+from ..conditional import conditional_get
+from ..fragments import fragment_key
+from ..models.application import (DATE_FIELDS, EDITABLE_FIELDS, clean_fields, doc_rev, format_date,
+                                  normalize_status, rev_match, to_object_id)
+from .queries import dashboard_snapshot, decode_cursor
+from .changes import record_change, record_changes
+from .transfer import detect_format, iter_rows, import_rows, export_csv
+from ..stats import buckets, rollup
 from bson import ObjectId
+from pymongo import ReturnDocument
 import math, datetime as dt
 import logging
 
 logger = logging.getLogger(__name__)
 
 PAGE_SIZE = 10
+BULK_LIMIT = 500
 
 def _user_match():
-    return {"$in": [ObjectId(current_user.id), current_user.id]}
+    # user_id is always an ObjectId once `flask db migrate` has run
+    return ObjectId(current_user.id)
 
-@dashboard_bp.get("/")
-@login_required
-def index():
-    db = get_db()
+def _back_to_list():
+    """Redirect to the dashboard view (filters, sort, page) a form was posted from."""
+    # stay on the same page: forward whichever keyset cursor it was loaded with
+    cursor = {}
+    cursor_dir = request.form.get("cursor_dir")
+    if cursor_dir in ("after", "before") and request.form.get("cursor"):
+        cursor[cursor_dir] = request.form.get("cursor")
 
-    # ----- filters -----
-    q      = (request.args.get("q") or "").strip()
-    status = (request.args.get("status") or "").strip().lower()
-    sort   = (request.args.get("sort") or "deadline").lower()
-    page   = max(int(request.args.get("page") or 1), 1)
-    user_match = _user_match()
+    return redirect(url_for(
+        "dashboard.index",
+        q=request.form.get("q") or "",
+        status=request.form.get("current_filter_status") or "",
+        sort=request.form.get("sort") or "deadline",
+        page=request.form.get("page") or 1,
+        **cursor,
+    ))
 
-    logger.debug("Dashboard: user=%s page=%s q='%s' status=%s sort=%s",
-                 current_user.id, page, q, status, sort)
-
-    # ----- STATS -----
-    pipeline = [
-        {"$match": {"user_id": user_match}},
-        {"$group": {"_id": {"$toLower": "$status"}, "count": {"$sum": 1}}},
-    ]
-    rows = list(db.applications.aggregate(pipeline))
-    raw_counts = { (r["_id"] or "unknown"): r["count"] for r in rows }
-
-    # bucket to keys your template uses
-    stats = {
-        "applied":      raw_counts.get("applied", 0),
-        "interviewing": raw_counts.get("interviewing", 0)
-                        + raw_counts.get("interview", 0),
-        "offer":        raw_counts.get("offer", 0)
-                        + raw_counts.get("offered", 0),
-        "rejected":     raw_counts.get("rejected", 0),
-        "accepted":     raw_counts.get("accepted", 0),
+def _list_args() -> dict:
+    """Dashboard list filters / paging from the query string."""
+    after = decode_cursor(request.args.get("after"))
+    return {
+        "q":      (request.args.get("q") or "").strip(),
+        "status": (request.args.get("status") or "").strip().lower(),
+        "sort":   (request.args.get("sort") or "deadline").lower(),
+        "page":   max(int(request.args.get("page") or 1), 1),
+        "after":  after,
+        "before": None if after else decode_cursor(request.args.get("before")),
+        "with_total": request.args.get("count") == "1",
     }
-    stats["total"] = sum(stats.values())
-
-    logger.debug("Stats raw_counts=%s", raw_counts)
-    logger.debug("Stats bucketed=%s (total=%s)", stats, stats["total"])
-
-    # ----- UPCOMING  -----
-    today = dt.date.today()
-    soon  = today + dt.timedelta(days=14)
-    upcoming = list(
-        db.applications.find(
-            {
-                "user_id": user_match,
-                "deadline": {"$gte": today.isoformat(), "$lte": soon.isoformat()},
-                "status": {"$nin": ["rejected", "accepted"]},
-            },
-            {"company": 1, "role": 1, "deadline": 1},
-        ).sort("deadline", 1).limit(5)
-    )
-    logger.debug("Upcoming count=%d", len(upcoming))
-
-    # ----- MAIN LIST -----
-    base = {"user_id": user_match}
-    if status:
-        base["status"] = status
-    if q:
-        base["$or"] = [
-            {"company": {"$regex": q, "$options": "i"}},
-            {"role":    {"$regex": q, "$options": "i"}},
-        ]
 
-    sort_key = [("deadline", 1)] if sort == "deadline" else [("updated_at", -1)]
-    total = db.applications.count_documents(base)
-    cursor = (db.applications.find(base)
-              .sort(sort_key)
-              .skip((page - 1) * PAGE_SIZE)
-              .limit(PAGE_SIZE))
-    applications = list(cursor)
+def _render_dashboard(snap: dict, args: dict):
+    stats = snap["stats"]
+    upcoming = snap["upcoming"]
+    total = snap["total"]
+    applications = snap["applications"]
+    page = args["page"]
 
     # stringify _id for templates (prevents ObjectId(...) rendering in URLs)
     for d in applications:
         if d.get("_id") is not None:
             d["_id"] = str(d["_id"])
 
-    logger.debug("List total=%d page=%d/%d (query=%s)", total, page,
-                 math.ceil(total / PAGE_SIZE) if total else 1, base)
+    pages = (math.ceil(total / PAGE_SIZE) or 1) if total is not None else None
 
-    pages = math.ceil(total / PAGE_SIZE) if total else 1
+    logger.debug("Stats bucketed=%s (total=%s) upcoming=%d", stats, stats["total"], len(upcoming))
+    logger.debug("List total=%s page=%d/%s", total, page, pages)
 
     return render_template(
         "dashboard_home.html",
         applications=applications,
         stats=stats,
         upcoming=upcoming,
-        filters={"q": q, "status": status, "sort": sort},
-        pager={"page": page, "pages": pages, "size": PAGE_SIZE, "total": total},
+        frag_key=fragment_key(get_db(), _user_match()),
+        filters={"q": args["q"], "status": args["status"], "sort": args["sort"]},
+        pager={"page": page, "pages": pages, "size": PAGE_SIZE, "total": total,
+               "next": snap["next"], "prev": snap["prev"],
+               "has_next": snap["has_next"], "has_prev": snap["has_prev"],
+               "cursor": request.args.get("after") or request.args.get("before") or "",
+               "cursor_dir": "after" if args["after"] else ("before" if args["before"] else "")},
     )
 
+@dashboard_bp.get("/")
+@login_required
+@conditional_get
+def index():
+    db = get_db()
+    args = _list_args()
+
+    logger.debug("Dashboard: user=%s args=%s", current_user.id, args)
+
+    # ----- STATS / UPCOMING / LIST in one round trip -----
+    snap = dashboard_snapshot(db, _user_match(), page_size=PAGE_SIZE, **args)
+    return _render_dashboard(snap, args)
+
 
 @dashboard_bp.route("/add", methods=["GET", "POST"])
 @login_required
@@ -110,25 +105,21 @@ def add_job():
     db = get_db()
 
     if request.method == "POST":
-        company  = (request.form.get("company") or "").strip()
-        role     = (request.form.get("role") or "").strip()
-        status   = (request.form.get("status") or "applied").strip().lower()
-        deadline = (request.form.get("deadline") or "").strip()
-
-        if not company or not role:
-            flash("Company and role are required.", "error")
-            return render_template("dashboard/add_job.html")
+        fields, error = clean_fields(request.form)
+        if error:
+            flash(error, "error")
+            return render_template("add_job.html")
 
+        now = dt.datetime.utcnow()
         doc = {
             "user_id": ObjectId(current_user.id),
-            "company": company,
-            "role": role,
-            "status": status,
-            "deadline": deadline or None,
-            "created_at": dt.datetime.utcnow().isoformat(),
-            "updated_at": dt.datetime.utcnow().isoformat(),
+            **fields,
+            "created_at": now,
+            "updated_at": now,
+            "rev": 1,
         }
         res = db.applications.insert_one(doc)
+        record_change(db, doc["user_id"], after=doc)
         logger.debug("Inserted application _id=%s payload=%s", res.inserted_id, doc)
 
         flash("Job added successfully!", "info")
@@ -147,22 +138,48 @@ def delete_job(job_id):
         flash("Invalid job ID.", "error")
         return redirect(url_for("dashboard.index"))
 
-    user_match = {"$in": [ObjectId(current_user.id), current_user.id]}
+    user_match = _user_match()
     query = {
         "$and": [
             {"user_id": user_match},
             {"$or": [{"_id": job_oid}, {"_id": str(job_id)}]}
         ]
     }
-    result = db.applications.delete_one(query)
+    deleted = db.applications.find_one_and_delete(
+        query, projection={"status": 1, "company": 1, "created_at": 1})
 
-    if result.deleted_count > 0:
+    if deleted:
+        record_change(db, user_match, before=deleted)
         flash("Job deleted successfully!", "info")
     else:
         flash("Job not found or unauthorized.", "error")
 
     return redirect(url_for("dashboard.index"))
 
+# Fields on the edit form; the others keep their stored value.
+EDIT_FORM_FIELDS = ("company", "role", "status", "deadline", "link", "notes")
+
+def _form_values(doc: dict) -> dict:
+    """A stored application's edit form fields, as the form shows them."""
+    return {f: format_date(doc.get(f), "%Y/%m/%d") if f in DATE_FIELDS else str(doc.get(f) or "")
+            for f in EDIT_FORM_FIELDS}
+
+def _merge_view(base: dict, mine: dict, current: dict):
+    """
+    Three-way merge of an edit made from a stale copy: fields only the user
+    changed keep their input, fields only changed elsewhere take the saved
+    value. Returns (form values, [{field, mine, theirs, both}] to review).
+    """
+    theirs = _form_values(current)
+    clean = {k: clean_fields(v)[0] for k, v in (("base", base), ("mine", mine), ("theirs", theirs))}
+    values, review = {}, []
+    for f in EDIT_FORM_FIELDS:
+        b, m, t = clean["base"][f], clean["mine"][f], clean["theirs"][f]
+        values[f] = mine[f] if m != b else theirs[f]
+        if t != b and t != m:
+            review.append({"field": f, "mine": mine[f], "theirs": theirs[f], "both": m != b})
+    return values, review
+
 @dashboard_bp.route("/edit/<job_id>", methods=["GET", "POST"])
 @login_required
 def edit_job(job_id):
@@ -173,66 +190,77 @@ def edit_job(job_id):
         flash("Invalid job ID.", "error")
         return redirect(url_for("dashboard.index"))
 
-    user_match = {"$in": [ObjectId(current_user.id), current_user.id]}
+    user_match = _user_match()
     base_query = {"$and": [{"_id": job_oid}, {"user_id": user_match}]}
 
+    if request.method == "POST" and request.form.get("rev") is not None:
+        # the form carries the revision and values it was loaded with, so
+        # only fields the user changed are written, in one conditional update
+        try:
+            rev = int(request.form.get("rev") or 0)
+        except ValueError:
+            rev = -1
+        base = {f: request.form.get("base_" + f, "") for f in EDIT_FORM_FIELDS}
+        # blank form fields keep the value they had
+        mine = {f: (request.form.get(f) or "").strip() or base[f] for f in EDIT_FORM_FIELDS}
+        fields, error = clean_fields(mine)
+        if error:
+            flash(error, "error")
+            return render_template("edit_job.html", job=mine, base=base, rev=rev)
+
+        base_fields = clean_fields(base)[0]
+        changed = {f: fields[f] for f in EDIT_FORM_FIELDS if fields[f] != base_fields[f]}
+        if not changed:
+            flash("No changes to save.", "info")
+            return redirect(url_for("dashboard.index"))
+
+        update_doc = {**changed, "updated_at": dt.datetime.utcnow()}
+        before = db.applications.find_one_and_update(
+            {"$and": [*base_query["$and"], rev_match(rev)]},
+            {"$set": update_doc, "$inc": {"rev": 1}},
+            return_document=ReturnDocument.BEFORE,
+        )
+        if before is not None:
+            # the stored document, not the form's base_* values, is what the
+            # rollup and event log counted before this write
+            record_change(db, user_match, before=before,
+                          after={**before, **update_doc, "rev": doc_rev(before) + 1})
+            flash("Job updated successfully!", "info")
+            return redirect(url_for("dashboard.index"))
+
+        current = db.applications.find_one(base_query)
+        if not current:
+            flash("Job not found or unauthorized.", "error")
+            return redirect(url_for("dashboard.index"))
+        values, review = _merge_view(base, mine, current)
+        logger.debug("edit_job conflict _id=%s rev=%s current=%s", job_oid, rev, doc_rev(current))
+        flash("This job was changed somewhere else while you were editing. "
+              "Review the merged values below and save again.", "error")
+        return render_template("edit_job.html", job=values,
+                               base=_form_values(current), rev=doc_rev(current), review=review)
+
     job = db.applications.find_one(base_query)
     if not job:
         flash("Job not found or unauthorized.", "error")
         return redirect(url_for("dashboard.index"))
 
-    def _norm_date(s: str):
-        s = (s or "").strip()
-        if not s:
-            return ""
-        s2 = s.replace("/", "-")
-        try:
-            return dt.datetime.strptime(s2, "%Y-%m-%d").date().isoformat()
-        except Exception:
-            return s
-
     if request.method == "POST":
-        company_form  = (request.form.get("company") or "").strip()
-        role_form     = (request.form.get("role") or "").strip()
-        status_form   = (request.form.get("status") or "").strip().lower()
-        applied_form  = (request.form.get("applied_date") or "").strip()
-        deadline_form = (request.form.get("deadline") or "").strip()
-        link_form     = (request.form.get("link") or "").strip()
-        notes_form    = (request.form.get("notes") or "").strip()
-
-        company      = company_form  or (job.get("company") or "")
-        role         = role_form     or (job.get("role") or "")
-        status       = status_form   or (job.get("status") or "applied")
-        applied_date = _norm_date(applied_form or job.get("applied_date") or "")
-        deadline     = _norm_date(deadline_form or job.get("deadline") or "")
-        link         = link_form     or (job.get("link") or "")
-        notes        = notes_form    or (job.get("notes") or "")
-
-        if not company or not role:
-            flash("Company and role are required.", "error")
-            job.update({
-                "company": company, "role": role, "status": status,
-                "applied_date": applied_date or None, "deadline": deadline or None,
-                "link": link, "notes": notes,
-            })
-            return render_template("dashboard/edit_job.html", job=job)
-
-        update_doc = {
-            "company": company,
-            "role": role,
-            "status": status,
-            "applied_date": applied_date or None,
-            "deadline": deadline or None,
-            "link": link,
-            "notes": notes,
-            "updated_at": dt.datetime.utcnow().isoformat(),
-        }
-
-        db.applications.update_one(base_query, {"$set": update_doc})
+        # a form rendered before revisions existed: last write wins, as before
+        merged = {f: (request.form.get(f) or "").strip() or job.get(f)
+                  for f in EDITABLE_FIELDS}
+        fields, error = clean_fields(merged)
+        if error:
+            flash(error, "error")
+            return render_template("edit_job.html", job={**job, **fields},
+                                   base=_form_values(job), rev=doc_rev(job))
+        update_doc = {**fields, "updated_at": dt.datetime.utcnow()}
+        db.applications.update_one(base_query, {"$set": update_doc, "$inc": {"rev": 1}})
+        record_change(db, user_match, before=job, after={**job, **update_doc})
         flash("Job updated successfully!", "info")
         return redirect(url_for("dashboard.index"))
 
-    return render_template("edit_job.html", job=job)
+    return render_template("edit_job.html", job=job,
+                           base=_form_values(job), rev=doc_rev(job))
 
 @dashboard_bp.post("/status/<job_id>")
 @login_required
@@ -244,31 +272,124 @@ def update_status(job_id):
         flash("Invalid job ID.", "error")
         return redirect(url_for("dashboard.index"))
 
-    user_match = {"$in": [ObjectId(current_user.id), current_user.id]}
+    user_match = _user_match()
     base_query = {"$and": [{"_id": job_oid}, {"user_id": user_match}]}
 
     raw = (request.form.get("status") or "").strip().lower()
-    alias = {
-        "interview": "interviewing",
-    }
-    new_status = alias.get(raw, raw)
-
-    allowed = {"applied", "interviewing", "offer", "rejected"}
-    if new_status not in allowed:
-        logger.debug("update_status: invalid status raw=%r -> mapped=%r", raw, new_status)
+    new_status = normalize_status(raw, default=None)
+    if new_status is None:
+        logger.debug("update_status: invalid status raw=%r", raw)
         flash("Invalid status.", "error")
         return redirect(url_for("dashboard.index"))
 
-    db.applications.update_one(
+    before = db.applications.find_one_and_update(
         base_query,
-        {"$set": {"status": new_status, "updated_at": dt.datetime.utcnow().isoformat()}}
+        {"$set": {"status": new_status, "updated_at": dt.datetime.utcnow()}, "$inc": {"rev": 1}},
+        projection={"status": 1, "company": 1, "created_at": 1},
+        return_document=ReturnDocument.BEFORE,
     )
+    if before:
+        record_change(db, user_match, before=before, after={**before, "status": new_status})
     flash("Status updated.", "info")
 
-    return redirect(url_for(
-        "dashboard.index",
-        q=request.form.get("q") or "",
-        status=request.form.get("current_filter_status") or "",
-        sort=request.form.get("sort") or "deadline",
-        page=request.form.get("page") or 1,
-    ))
+    return _back_to_list()
+
+def _recount(db, user_oid):
+    """Repair a user's counters after a bulk write raced with another write."""
+    logger.info("bulk_update: concurrent write for user=%s, recounting", user_oid)
+    # the rollup is rebuilt by its next read, not on this request
+    rollup.mark_stale(db, user_oid)
+    buckets.rebuild_user(db, user_oid)
+
+@dashboard_bp.post("/bulk")
+@login_required
+def bulk_update():
+    """Apply one status change or delete to every selected job."""
+    db = get_db()
+    user_match = _user_match()
+
+    ids = [oid for oid in (to_object_id(x) for x in request.form.getlist("job_ids")) if oid]
+    ids = ids[:BULK_LIMIT]
+    if not ids:
+        flash("Select at least one job.", "error")
+        return _back_to_list()
+
+    query = {"user_id": user_match, "_id": {"$in": ids}}
+    projection = {"status": 1, "company": 1, "created_at": 1}
+    action = request.form.get("action")
+
+    if action == "delete":
+        before = list(db.applications.find(query, projection))
+        res = db.applications.delete_many(
+            {"user_id": user_match, "_id": {"$in": [d["_id"] for d in before]}})
+        record_changes(db, user_match, [(d, None) for d in before])
+        if res.deleted_count != len(before):
+            # some were deleted concurrently and already counted once
+            _recount(db, user_match)
+        flash(f"Deleted {res.deleted_count} job(s).", "info")
+
+    elif action == "status":
+        raw = (request.form.get("bulk_status") or "").strip().lower()
+        new_status = normalize_status(raw, default=None)
+        if new_status is None:
+            logger.debug("bulk_update: invalid status raw=%r", raw)
+            flash("Invalid status.", "error")
+            return _back_to_list()
+
+        before = list(db.applications.find({**query, "status": {"$ne": new_status}}, projection))
+        if before:
+            # one update per old status, so each row still has the status it
+            # is counted from; a row changed in between isn't matched
+            by_status = {}
+            for d in before:
+                by_status.setdefault(d.get("status"), []).append(d["_id"])
+            modified = 0
+            now = dt.datetime.utcnow()
+            for old, group in by_status.items():
+                modified += db.applications.update_many(
+                    {"user_id": user_match, "_id": {"$in": group},
+                     "status": {"$eq": old, "$ne": new_status}},
+                    {"$set": {"status": new_status, "updated_at": now}, "$inc": {"rev": 1}},
+                ).modified_count
+            record_changes(db, user_match,
+                           [(d, {**d, "status": new_status}) for d in before])
+            if modified != len(before):
+                _recount(db, user_match)
+        flash(f"Updated {len(before)} job(s).", "info")
+
+    else:
+        flash("Choose an action.", "error")
+
+    return _back_to_list()
+
+@dashboard_bp.route("/import", methods=["GET", "POST"])
+@login_required
+def import_jobs():
+    """Bulk-add applications from an uploaded CSV or JSON-lines file."""
+    if request.method == "POST":
+        file = request.files.get("file")
+        if not file or not file.filename:
+            flash("Choose a CSV or JSON-lines file to import.", "error")
+            return redirect(url_for("dashboard.import_jobs"))
+
+        fmt = detect_format(file.filename)
+        result = import_rows(get_db(), _user_match(), iter_rows(file.stream, fmt))
+
+        if result.file_error:
+            flash(result.file_error, "error")
+        flash(f"Imported {result.inserted} job(s).", "info")
+        if result.failed:
+            flash(f"{result.failed} row(s) were skipped.", "error")
+        return render_template("import_jobs.html", result=result)
+
+    return render_template("import_jobs.html", result=None)
+
+@dashboard_bp.get("/export.csv")
+@login_required
+def export_jobs():
+    """Stream every application as CSV straight from the cursor."""
+    return Response(
+        stream_with_context(export_csv(get_db(), _user_match())),
+        mimetype="text/csv",
+        headers={"Content-Disposition": "attachment; filename=applications.csv"},
+    )
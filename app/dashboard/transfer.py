@@ -0,0 +1,148 @@
+"""Bulk CSV / JSON-lines import and streaming CSV export of applications."""
+import csv
+import datetime as dt
+import io
+import json
+import logging
+from typing import Iterable, Iterator, Tuple
+
+from pymongo.errors import BulkWriteError
+
+from ..models.application import EDITABLE_FIELDS, clean_fields, format_date, to_datetime
+from .changes import record_changes
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+
+EXPORT_FIELDS = EDITABLE_FIELDS + ("created_at", "updated_at")
+
+
+def detect_format(filename: str) -> str:
+    name = (filename or "").lower()
+    if name.endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    return "csv"
+
+
+def iter_rows(stream, fmt: str) -> Iterator[Tuple[int, object]]:
+    """
+    Yield (line_number, row) from a binary stream without reading it all
+    into memory. A row is a dict, or an error string for unparseable lines.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        if reader.fieldnames:
+            reader.fieldnames = [(h or "").strip().lower() for h in reader.fieldnames]
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_no, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_no, f"Invalid JSON: {e}"
+            continue
+        yield line_no, row if isinstance(row, dict) else "Expected a JSON object."
+
+
+class ImportResult:
+    def __init__(self):
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []        # (line, message), capped at MAX_REPORTED_ERRORS
+        self.file_error = None  # why the rest of the file couldn't be read
+
+    def error(self, line: int, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+def import_rows(db, user_oid, rows: Iterable[Tuple[int, object]],
+                batch_size: int = BATCH_SIZE) -> ImportResult:
+    """
+    Validate rows with the add/edit form rules and insert them in unordered
+    batches. Bad rows are reported by line and don't stop the import; a
+    file that can't be decoded or parsed stops it with result.file_error
+    (rows read before that point are still imported).
+    """
+    result = ImportResult()
+    batch, lines = [], []
+
+    def flush():
+        if not batch:
+            return
+        failed_idx = set()
+        try:
+            db.applications.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            for err in e.details.get("writeErrors", []):
+                failed_idx.add(err["index"])
+                result.error(lines[err["index"]], err.get("errmsg", "Write failed."))
+        written = [d for i, d in enumerate(batch) if i not in failed_idx]
+        result.inserted += len(written)
+        record_changes(db, user_oid, [(None, d) for d in written])
+        batch.clear()
+        lines.clear()
+
+    now = dt.datetime.utcnow()
+    try:
+        for line, row in rows:
+            if isinstance(row, str):
+                result.error(line, row)
+                continue
+            fields, error = clean_fields({k: row.get(k) for k in EDITABLE_FIELDS})
+            if error:
+                result.error(line, error)
+                continue
+            created = to_datetime(row.get("created_at")) or now
+            batch.append({"user_id": user_oid, **fields,
+                          "created_at": created, "updated_at": now, "rev": 1})
+            lines.append(line)
+            if len(batch) >= batch_size:
+                flush()
+    except UnicodeDecodeError:
+        result.file_error = "The file isn't UTF-8 text. Save it as \"CSV UTF-8\" and try again."
+    except csv.Error as e:
+        result.file_error = f"The file isn't valid CSV: {e}."
+    flush()
+    if result.file_error:
+        logger.warning("Import for %s stopped: %s", user_oid, result.file_error)
+
+    logger.info("Import for %s: inserted=%d failed=%d", user_oid, result.inserted, result.failed)
+    return result
+
+
+def _cell(field: str, value) -> str:
+    if field in ("deadline", "applied_date"):
+        return format_date(value)
+    if isinstance(value, dt.datetime):
+        return value.isoformat()
+    return value or ""
+
+
+def export_csv(db, user_oid) -> Iterator[str]:
+    """Yield the user's applications as CSV text, one row at a time."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+
+    def emit(values):
+        writer.writerow(values)
+        out = buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+        return out
+
+    yield emit(EXPORT_FIELDS)
+    projection = {f: 1 for f in EXPORT_FIELDS}
+    cursor = (db.applications.find({"user_id": user_oid}, projection)
+              .sort("created_at", 1)
+              .batch_size(BATCH_SIZE))
+    for doc in cursor:
+        yield emit([_cell(f, doc.get(f)) for f in EXPORT_FIELDS])
@@ -1,16 +1,453 @@
 import os
-from pymongo import MongoClient
+import logging
+import threading
+import datetime as dt
+from pymongo import MongoClient, ASCENDING, DESCENDING, TEXT, IndexModel, UpdateOne, monitoring
+from bson import ObjectId
+from flask import g, has_request_context
+
+from .models.application import DATE_FIELDS, to_datetime, to_object_id
+
+logger = logging.getLogger(__name__)
+
+APPLICATION_INDEXES = [
+    # list pages sort on (field, _id) for keyset cursors; _id in the key
+    # lets the index return them in order instead of a blocking SORT
+    IndexModel([("user_id", ASCENDING), ("deadline", ASCENDING), ("_id", ASCENDING)],
+               name="user_deadline_id"),
+    IndexModel([("user_id", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)],
+               name="user_updated_id"),
+    IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)],
+               name="user_created"),
+    IndexModel([("user_id", ASCENDING), ("status", ASCENDING), ("deadline", ASCENDING),
+                ("_id", ASCENDING)],
+               name="user_status_deadline_id"),
+    # dashboard search; $text queries must match user_id exactly to use it.
+    # language "none" keeps stop words like "it" searchable.
+    IndexModel([("user_id", ASCENDING), ("company", TEXT), ("role", TEXT), ("notes", TEXT)],
+               name="user_text", weights={"company": 10, "role": 5, "notes": 1},
+               default_language="none"),
+    # deadline reminder scan across all users (app/reminders.py)
+    IndexModel([("deadline", ASCENDING), ("_id", ASCENDING)], name="deadline_scan"),
+]
+
+# replaced by the *_id variants above; dropped by ensure_indexes
+SUPERSEDED_APPLICATION_INDEXES = ("user_deadline", "user_updated", "user_status_deadline")
+
+USER_INDEXES = [
+    IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+]
+
+# server-side sessions (SESSION_BACKEND=mongo)
+SESSION_INDEXES = [
+    IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    IndexModel([("user_id", ASCENDING), ("updated_at", DESCENDING)], name="user_updated"),
+]
+
+# login throttle counters (RATE_LIMIT_BACKEND=mongo); removed once expired
+RATE_LIMIT_INDEXES = [
+    IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+]
+
+# append-only status history (app/stats/events.py)
+EVENT_INDEXES = [
+    IndexModel([("u", ASCENDING), ("ts", DESCENDING)], name="user_ts"),
+    IndexModel([("a", ASCENDING), ("ts", ASCENDING)], name="app_ts"),
+]
+
+# per-user daily/weekly/monthly counts (app/stats/buckets.py); g_start serves compaction
+BUCKET_INDEXES = [
+    IndexModel([("u", ASCENDING), ("start", ASCENDING)], name="user_start"),
+    IndexModel([("g", ASCENDING), ("start", ASCENDING)], name="g_start"),
+]
+
+# deadline reminder queue: due-job claims, and removal a week after the deadline
+REMINDER_JOB_INDEXES = [
+    IndexModel([("status", ASCENDING), ("run_at", ASCENDING)], name="status_run_at"),
+    IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+]
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """CMAP listener keeping per-server connection pool counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._servers = {}
+
+    def _bump(self, address, **deltas):
+        key = "%s:%s" % address
+        with self._lock:
+            row = self._servers.setdefault(key, {
+                "open": 0, "checked_out": 0, "max_checked_out": 0,
+                "created": 0, "closed": 0, "checkouts": 0, "checkout_failures": 0,
+                "wait_ms_total": 0.0, "wait_ms_max": 0.0, "cleared": 0,
+            })
+            wait_ms = deltas.pop("wait_ms", None)
+            for k, v in deltas.items():
+                row[k] += v
+            row["max_checked_out"] = max(row["max_checked_out"], row["checked_out"])
+            if wait_ms is not None:
+                row["wait_ms_total"] += wait_ms
+                row["wait_ms_max"] = max(row["wait_ms_max"], wait_ms)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {k: dict(v) for k, v in self._servers.items()}
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_check_out_started(self, event): pass
+
+    def pool_cleared(self, event):
+        self._bump(event.address, cleared=1)
+
+    def connection_created(self, event):
+        self._bump(event.address, open=1, created=1)
+
+    def connection_closed(self, event):
+        self._bump(event.address, open=-1, closed=1)
+
+    def connection_checked_out(self, event):
+        self._bump(event.address, checked_out=1, checkouts=1,
+                   wait_ms=(event.duration or 0) * 1000)
+
+    def connection_check_out_failed(self, event):
+        self._bump(event.address, checkout_failures=1,
+                   wait_ms=(event.duration or 0) * 1000)
+
+    def connection_checked_in(self, event):
+        self._bump(event.address, checked_out=-1)
+
+
+class CommandTimer(monitoring.CommandListener):
+    """
+    Counts commands and their server round-trip time, per command name for
+    the process and, inside a Flask request, on g for that request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._commands = {}         # name -> [count, seconds, failures]
+
+    def _record(self, event, failed):
+        seconds = event.duration_micros / 1e6
+        with self._lock:
+            row = self._commands.setdefault(event.command_name, [0, 0.0, 0])
+            row[0] += 1
+            row[1] += seconds
+            row[2] += failed
+        if has_request_context():
+            timing = g.setdefault("_mongo_timing", [0, 0.0])
+            timing[0] += 1
+            timing[1] += seconds
+
+    def started(self, event): pass
+
+    def succeeded(self, event):
+        self._record(event, 0)
+
+    def failed(self, event):
+        self._record(event, 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {k: {"count": c, "seconds": s, "failures": f}
+                    for k, (c, s, f) in self._commands.items()}
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+_pool_stats = PoolStats()
+_command_timer = CommandTimer()
+
+
+def _int_env(name: str, default=None):
+    raw = os.getenv(name)
+    return int(raw) if raw not in (None, "") else default
+
+
+def client_options() -> dict:
+    """MongoClient keyword arguments from MONGO_* environment variables."""
+    opts = {
+        "maxPoolSize": _int_env("MONGO_MAX_POOL_SIZE", 100),
+        "minPoolSize": _int_env("MONGO_MIN_POOL_SIZE", 0),
+        "serverSelectionTimeoutMS": _int_env("MONGO_SERVER_SELECTION_TIMEOUT_MS", 30000),
+        "event_listeners": [_pool_stats, _command_timer],
+    }
+    wait_queue_timeout = _int_env("MONGO_WAIT_QUEUE_TIMEOUT_MS")
+    if wait_queue_timeout is not None:
+        opts["waitQueueTimeoutMS"] = wait_queue_timeout
+    max_idle = _int_env("MONGO_MAX_IDLE_TIME_MS")
+    if max_idle is not None:
+        opts["maxIdleTimeMS"] = max_idle
+    compressors = (os.getenv("MONGO_COMPRESSORS") or "").strip()
+    if compressors:
+        opts["compressors"] = compressors
+    return opts
+
+
+def get_client() -> MongoClient:
+    """
+    The MongoClient for this process. A client created before a fork is
+    never reused in the child: each worker builds its own on first use.
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                _client = MongoClient(os.getenv("MONGO_URI"), **client_options())
+                _client_pid = pid
+                logger.debug("MongoClient created for pid %s", pid)
+    return _client
+
+
+def _forget_client():
+    # runs in the child right after fork; the parent's client stays with the parent
+    global _client, _client_pid, _client_lock
+    _client, _client_pid = None, None
+    _client_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_client)
 
-client = None
 
 def get_db():
     """
     Return handle to the MongoDB database
     """
-    global client
-    uri = os.getenv("MONGO_URI")
-    db_name = os.getenv("DB_NAME", "job_trackr")
+    return get_client()[os.getenv("DB_NAME", "job_trackr")]
+
+
+def prewarm_pool():
+    """
+    Connect now instead of on the first request: selects a server and opens
+    a connection. With MONGO_MIN_POOL_SIZE set, PyMongo's background task
+    then keeps that many connections open. Call after fork, e.g. from a
+    gunicorn post_fork hook.
+    """
+    get_client().admin.command("ping")
+    logger.info("Mongo pool pre-warmed: %s", pool_stats())
+
+
+def pool_stats() -> dict:
+    """Connection pool counters per server, from CMAP events."""
+    return _pool_stats.snapshot()
+
+
+def command_stats() -> dict:
+    """Command counts / seconds / failures per command name in this process."""
+    return _command_timer.snapshot()
 
-    if client is None: client = MongoClient(uri)
 
-    return client[db_name]
+def request_mongo_timing():
+    """(commands, seconds) issued by the current request so far."""
+    count, seconds = g.get("_mongo_timing", (0, 0.0))
+    return count, seconds
+
+
+def ensure_indexes(db):
+    """
+    Create the indexes the hot queries rely on. Safe to run repeatedly:
+    create_indexes is a no-op for indexes that already exist.
+    """
+    created = {
+        "applications": db.applications.create_indexes(APPLICATION_INDEXES),
+        "users": db.users.create_indexes(USER_INDEXES),
+        "rate_limits": db.rate_limits.create_indexes(RATE_LIMIT_INDEXES),
+        "sessions": db.sessions.create_indexes(SESSION_INDEXES),
+        "application_events": db.application_events.create_indexes(EVENT_INDEXES),
+        "stats_buckets": db.stats_buckets.create_indexes(BUCKET_INDEXES),
+        "reminder_jobs": db.reminder_jobs.create_indexes(REMINDER_JOB_INDEXES),
+    }
+    # only after their replacements exist, so the list never goes unindexed
+    existing = set(db.applications.index_information())
+    for name in SUPERSEDED_APPLICATION_INDEXES:
+        if name in existing:
+            db.applications.drop_index(name)
+    logger.info("ensure_indexes: %s", created)
+    return created
+
+
+def migrate_user_ids(db) -> int:
+    """
+    One-time migration: give users whose _id isn't an ObjectId (or its hex)
+    a new ObjectId _id and move their applications over. The app only
+    serves ObjectId owners. Returns the number of users re-keyed.
+    """
+    moved = 0
+    for doc in db.users.find({"_id": {"$not": {"$type": "objectId"}}}):
+        old = doc["_id"]
+        if ObjectId.is_valid(old):
+            continue                    # hex strings already map to an ObjectId
+        new = ObjectId()
+        # the unique email index allows one copy at a time: swap, and put
+        # the old document back if the insert fails
+        db.users.delete_one({"_id": old})
+        try:
+            db.users.insert_one({**doc, "_id": new})
+        except Exception:
+            db.users.insert_one(doc)
+            raise
+        db.applications.update_many({"user_id": old}, {"$set": {"user_id": new}})
+        moved += 1
+    logger.info("migrate_user_ids: re-keyed %d user(s)", moved)
+    return moved
+
+
+def migrate_legacy_types(db, batch_size: int = 500) -> int:
+    """
+    One-time migration: string user_id -> ObjectId and ISO-string dates ->
+    BSON dates on applications. Returns the number of documents updated.
+    """
+    legacy = {"$or": [{"user_id": {"$type": "string"}}]
+                     + [{f: {"$type": "string"}} for f in DATE_FIELDS]}
+    projection = {"user_id": 1, **{f: 1 for f in DATE_FIELDS}}
+
+    updated = 0
+    ops = []
+    for doc in db.applications.find(legacy, projection):
+        fix = {}
+        if isinstance(doc.get("user_id"), str):
+            oid = to_object_id(doc["user_id"])
+            if oid is not None:
+                fix["user_id"] = oid
+        for f in DATE_FIELDS:
+            raw = doc.get(f)
+            if isinstance(raw, str):
+                value = to_datetime(raw)
+                if value is None and raw.strip():
+                    logger.warning("migrate: leaving unparseable %s=%r on %s", f, raw, doc["_id"])
+                    continue
+                fix[f] = value
+        if fix:
+            ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": fix}))
+        if len(ops) >= batch_size:
+            updated += db.applications.bulk_write(ops, ordered=False).modified_count
+            ops = []
+    if ops:
+        updated += db.applications.bulk_write(ops, ordered=False).modified_count
+
+    logger.info("migrate_legacy_types: updated %d application(s)", updated)
+    return updated
+
+
+def _hot_queries(user_oid: ObjectId):
+    """(name, command) for every query on a request hot path."""
+    today = dt.datetime.combine(dt.date.today(), dt.time())
+    by_user = {"user_id": user_oid}
+    return [
+        # a keyset page past a cursor (dashboard_snapshot / page_plan): both
+        # the predicate and the sort must come from the index
+        ("dashboard.page.deadline", {
+            "find": "applications",
+            "filter": {"$and": [by_user, {"$or": [
+                {"deadline": {"$gt": today}}, {"deadline": today, "_id": {"$gt": user_oid}}]}]},
+            "sort": {"deadline": 1, "_id": 1}, "limit": 11,
+        }),
+        ("dashboard.page.updated", {
+            "find": "applications",
+            "filter": {"$and": [by_user, {"$or": [
+                {"updated_at": {"$lt": today}}, {"updated_at": today, "_id": {"$lt": user_oid}},
+                {"updated_at": None}]}]},
+            "sort": {"updated_at": -1, "_id": -1}, "limit": 11,
+        }),
+        ("dashboard.upcoming", {
+            "find": "applications",
+            "filter": {**by_user,
+                       "deadline": {"$gte": today, "$lte": today + dt.timedelta(days=14)},
+                       "status": {"$nin": ["rejected", "accepted"]}},
+            "sort": {"deadline": 1}, "limit": 5,
+        }),
+        ("dashboard.list.deadline", {
+            "find": "applications", "filter": by_user, "sort": {"deadline": 1, "_id": 1}, "limit": 11,
+        }),
+        ("dashboard.list.updated", {
+            "find": "applications", "filter": by_user, "sort": {"updated_at": -1, "_id": -1},
+            "limit": 11,
+        }),
+        ("dashboard.list.status", {
+            "find": "applications", "filter": {**by_user, "status": "applied"},
+            "sort": {"deadline": 1, "_id": 1}, "limit": 11,
+        }),
+        ("dashboard.search", {
+            "find": "applications",
+            "filter": {**by_user, "$text": {"$search": "engineer"}},
+            "projection": {"score": {"$meta": "textScore"}},
+            "sort": {"score": {"$meta": "textScore"}}, "limit": 11,
+        }),
+        ("stats.recent", {
+            "find": "applications", "filter": by_user,
+            "sort": {"created_at": -1}, "limit": 5,
+        }),
+        ("stats.upcoming", {
+            "find": "applications",
+            "filter": {**by_user,
+                       "deadline": {"$gte": today, "$lte": today + dt.timedelta(days=14)}},
+            "sort": {"deadline": 1}, "limit": 3,
+        }),
+        ("stats.timeline", {
+            "aggregate": "application_events",
+            "pipeline": [{"$match": {"u": user_oid, "ts": {"$gte": today - dt.timedelta(days=180)},
+                                     "k": {"$in": ["c", "s", "d"]}}}],
+            "cursor": {},
+        }),
+        ("stats.series", {
+            "find": "stats_buckets",
+            "filter": {"u": user_oid, "start": {"$gte": today - dt.timedelta(days=84),
+                                                "$lte": today}},
+            "sort": {"start": 1},
+        }),
+        ("stats.rollup", {
+            "find": "user_stats", "filter": {"_id": user_oid},
+        }),
+        ("users.by_email", {
+            "find": "users", "filter": {"email": "someone@example.com"},
+        }),
+        ("reminders.scan", {
+            "find": "applications",
+            "filter": {"deadline": {"$gte": today, "$lt": today + dt.timedelta(days=8)},
+                       "status": {"$nin": ["rejected", "accepted"]}},
+            "sort": {"deadline": 1, "_id": 1}, "limit": 1000,
+        }),
+        ("reminders.claim", {
+            "find": "reminder_jobs",
+            "filter": {"status": {"$in": ["pending", "running"]}, "run_at": {"$lte": today}},
+            "sort": {"run_at": 1}, "limit": 100,
+        }),
+    ]
+
+
+# hot queries whose sort can't come from an index (textScore is computed)
+MEMORY_SORT_OK = {"dashboard.search"}
+
+
+def _has_stage(plan, stages) -> bool:
+    if isinstance(plan, dict):
+        if plan.get("stage") in stages:
+            return True
+        return any(_has_stage(v, stages) for k, v in plan.items() if k != "rejectedPlans")
+    if isinstance(plan, list):
+        return any(_has_stage(v, stages) for v in plan)
+    return False
+
+
+def find_collscans(db) -> list:
+    """
+    Explain every hot query and return the names of those whose winning
+    plan falls back to a collection scan or a blocking in-memory SORT. An
+    empty list means all indexed.
+    """
+    offenders = []
+    for name, command in _hot_queries(ObjectId()):
+        explained = db.command({"explain": command, "verbosity": "queryPlanner"})
+        bad = {"COLLSCAN"} if name in MEMORY_SORT_OK else {"COLLSCAN", "SORT"}
+        if _has_stage(explained, bad):
+            offenders.append(name)
+        logger.debug("explain %s: offender=%s", name, name in offenders)
+    return offenders
@@ -0,0 +1,64 @@
+"""
+Rendered-fragment cache for per-user template sections.
+
+    {% cache frag_key, "upcoming" %} ... {% endcache %}
+
+The key joins the arguments; views pass `frag_key` from fragment_key(),
+which includes the user's data version, so any application write makes
+the old fragments unreachable. record_changes() also drops them from this
+process right away to free the memory.
+"""
+import datetime as dt
+import time
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from .cache import FragmentCache
+from .conditional import CODE_TOKEN, data_version
+
+cache = FragmentCache()
+
+
+def configure(max_bytes: int, spill_dir: str = None, disk_max_bytes: int = 256 << 20):
+    global cache
+    cache = FragmentCache(max_bytes, spill_dir or None, disk_max_bytes)
+
+
+def fragment_key(db, user_oid) -> str:
+    """Key prefix for the user's fragments as of now."""
+    return ":".join([str(user_oid), str(data_version(db, user_oid)),
+                     dt.datetime.utcnow().date().isoformat(), CODE_TOKEN])
+
+
+def invalidate_user(user_oid):
+    cache.drop_prefix(f"{user_oid}:")
+
+
+def stats() -> dict:
+    return cache.stats()
+
+
+class FragmentCacheExtension(Extension):
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            parts.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        return nodes.CallBlock(self.call_method("_render", [nodes.List(parts)]),
+                               [], [], body).set_lineno(lineno)
+
+    def _render(self, parts, caller):
+        if cache.max_bytes <= 0:
+            return caller()
+        key = ":".join(str(p) for p in parts)
+        text = cache.get(key)
+        if text is None:
+            t0 = time.perf_counter()
+            text = str(caller())
+            cache.set(key, text, time.perf_counter() - t0)
+        return Markup(text)
@@ -0,0 +1,110 @@
+"""
+JSON plumbing for the /api/v1 endpoints.
+
+FastJSONProvider replaces Flask's encoder app-wide: it uses orjson when
+installed and the stdlib otherwise, and writes ObjectId as its hex string
+and datetimes as ISO 8601 UTC ("...Z") either way. ApiError (and 401s from
+api_login_required) come back as {"error": message} JSON, never as HTML or
+a redirect to the login page.
+"""
+import datetime as dt
+import functools
+import json
+
+from bson import ObjectId
+from flask import request
+from flask.json.provider import JSONProvider
+from flask_login import current_user
+
+try:
+    import orjson
+except ImportError:         # optional speedup, see requirements.txt
+    orjson = None
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _default(o):
+    if isinstance(o, ObjectId):
+        return str(o)
+    if isinstance(o, dt.datetime):
+        if o.tzinfo:
+            o = o.astimezone(dt.timezone.utc).replace(tzinfo=None)
+        return o.isoformat() + "Z"
+    if isinstance(o, dt.date):
+        return o.isoformat()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def dumps_bytes(obj) -> bytes:
+        return orjson.dumps(obj, default=_default, option=_OPTIONS)
+
+    loads = orjson.loads
+else:
+    _encoder = json.JSONEncoder(default=_default, separators=(",", ":"), ensure_ascii=False)
+
+    def dumps_bytes(obj) -> bytes:
+        return _encoder.encode(obj).encode()
+
+    loads = json.loads
+
+
+class FastJSONProvider(JSONProvider):
+    def dumps(self, obj, **kwargs) -> str:
+        return dumps_bytes(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj), mimetype="application/json")
+
+
+def api_login_required(view):
+    """login_required that answers 401 JSON instead of redirecting."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_user.is_authenticated:
+            raise ApiError(401, "Authentication required.")
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def json_body() -> dict:
+    """The request's JSON object. Requiring the JSON content type also keeps
+    cross-site HTML forms (which can't send it) from driving the API."""
+    if not request.is_json:
+        raise ApiError(415, "Expected an application/json body.")
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        raise ApiError(400, "Expected a JSON object.")
+    return body
+
+
+def parse_fields(raw: str, allowed) -> dict:
+    """Mongo projection for a ?fields=a,b list; None when not given."""
+    names = [f.strip() for f in (raw or "").split(",") if f.strip()]
+    if not names:
+        return None
+    unknown = [f for f in names if f not in allowed]
+    if unknown:
+        raise ApiError(400, f"Unknown field(s): {', '.join(unknown)}.")
+    return dict.fromkeys(names, 1)
+
+
+def _handle_api_error(e: ApiError):
+    return {"error": e.message}, e.status
+
+
+def init_app(app):
+    app.json = FastJSONProvider(app)
+    app.register_error_handler(ApiError, _handle_api_error)
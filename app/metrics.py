@@ -0,0 +1,190 @@
+"""
+Per-request timing and a Prometheus text endpoint.
+
+Every request gets its total time, the Mongo commands it issued (from the
+CommandTimer listener in db.py) and the time spent rendering templates.
+These go out as a Server-Timing header, feed per-endpoint latency
+histograms served at /metrics, and requests slower than SLOW_REQUEST_MS
+are logged with the breakdown. Metrics are per worker process.
+"""
+import logging
+import threading
+import time
+
+from flask import (Response, abort, current_app, g, request, template_rendered,
+                   before_render_template)
+
+from .db import command_stats, pool_stats, request_mongo_timing
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label tuple."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._series = {}           # labels -> [bucket counts..., +Inf], sum
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        with self._lock:
+            counts, total = self._series.get(labels) or ([0] * (len(self.buckets) + 1), 0.0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-1] += 1
+            self._series[labels] = (counts, total + value)
+
+    def items(self):
+        with self._lock:
+            return [(k, list(c), s) for k, (c, s) in self._series.items()]
+
+
+class Counter:
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def items(self):
+        with self._lock:
+            return list(self._values.items())
+
+
+request_seconds = Histogram()
+render_seconds = Histogram()
+requests_total = Counter()
+
+_config = {"slow_ms": 500.0, "server_timing": True, "token": ""}
+
+
+def _before_request():
+    g._t0 = time.perf_counter()
+    g._render_seconds = 0.0
+
+
+def _before_render(app, template, context, **extra):
+    g._render_t0 = time.perf_counter()
+
+
+def _rendered(app, template, context, **extra):
+    t0 = g.pop("_render_t0", None)
+    if t0 is not None:
+        seconds = time.perf_counter() - t0
+        g._render_seconds = g.get("_render_seconds", 0.0) + seconds
+        render_seconds.observe((template.name or "?",), seconds)
+
+
+def _after_request(response):
+    t0 = g.get("_t0")
+    if t0 is None:
+        return response
+    total = time.perf_counter() - t0
+    db_count, db_seconds = request_mongo_timing()
+    render = g.get("_render_seconds", 0.0)
+    endpoint = request.endpoint or "unmatched"
+
+    request_seconds.observe((endpoint, request.method), total)
+    requests_total.inc((endpoint, request.method, str(response.status_code)))
+
+    if _config["server_timing"]:
+        response.headers["Server-Timing"] = ", ".join([
+            f'db;dur={db_seconds * 1000:.1f};desc="{db_count} mongo commands"',
+            f"render;dur={render * 1000:.1f}",
+            f"total;dur={total * 1000:.1f}",
+        ])
+    if total * 1000 >= _config["slow_ms"]:
+        logger.warning(
+            "Slow request %s %s (%s) -> %s: %.0f ms total, %d mongo commands %.0f ms, render %.0f ms",
+            request.method, request.path, endpoint, response.status_code,
+            total * 1000, db_count, db_seconds * 1000, render * 1000)
+    return response
+
+
+def _label(**labels) -> str:
+    parts = []
+    for k, v in labels.items():
+        v = str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _histogram_lines(name, help_text, hist, label_names):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for labels, counts, total in sorted(hist.items()):
+        base = dict(zip(label_names, labels))
+        for bound, count in zip([*map(str, hist.buckets), "+Inf"], counts):
+            lines.append(f"{name}_bucket{_label(**base, le=bound)} {count}")
+        lines.append(f"{name}_sum{_label(**base)} {total:.6f}")
+        lines.append(f"{name}_count{_label(**base)} {counts[-1]}")
+    return lines
+
+
+def render_metrics() -> str:
+    from . import fragments
+
+    lines = _histogram_lines("http_request_duration_seconds", "Request latency by endpoint.",
+                             request_seconds, ("endpoint", "method"))
+    lines += ["# HELP http_requests_total Requests by endpoint and status.",
+              "# TYPE http_requests_total counter"]
+    for (endpoint, method, status), n in sorted(requests_total.items()):
+        lines.append(f"http_requests_total{_label(endpoint=endpoint, method=method, status=status)} {n}")
+    lines += _histogram_lines("template_render_seconds", "Jinja render time by template.",
+                              render_seconds, ("template",))
+
+    commands = command_stats()
+    lines += ["# HELP mongo_commands_total Mongo commands by name.",
+              "# TYPE mongo_commands_total counter"]
+    lines += [f"mongo_commands_total{_label(command=k)} {v['count']}" for k, v in sorted(commands.items())]
+    lines += ["# HELP mongo_command_seconds_total Time in Mongo commands by name.",
+              "# TYPE mongo_command_seconds_total counter"]
+    lines += [f"mongo_command_seconds_total{_label(command=k)} {v['seconds']:.6f}"
+              for k, v in sorted(commands.items())]
+    lines += ["# HELP mongo_command_failures_total Failed Mongo commands by name.",
+              "# TYPE mongo_command_failures_total counter"]
+    lines += [f"mongo_command_failures_total{_label(command=k)} {v['failures']}"
+              for k, v in sorted(commands.items())]
+
+    lines += ["# HELP mongo_pool Connection pool counters per server (CMAP events).",
+              "# TYPE mongo_pool gauge"]
+    for server, row in sorted(pool_stats().items()):
+        for stat, value in sorted(row.items()):
+            lines.append(f"mongo_pool{_label(server=server, stat=stat)} {value}")
+
+    lines += ["# HELP app_startup_seconds create_app() time by phase in this worker.",
+              "# TYPE app_startup_seconds gauge"]
+    for phase, seconds in current_app.extensions.get("startup_seconds", {}).items():
+        lines.append(f"app_startup_seconds{_label(phase=phase)} {seconds:.6f}")
+
+    lines += ["# HELP fragment_cache Rendered-fragment cache counters.",
+              "# TYPE fragment_cache gauge"]
+    for stat, value in sorted(fragments.stats().items()):
+        lines.append(f"fragment_cache{_label(stat=stat)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def _metrics_view():
+    token = _config["token"]
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        abort(401)
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+
+def init_app(app, slow_ms: float = 500, server_timing: bool = True, token: str = "",
+             require_token: bool = False):
+    """With require_token (production), /metrics is only served behind a token."""
+    _config.update(slow_ms=slow_ms, server_timing=server_timing, token=token)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_rendered, app)
+    if require_token and not token:
+        logger.warning("/metrics is disabled: set METRICS_TOKEN to expose it")
+        return
+    app.add_url_rule("/metrics", "metrics", _metrics_view)
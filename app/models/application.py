@@ -0,0 +1,154 @@
+import datetime as dt
+from typing import Optional, Tuple
+
+from bson.objectid import ObjectId
+
+# Fields stored as BSON dates on application documents.
+DATE_FIELDS = ("created_at", "updated_at", "deadline", "applied_date")
+
+# Legacy status spellings and the bucket they are counted under.
+STATUS_ALIASES = {"interview": "interviewing", "offered": "offer"}
+
+# Statuses a user can set on an application.
+ALLOWED_STATUSES = ("applied", "interviewing", "offer", "rejected", "accepted")
+
+# Fields a user supplies (forms, imports); everything else is server-set.
+EDITABLE_FIELDS = ("company", "role", "status", "deadline", "applied_date", "link", "notes")
+
+# Fields the JSON API returns (and accepts in ?fields=); "id" is always included.
+API_FIELDS = EDITABLE_FIELDS + ("created_at", "updated_at", "rev")
+
+# Same folding as status_bucket(), as an aggregation expression.
+STATUS_BUCKET_EXPR = {
+    "$let": {
+        "vars": {"s": {"$toLower": {"$ifNull": ["$status", ""]}}},
+        "in": {"$switch": {
+            "branches": [{"case": {"$eq": ["$$s", alias]}, "then": bucket}
+                         for alias, bucket in STATUS_ALIASES.items()],
+            "default": "$$s",
+        }},
+    }
+}
+
+
+def status_bucket(status) -> str:
+    """Fold a stored status into the key it is counted under."""
+    s = (status or "").strip().lower()
+    return STATUS_ALIASES.get(s, s)
+
+
+def normalize_status(raw, default: Optional[str] = "applied") -> Optional[str]:
+    """Lower-case and de-alias a submitted status; None if not allowed."""
+    if raw is not None and not isinstance(raw, str):
+        return None
+    s = (raw or "").strip().lower() or (default or "")
+    s = STATUS_ALIASES.get(s, s)
+    return s if s in ALLOWED_STATUSES else None
+
+
+def clean_fields(data) -> Tuple[dict, Optional[str]]:
+    """
+    Validate user-supplied application fields (a form or an import row).
+    Returns (fields, error); fields keep the raw text of bad dates so a form
+    can be re-rendered with what was typed.
+    """
+    def text(key, limit):
+        v = data.get(key)
+        return (v.strip() if isinstance(v, str) else "")[:limit]
+
+    fields = {
+        "company": text("company", 200),
+        "role": text("role", 200),
+        "status": normalize_status(data.get("status")),
+        "link": text("link", 2000),
+        "notes": text("notes", 5000),
+    }
+    error = None
+    for f in ("deadline", "applied_date"):
+        raw = data.get(f)
+        value = to_datetime(raw) if isinstance(raw, (str, dt.date)) else None
+        # anything given that isn't a date (or a blank string) is a mistake
+        if value is None and (raw.strip() if isinstance(raw, str) else raw is not None):
+            error = error or "Dates must be in yyyy-mm-dd or yyyy/mm/dd format."
+            value = raw.strip() if isinstance(raw, str) else str(raw)
+        fields[f] = value
+
+    if not fields["company"] or not fields["role"]:
+        error = "Company and role are required."
+    elif fields["status"] is None:
+        error = "Invalid status."
+        raw = data.get("status")
+        fields["status"] = raw.strip().lower() if isinstance(raw, str) else ""
+    return fields, error
+
+
+def to_object_id(value) -> Optional[ObjectId]:
+    """Return value as an ObjectId, or None if it isn't a valid id."""
+    if isinstance(value, ObjectId):
+        return value
+    if value is None:
+        return None         # ObjectId(None) would generate a new id
+    try:
+        return ObjectId(value)
+    except Exception:
+        return None
+
+
+def to_datetime(value) -> Optional[dt.datetime]:
+    """
+    Coerce a stored or submitted date into a naive UTC datetime.
+    Accepts datetimes, dates, ISO strings and yyyy/mm/dd. Returns None when
+    the value is empty or can't be parsed.
+    """
+    if value is None:
+        return None
+    if isinstance(value, dt.datetime):
+        if value.tzinfo:
+            value = value.astimezone(dt.timezone.utc).replace(tzinfo=None)
+        return value
+    if isinstance(value, dt.date):
+        return dt.datetime.combine(value, dt.time())
+
+    s = str(value).strip().replace("/", "-")
+    if not s:
+        return None
+    try:
+        parsed = dt.datetime.fromisoformat(s)
+    except ValueError:
+        try:
+            parsed = dt.datetime.strptime(s, "%Y-%m-%d")
+        except ValueError:
+            return None
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(dt.timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def format_date(value, fmt: str = "%Y-%m-%d") -> str:
+    """Jinja filter: render a stored date (or legacy string) for display."""
+    if not value:
+        return ""
+    if isinstance(value, (dt.datetime, dt.date)):
+        return value.strftime(fmt)
+    return str(value)
+
+
+def doc_rev(doc: dict) -> int:
+    """
+    An application's revision: every write $incs `rev`. Documents from
+    before revisions have none and count as rev 0.
+    """
+    return int(doc.get("rev") or 0)
+
+
+def rev_match(rev: int) -> dict:
+    """Filter for an application still at revision `rev` (not edited since)."""
+    # null also matches a missing field
+    return {"rev": rev} if rev else {"rev": {"$in": [None, 0]}}
+
+
+def to_public(doc: dict, fields=None) -> dict:
+    """An application as the JSON API returns it: string id, no owner."""
+    out = {"id": str(doc["_id"])}
+    out.update((k, doc[k]) for k in API_FIELDS if k in doc and (not fields or k in fields))
+    return out
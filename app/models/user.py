@@ -1,8 +1,29 @@
+import logging
+
+from flask import g, has_app_context
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
 from bson.objectid import ObjectId
 from typing import Optional, Tuple
 
+from .. import passwords
+from ..cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Process-wide user documents by id; sized/tuned in create_app().
+_cache = TTLCache(maxsize=1024, ttl=60)
+
+
+def configure_cache(maxsize: int, ttl: float):
+    _cache.maxsize = maxsize
+    _cache.ttl = ttl
+    _cache.clear()
+
+
+def _request_memo() -> dict:
+    return g.setdefault("_user_docs", {}) if has_app_context() else {}
+
+
 class User(UserMixin):
     """User model wrapper for Flask-Login."""
 
@@ -17,23 +38,48 @@ class User(UserMixin):
 
         id = doc.get("_id")
         if isinstance(id, ObjectId): id = str(id)
+        if not ObjectId.is_valid(id):
+            # applications are owned by ObjectId; `flask db migrate` re-keys these
+            logger.warning("User %r has a non-ObjectId _id; run `flask db migrate`", id)
+            return None
 
         return User(id, doc["email"], doc["password_hash"])
 
     @staticmethod
-    def get(db, user_id: str) -> Optional["User"]:
+    def get_doc(db, user_id: str) -> Optional[dict]:
         """
-        Load by id from session. Try ObjectId first then string _id.
+        Raw user document by id: request memo, then the process cache, then
+        Mongo (ObjectId first then string _id). Treat the result as read-only.
         """
-        doc = None
-        try:
-            doc = db.users.find_one({"_id": ObjectId(user_id)})
-        except Exception:
-            # not a valid ObjectId hex
-            pass
+        user_id = str(user_id)
+        memo = _request_memo()
+        doc = memo.get(user_id) or _cache.get(user_id)
         if doc is None:
-            doc = db.users.find_one({"_id": user_id})
-        return User.from_mongo(doc)
+            try:
+                doc = db.users.find_one({"_id": ObjectId(user_id)})
+            except Exception:
+                # not a valid ObjectId hex
+                pass
+            if doc is None:
+                doc = db.users.find_one({"_id": user_id})
+            if doc is not None:
+                _cache.set(user_id, doc)
+        if doc is not None:
+            memo[user_id] = doc
+        return doc
+
+    @staticmethod
+    def invalidate(user_id):
+        """Drop cached copies after the user document is written."""
+        _cache.pop(str(user_id))
+        _request_memo().pop(str(user_id), None)
+
+    @staticmethod
+    def get(db, user_id: str) -> Optional["User"]:
+        """
+        Load by id from session.
+        """
+        return User.from_mongo(User.get_doc(db, user_id))
 
     @staticmethod
     def get_by_email(db, email: str) -> Optional["User"]:
@@ -47,11 +93,30 @@ class User(UserMixin):
             return None, "Email and password are required."
         if db.users.find_one({"email": email}):
             return None, "Email already registered."
-        res = db.users.insert_one({
+        doc = {
             "email": email,
-            "password_hash": generate_password_hash(password),
-        })
-        return User.from_mongo(db.users.find_one({"_id": res.inserted_id})), None
+            "password_hash": passwords.hash_password(password),
+        }
+        res = db.users.insert_one(doc)
+        User.invalidate(res.inserted_id)
+        return User.from_mongo(doc), None
 
     def check_password(self, password: str) -> bool:
-        return check_password_hash(self.password_hash, password)
+        return passwords.verify_password(self.password_hash, password)
+
+    def rehash_if_needed(self, db, password: str):
+        """
+        After a successful login, re-hash with the configured parameters if
+        the stored hash is older. Skipped quietly when the pool is busy.
+        """
+        if not passwords.needs_rehash(self.password_hash):
+            return
+        try:
+            new_hash = passwords.hash_password(password)
+        except passwords.HashingBusy:
+            return
+        _id = ObjectId(self.id) if ObjectId.is_valid(self.id) else self.id
+        db.users.update_one({"_id": _id, "password_hash": self.password_hash},
+                            {"$set": {"password_hash": new_hash}})
+        self.password_hash = new_hash
+        User.invalidate(self.id)
@@ -0,0 +1,106 @@
+"""
+Password hashing off the request thread.
+
+scrypt/pbkdf2 are deliberately slow and hold the GIL while they run, so a
+burst of logins would stall every other request on the worker. Hashes are
+computed in a small process pool instead; at most `max_pending` may be
+queued or running per worker process; beyond that callers get HashingBusy
+right away rather than piling up behind the pool.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug import security
+
+logger = logging.getLogger(__name__)
+
+# werkzeug's own defaults, spelled out so stored hashes can be compared.
+_SCRYPT_DEFAULTS = ("32768", "8", "1")
+_PBKDF2_DEFAULTS = ("sha256", str(getattr(security, "DEFAULT_PBKDF2_ITERATIONS", 600000)))
+
+
+class HashingBusy(Exception):
+    """Too many hashes are already queued in this process."""
+
+
+def canonical_method(method: str) -> str:
+    """'scrypt' -> 'scrypt:32768:8:1', the method prefix werkzeug stores."""
+    name, *params = (method or "scrypt").split(":")
+    defaults = {"scrypt": _SCRYPT_DEFAULTS, "pbkdf2": _PBKDF2_DEFAULTS}.get(name)
+    if defaults is None:
+        raise ValueError(f"Unsupported password hash method: {method}")
+    params = params + list(defaults[len(params):])
+    return ":".join([name, *params])
+
+
+_method = canonical_method("scrypt")
+_workers = 0
+_slots = threading.BoundedSemaphore(1)
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def configure(method: str = "scrypt", workers: int = 0, max_pending: int = 0):
+    """
+    workers=0 hashes inline on the calling thread (the old behaviour).
+    max_pending defaults to four queued hashes per pool worker.
+    """
+    global _method, _workers, _slots, _pool
+    _method = canonical_method(method)
+    if _pool is not None and _pool_pid == os.getpid():
+        _pool.shutdown(wait=False)
+    _pool = None
+    _workers = max(workers, 0)
+    _slots = threading.BoundedSemaphore(max_pending or max(_workers, 1) * 4)
+
+
+def _get_pool():
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                # spawn: forking a threaded server process is not safe
+                _pool = ProcessPoolExecutor(
+                    _workers, mp_context=multiprocessing.get_context("spawn"))
+                _pool_pid = os.getpid()
+    return _pool
+
+
+def _call(fn, *args):
+    if _workers <= 0:
+        return fn(*args)
+    if not _slots.acquire(blocking=False):
+        raise HashingBusy()
+    try:
+        return _get_pool().submit(fn, *args).result()
+    finally:
+        _slots.release()
+
+
+def hash_password(password: str) -> str:
+    return _call(security.generate_password_hash, password, _method)
+
+
+def verify_password(pwhash: str, password: str) -> bool:
+    return _call(security.check_password_hash, pwhash, password)
+
+
+def needs_rehash(pwhash: str) -> bool:
+    """True if pwhash was made with other parameters than the configured ones."""
+    stored = (pwhash or "").split("$", 1)[0]
+    try:
+        return canonical_method(stored) != _method
+    except ValueError:
+        return True
+
+
+def prewarm():
+    """Start the pool's worker processes now instead of on the first login."""
+    if _workers > 0:
+        pool = _get_pool()
+        for f in [pool.submit(int) for _ in range(_workers)]:
+            f.result()
@@ -0,0 +1,165 @@
+"""
+Profile photo uploads.
+
+The upload is streamed to a temp file (rejected past the size cap) while
+being hashed, then squared/resized WebP variants are written off the
+request thread as <sha256 prefix>-<px>.webp. Names change whenever the
+content does, so they're served with an immutable Cache-Control and the
+hash as ETag. The user's document only points at a new photo once its
+variants exist; the previous photo's files are then deleted unless another
+user still uses them.
+"""
+import glob
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bson import ObjectId
+
+from ..db import get_db
+from ..models.user import User
+
+logger = logging.getLogger(__name__)
+
+SIZES = (120, 240)              # the avatar renders at 120px; 240 for 2x screens
+HASH_LEN = 20
+CHUNK = 64 * 1024
+NAME_RE = re.compile(r"^[0-9a-f]{%d}-\d+\.webp$" % HASH_LEN)
+
+_executor = None
+_executor_pid = None
+
+
+class PhotoError(Exception):
+    """Upload rejected; the message is shown to the user."""
+
+
+def photo_dir(app) -> str:
+    return app.config.get("PROFILE_PHOTO_DIR") or os.path.join(
+        app.static_folder, "uploads", "profile_photos")
+
+
+def variant_name(digest: str, px: int) -> str:
+    return f"{digest}-{px}.webp"
+
+
+def _get_executor():
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        _executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("PROFILE_PHOTO_WORKERS") or 2),
+            thread_name_prefix="profile-photo")
+        _executor_pid = os.getpid()
+    return _executor
+
+
+def spool_upload(file, directory: str, max_bytes: int):
+    """Copy the upload stream to a temp file; return (path, digest)."""
+    os.makedirs(directory, exist_ok=True)
+    sha = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(dir=directory, suffix=".upload")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for chunk in iter(lambda: file.stream.read(CHUNK), b""):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise PhotoError(f"Photo must be under {max_bytes // (1024 * 1024)} MB.")
+                sha.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    if not size:
+        os.unlink(path)
+        raise PhotoError("The uploaded photo is empty.")
+    return path, sha.hexdigest()[:HASH_LEN]
+
+
+def _write_variants(src: str, directory: str, digest: str):
+    from PIL import Image, ImageOps
+
+    with Image.open(src) as img:
+        img = ImageOps.exif_transpose(img)
+        img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+        for px in SIZES:
+            target = os.path.join(directory, variant_name(digest, px))
+            if os.path.exists(target):
+                continue
+            tmp = target + ".tmp"
+            ImageOps.fit(img, (px, px), Image.LANCZOS).save(tmp, "WEBP", quality=82, method=4)
+            os.replace(tmp, target)
+
+
+def _remove_variants(directory: str, digest: str):
+    for path in glob.glob(os.path.join(directory, f"{digest}-*.webp")):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def process_upload(user_id: str, src: str, directory: str, digest: str):
+    """Background job: build variants, point the user at them, drop the old ones."""
+    try:
+        _write_variants(src, directory, digest)
+    except Exception:
+        logger.exception("Could not process profile photo %s for %s", digest, user_id)
+        return
+    finally:
+        os.unlink(src)
+
+    db = get_db()
+    _id = ObjectId(user_id) if ObjectId.is_valid(user_id) else user_id
+    before = db.users.find_one_and_update(
+        {"_id": _id},
+        {"$set": {"profile_photo_hash": digest}, "$unset": {"profile_photo": ""}},
+        projection={"profile_photo_hash": 1, "profile_photo": 1})
+    User.invalidate(user_id)
+    before = before or {}
+    old = before.get("profile_photo_hash")
+    if old and old != digest and not db.users.count_documents(
+            {"profile_photo_hash": old}, limit=1):
+        _remove_variants(directory, old)
+    # photo saved by the old uploader as-is under /static/uploads/profile_photos/
+    # (named after the email prefix, so another user may share it)
+    legacy = before.get("profile_photo")
+    path = os.path.join(directory, os.path.basename(legacy or ""))
+    if legacy and os.path.isfile(path) and not db.users.count_documents(
+            {"profile_photo": legacy}, limit=1):
+        os.unlink(path)
+
+
+def submit(user_id: str, file, directory: str, max_bytes: int):
+    """Spool the upload in the request; resize and store in the background."""
+    src, digest = spool_upload(file, directory, max_bytes)
+    try:
+        from PIL import Image
+        with Image.open(src) as img:
+            img.verify()        # header check only; cheap
+    except Exception:
+        os.unlink(src)
+        raise PhotoError("That file doesn't look like an image.")
+    return _get_executor().submit(process_upload, user_id, src, directory, digest)
+
+
+def collect_garbage(db, directory: str, min_age: float = 3600) -> int:
+    """
+    Delete variant files no user references, plus stale temp files. Files
+    newer than min_age seconds are kept so in-flight uploads aren't raced.
+    """
+    used = set(db.users.distinct("profile_photo_hash"))
+    cutoff = time.time() - min_age
+    removed = 0
+    for path in glob.glob(os.path.join(directory, "*")):
+        name = os.path.basename(path)
+        orphan = NAME_RE.match(name) and name[:HASH_LEN] not in used
+        stale_tmp = name.endswith((".upload", ".tmp"))
+        if (orphan or stale_tmp) and os.path.getmtime(path) < cutoff:
+            os.unlink(path)
+            removed += 1
+    return removed
@@ -1,16 +1,17 @@
 # app/profile/routes.py
 
-from flask import render_template, request, redirect, url_for, flash, current_app
+from flask import render_template, request, redirect, url_for, flash, current_app, abort, send_from_directory
 from flask_login import login_required, current_user
-from app.profile import bp
+from app.profile import bp, photos
 from app.db import get_db
+from app.models.user import User
 from datetime import datetime
 
-from werkzeug.utils import secure_filename
-from datetime import datetime
 import os
 import re
 
+PHOTO_MAX_AGE = 365 * 24 * 3600
+
 # ---------- helpers ----------
 
 def _digits_only(s: str) -> str:
@@ -58,31 +59,34 @@ def index():
     db = get_db()
     users = db.users
 
-    user_doc = users.find_one({"email": current_user.email}) or {}
+    # same document load_user already fetched for this request
+    user_doc = User.get_doc(db, current_user.id) or {}
 
     if request.method == "POST":
+        max_bytes = int(os.getenv("PROFILE_PHOTO_MAX_BYTES") or 5 * 1024 * 1024)
+        # refuse oversized bodies before the form is parsed
+        if (request.content_length or 0) > max_bytes + 64 * 1024:
+            flash(f"Photo must be under {max_bytes // (1024 * 1024)} MB.", "error")
+            return redirect(url_for("profile.index"))
+
         name = (request.form.get("name") or "").strip()[:200]
         phone = _digits_only(request.form.get("phone"))
         introduction = (request.form.get("introduction") or "").strip()[:2000]
 
-        profile_photo_path = user_doc.get("profile_photo", "")
         file = request.files.get("profile_photo")
+        photo_pending = False
         if file and file.filename:
-            filename = secure_filename(file.filename)
-            base, ext = os.path.splitext(filename)
-            prefix = secure_filename((current_user.email or "user").split("@")[0]) or "user"
-            safe_name = f"{prefix}{(ext or '.jpg').lower()}"
-            upload_dir = os.path.join(current_app.static_folder, "uploads", "profile_photos")
-            os.makedirs(upload_dir, exist_ok=True)
-            save_path = os.path.join(upload_dir, safe_name)
-            file.save(save_path)
-            profile_photo_path = f"/static/uploads/profile_photos/{safe_name}"
+            try:
+                photos.submit(current_user.id, file, photos.photo_dir(current_app), max_bytes)
+                photo_pending = True
+            except photos.PhotoError as e:
+                flash(str(e), "error")
+                return redirect(url_for("profile.index"))
 
         update_doc = {
             "name": name,
             "phone": phone,
             "introduction": introduction,
-            "profile_photo": profile_photo_path,
             "updated_at": datetime.utcnow(),
         }
 
@@ -91,14 +95,25 @@ def index():
             {"$set": update_doc},
             upsert=True
         )
+        User.invalidate(current_user.id)
 
-        flash("Profile updated successfully!", "info")
+        if photo_pending:
+            flash("Profile updated successfully! Your new photo will show up in a moment.", "info")
+        else:
+            flash("Profile updated successfully!", "info")
         return redirect(url_for("profile.index"))
 
     email = user_doc.get("email", current_user.email) or ""
     name = user_doc.get("name", "") or ""
     phone = user_doc.get("phone", "") or ""
     profile_photo = user_doc.get("profile_photo", "") or ""
+    profile_photo_srcset = ""
+    digest = user_doc.get("profile_photo_hash")
+    if digest:
+        urls = [(url_for("profile.photo", name=photos.variant_name(digest, px)), px)
+                for px in photos.SIZES]
+        profile_photo = urls[0][0]
+        profile_photo_srcset = ", ".join(f"{u} {px // photos.SIZES[0]}x" for u, px in urls)
     introduction = user_doc.get("introduction", "") or ""
 
     return render_template(
@@ -107,5 +122,18 @@ def index():
         name=name,
         phone=phone,
         profile_photo=profile_photo,
+        profile_photo_srcset=profile_photo_srcset,
         introduction=introduction,
     )
+
+
+@bp.get("/photo/<name>")
+def photo(name):
+    # Content-addressed, so the file behind a name never changes.
+    if not photos.NAME_RE.match(name):
+        abort(404)
+    resp = send_from_directory(photos.photo_dir(current_app), name,
+                               max_age=PHOTO_MAX_AGE, etag=name[:photos.HASH_LEN])
+    resp.cache_control.public = True
+    resp.cache_control.immutable = True
+    return resp
@@ -0,0 +1,166 @@
+"""
+Sliding-window rate limits for login/signup.
+
+Each limit keeps a counter per fixed window; a request is judged on the
+current window plus the previous one weighted by how much of it still
+overlaps the sliding window. Counters live in a pluggable store: in-process
+(per worker) or a Mongo collection with a TTL index, shared by all workers.
+"""
+import datetime as dt
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+
+class Limit:
+    """`limit` hits per `window` seconds; limit <= 0 disables it."""
+
+    def __init__(self, name: str, limit: int, window: int):
+        self.name = name
+        self.limit = limit
+        self.window = window
+
+    @classmethod
+    def parse(cls, name: str, spec: str) -> "Limit":
+        """'20/60' -> 20 hits per 60 seconds; '' or '0' disables."""
+        count, _, window = (spec or "0").partition("/")
+        return cls(name, int(count or 0), int(window or 60))
+
+    def __repr__(self):
+        return f"Limit({self.name!r}, {self.limit}/{self.window}s)"
+
+
+class MemoryStore:
+    """Counters in this process only; limits are per worker."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._data = {}             # key -> (expires, count, ttl)
+        # one queue per ttl: keys of the same ttl expire in insertion order
+        self._queues = {}           # ttl -> OrderedDict of keys, oldest first
+        self._lock = threading.Lock()
+
+    def _drop(self, key):
+        _, _, ttl = self._data.pop(key)
+        self._queues[ttl].pop(key, None)
+
+    def _evict(self, now):
+        # expired keys sit at the front of their queue: O(1) amortized per
+        # insert, never a full scan
+        for queue in self._queues.values():
+            while queue and self._data[next(iter(queue))][0] <= now:
+                self._drop(next(iter(queue)))
+        if len(self._data) >= self.max_keys:
+            # still full of live keys: drop the one closest to expiring
+            fronts = [next(iter(q)) for q in self._queues.values() if q]
+            self._drop(min(fronts, key=lambda k: self._data[k][0]))
+
+    def incr(self, key: str, ttl: float) -> int:
+        now = time.time()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] <= now:
+                if item is not None:
+                    self._drop(key)
+                self._evict(now)
+                item = (now + ttl, 0, ttl)
+                self._queues.setdefault(ttl, OrderedDict())[key] = None
+            self._data[key] = (item[0], item[1] + 1, item[2])
+            return item[1] + 1
+
+    def get(self, key: str) -> int:
+        with self._lock:
+            item = self._data.get(key)
+        return item[1] if item and item[0] > time.time() else 0
+
+
+class MongoStore:
+    """
+    Counters in the `rate_limits` collection, one document per key and
+    window; Mongo's TTL monitor deletes them once expired.
+    """
+
+    def __init__(self, db_getter):
+        self._db = db_getter
+
+    def incr(self, key: str, ttl: float) -> int:
+        doc = self._db().rate_limits.find_one_and_update(
+            {"_id": key},
+            {"$inc": {"n": 1},
+             "$setOnInsert": {"expires_at": dt.datetime.utcnow() + dt.timedelta(seconds=ttl)}},
+            upsert=True, return_document=ReturnDocument.AFTER, projection={"n": 1},
+        )
+        return doc["n"]
+
+    def get(self, key: str) -> int:
+        doc = self._db().rate_limits.find_one({"_id": key}, {"n": 1})
+        return doc["n"] if doc else 0
+
+
+class RateLimiter:
+    def __init__(self, store):
+        self.store = store
+
+    def _hit(self, limit: Limit, key: str, now: float) -> float:
+        window = limit.window
+        start = int(now // window) * window
+        base = f"{limit.name}:{key}:"
+        current = self.store.incr(base + str(start), ttl=2 * window)
+        previous = self.store.get(base + str(start - window))
+        elapsed = now - start
+        weighted = previous * (1 - elapsed / window) + current
+        if weighted <= limit.limit:
+            return 0
+        if current > limit.limit or previous == 0:
+            return window - elapsed
+        # wait until enough of the previous window has slid out
+        return max(window * (1 - (limit.limit - current) / previous) - elapsed, 1)
+
+    def hit(self, checks: Iterable[Tuple[Limit, Optional[str]]]) -> int:
+        """
+        Count one hit against each (limit, key) and return the seconds to
+        wait if any is exceeded, else 0. A failing store lets the hit
+        through rather than locking everyone out.
+        """
+        now = time.time()
+        retry_after = 0.0
+        for limit, key in checks:
+            if limit.limit <= 0 or not key:
+                continue
+            try:
+                retry_after = max(retry_after, self._hit(limit, key, now))
+            except Exception:
+                logger.exception("Rate limit store failed for %s", limit.name)
+        return math.ceil(retry_after)
+
+
+limiter = RateLimiter(MemoryStore())
+LOGIN_PER_IP = Limit("login-ip", 20, 60)
+LOGIN_PER_EMAIL = Limit("login-email", 5, 60)
+SIGNUP_PER_IP = Limit("signup-ip", 5, 600)
+
+
+def configure(backend: str = "memory", login_ip: str = "", login_email: str = "",
+              signup_ip: str = ""):
+    """Pick the store and override the default limits ('N/seconds' specs)."""
+    global limiter, LOGIN_PER_IP, LOGIN_PER_EMAIL, SIGNUP_PER_IP
+    if backend == "mongo":
+        from .db import get_db
+        limiter = RateLimiter(MongoStore(get_db))
+    elif backend == "memory":
+        limiter = RateLimiter(MemoryStore())
+    else:
+        raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {backend}")
+    if login_ip:
+        LOGIN_PER_IP = Limit.parse("login-ip", login_ip)
+    if login_email:
+        LOGIN_PER_EMAIL = Limit.parse("login-email", login_email)
+    if signup_ip:
+        SIGNUP_PER_IP = Limit.parse("signup-ip", signup_ip)
@@ -0,0 +1,301 @@
+"""
+Deadline reminders, delivered by a worker process separate from the web
+workers (`flask reminders run`).
+
+The scanner walks every application with a deadline in the next
+max(days) days along the (deadline, _id) index, a batch at a time with a
+keyset cursor, and enqueues one job per (application, deadline, offset)
+into `reminder_jobs`. The job _id is that idempotency key, so rescans and
+concurrent scanners never enqueue a reminder twice. An application 5 days
+out with REMINDER_DAYS=7,1 gets its "7" reminder (late, if a scan was
+missed) and later its "1" reminder.
+
+    reminder_jobs: {_id: "<app id>:<YYYY-MM-DD>:<offset>", status, run_at,
+                    attempts, payload, claimed_by, last_error, expires_at}
+
+Workers claim due jobs in batches (a claimed job's run_at is its lease
+expiry, so jobs of a crashed worker come back), re-check them against the
+current applications with one $in query, and hand them to a sink. A
+failing send is retried with exponential backoff until max_attempts,
+then marked "failed". Jobs are removed by a TTL index once the deadline
+is a week past.
+"""
+import datetime as dt
+import importlib
+import logging
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+from .jsonapi import dumps_bytes
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DAYS = (7, 1)
+BATCH_SIZE = 1000
+CLAIM_BATCH = 100
+LEASE_SECONDS = 300
+MAX_ATTEMPTS = 5
+BACKOFF_SECONDS = 60
+MAX_BACKOFF_SECONDS = 6 * 3600
+
+# statuses that need no reminder (same as the dashboard's upcoming list)
+CLOSED_STATUSES = ["rejected", "accepted"]
+
+SCAN_PROJECTION = {"user_id": 1, "company": 1, "role": 1, "deadline": 1}
+
+
+def _today() -> dt.datetime:
+    return dt.datetime.combine(dt.datetime.utcnow().date(), dt.time())
+
+
+def parse_days(spec: str) -> tuple:
+    """'7,1' -> (1, 7): reminder offsets in days before the deadline."""
+    days = sorted({int(d) for d in (spec or "").split(",") if d.strip()})
+    return tuple(d for d in days if d >= 0) or tuple(sorted(DEFAULT_DAYS))
+
+
+def job_key(app_id, deadline: dt.datetime, offset: int) -> str:
+    return f"{app_id}:{deadline.date().isoformat()}:{offset}"
+
+
+# ---------------------------------------------------------------- scanning
+
+def iter_due(db, start: dt.datetime, end: dt.datetime, batch_size: int = BATCH_SIZE):
+    """
+    Yield batches of open applications with start <= deadline < end, in
+    (deadline, _id) order. Each batch resumes after the last key of the
+    previous one, so the scan never skips and never holds a cursor open
+    across batches.
+    """
+    window = {"deadline": {"$gte": start, "$lt": end}, "status": {"$nin": CLOSED_STATUSES}}
+    last = None
+    while True:
+        match = window
+        if last is not None:
+            match = {"$and": [window, {"$or": [
+                {"deadline": {"$gt": last[0]}},
+                {"deadline": last[0], "_id": {"$gt": last[1]}},
+            ]}]}
+        rows = list(db.applications.find(match, SCAN_PROJECTION)
+                    .sort([("deadline", 1), ("_id", 1)])
+                    .hint("deadline_scan")
+                    .limit(batch_size))
+        if not rows:
+            return
+        yield rows
+        if len(rows) < batch_size:
+            return
+        last = (rows[-1]["deadline"], rows[-1]["_id"])
+
+
+def scan(db, days=DEFAULT_DAYS, batch_size: int = BATCH_SIZE, today: dt.datetime = None) -> dict:
+    """Enqueue reminders for every deadline inside the window; returns counts."""
+    days = sorted(days)
+    today = today or _today()
+    end = today + dt.timedelta(days=days[-1] + 1)
+    counts = {"scanned": 0, "enqueued": 0}
+
+    for rows in iter_due(db, today, end, batch_size):
+        counts["scanned"] += len(rows)
+        # owners' emails: one query per batch, never per user
+        user_oids = list({r["user_id"] for r in rows})
+        emails = {u["_id"]: u.get("email")
+                  for u in db.users.find({"_id": {"$in": user_oids}}, {"email": 1})}
+        now = dt.datetime.utcnow()
+        ops = []
+        for r in rows:
+            email = emails.get(r["user_id"])
+            if not email:
+                continue
+            days_left = (r["deadline"] - today).days
+            offset = next(d for d in days if d >= days_left)
+            ops.append(UpdateOne(
+                {"_id": job_key(r["_id"], r["deadline"], offset)},
+                {"$setOnInsert": {
+                    "status": "pending", "run_at": now, "attempts": 0,
+                    "payload": {"application_id": r["_id"], "user_id": r["user_id"],
+                                "email": email, "company": r.get("company"),
+                                "role": r.get("role"), "deadline": r["deadline"],
+                                "offset": offset},
+                    "created_at": now,
+                    "expires_at": r["deadline"] + dt.timedelta(days=7),
+                }},
+                upsert=True,
+            ))
+        if ops:
+            res = db.reminder_jobs.bulk_write(ops, ordered=False)
+            counts["enqueued"] += res.upserted_count
+    logger.info("Reminder scan %s..%s: %s", today.date(), end.date(), counts)
+    return counts
+
+
+# ------------------------------------------------------------------- queue
+
+def claim(db, worker: str, limit: int = CLAIM_BATCH, lease: float = LEASE_SECONDS) -> list:
+    """
+    Claim up to `limit` due jobs for this worker. Pending jobs whose run_at
+    has come and running jobs whose lease ran out are both due.
+    """
+    now = dt.datetime.utcnow()
+    due = {"status": {"$in": ["pending", "running"]}, "run_at": {"$lte": now}}
+    ids = [d["_id"] for d in db.reminder_jobs.find(due, {"_id": 1}).sort("run_at", 1).limit(limit)]
+    if not ids:
+        return []
+    token = f"{worker}:{now.timestamp()}"
+    # re-checking `due` makes the claim safe against a concurrent worker
+    db.reminder_jobs.update_many(
+        {**due, "_id": {"$in": ids}},
+        {"$set": {"status": "running", "claimed_by": token,
+                  "run_at": now + dt.timedelta(seconds=lease)},
+         "$inc": {"attempts": 1}},
+    )
+    return list(db.reminder_jobs.find({"_id": {"$in": ids}, "claimed_by": token}))
+
+
+def backoff(attempts: int, base: float = BACKOFF_SECONDS) -> float:
+    """Exponential backoff with jitter, capped at MAX_BACKOFF_SECONDS."""
+    delay = min(base * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _still_due(db, jobs: list) -> set:
+    """Keys of jobs whose application still exists, is open and has that deadline."""
+    current = {d["_id"]: d for d in db.applications.find(
+        {"_id": {"$in": [j["payload"]["application_id"] for j in jobs]}},
+        {"deadline": 1, "status": 1})}
+    keep = set()
+    for j in jobs:
+        app = current.get(j["payload"]["application_id"])
+        if (app and app.get("deadline") == j["payload"]["deadline"]
+                and (app.get("status") or "").lower() not in CLOSED_STATUSES):
+            keep.add(j["_id"])
+    return keep
+
+
+def deliver(db, sink, jobs: list, max_attempts: int = MAX_ATTEMPTS,
+            base_backoff: float = BACKOFF_SECONDS) -> dict:
+    """Send claimed jobs through the sink and record each outcome."""
+    counts = {"sent": 0, "skipped": 0, "retried": 0, "failed": 0}
+    if not jobs:
+        return counts
+    keep = _still_due(db, jobs)
+    now = dt.datetime.utcnow()
+    ops = []
+    for job in jobs:
+        match = {"_id": job["_id"], "claimed_by": job["claimed_by"]}
+        if job["_id"] not in keep:
+            counts["skipped"] += 1
+            ops.append(UpdateOne(match, {"$set": {"status": "skipped", "done_at": now}}))
+            continue
+        try:
+            sink.send(job["payload"])
+        except Exception as e:
+            logger.warning("Reminder %s failed (attempt %d): %s", job["_id"], job["attempts"], e)
+            if job["attempts"] >= max_attempts:
+                counts["failed"] += 1
+                update = {"status": "failed", "done_at": now}
+            else:
+                counts["retried"] += 1
+                update = {"status": "pending",
+                          "run_at": now + dt.timedelta(seconds=backoff(job["attempts"], base_backoff))}
+            ops.append(UpdateOne(match, {"$set": {**update, "last_error": str(e)[:500]}}))
+            continue
+        counts["sent"] += 1
+        ops.append(UpdateOne(match, {"$set": {"status": "done", "done_at": now}}))
+    db.reminder_jobs.bulk_write(ops, ordered=False)
+    return counts
+
+
+def queue_stats(db) -> dict:
+    return {d["_id"]: d["n"] for d in db.reminder_jobs.aggregate(
+        [{"$group": {"_id": "$status", "n": {"$sum": 1}}}])}
+
+
+# ------------------------------------------------------------------- sinks
+
+class ConsoleSink:
+    """Writes one line per reminder to stdout (or another stream)."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send(self, reminder: dict):
+        self.stream.write(
+            f"[reminder] {reminder['email']}: {reminder.get('company')} / {reminder.get('role')} "
+            f"due {reminder['deadline']:%Y-%m-%d} ({reminder['offset']} day(s) notice)\n")
+        self.stream.flush()
+
+
+class FileSink:
+    """Appends each reminder as a JSON line to `path`."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, reminder: dict):
+        line = dumps_bytes(reminder) + b"\n"
+        with self._lock, open(self.path, "ab") as fh:
+            fh.write(line)
+
+
+def make_sink(spec: str):
+    """
+    "console", "file:<path>", or "package.module:factory" for anything
+    else (e.g. an email or webhook sender); the factory is called with no
+    arguments and must return an object with send(reminder).
+    """
+    spec = (spec or "console").strip()
+    if spec == "console":
+        return ConsoleSink()
+    if spec.startswith("file:"):
+        return FileSink(spec[len("file:"):])
+    module, _, attr = spec.partition(":")
+    if not attr:
+        raise ValueError(f"Unknown REMINDER_SINK: {spec}")
+    return getattr(importlib.import_module(module), attr)()
+
+
+# ------------------------------------------------------------------ worker
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def run_worker(db, sink, days=DEFAULT_DAYS, scan_interval: float = 3600,
+               poll_interval: float = 5, batch_size: int = BATCH_SIZE,
+               max_attempts: int = MAX_ATTEMPTS, base_backoff: float = BACKOFF_SECONDS,
+               once: bool = False):
+    """
+    Scan every scan_interval seconds and deliver due jobs in between. A
+    Mongo error (stepdown, network blip) is logged and the loop carries on
+    after poll_interval; with once=True it propagates.
+    """
+    worker = worker_name()
+    next_scan = 0.0
+    while True:
+        try:
+            if time.monotonic() >= next_scan:
+                scan(db, days, batch_size)
+                next_scan = time.monotonic() + scan_interval
+            while True:
+                jobs = claim(db, worker)
+                if not jobs:
+                    break
+                logger.info("Delivered %d reminder job(s): %s", len(jobs),
+                            deliver(db, sink, jobs, max_attempts, base_backoff))
+        except PyMongoError:
+            if once:
+                raise
+            # claimed jobs come back once their lease runs out
+            logger.exception("Reminder worker pass failed; retrying in %ss", poll_interval)
+        if once:
+            return
+        time.sleep(poll_interval)
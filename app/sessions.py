@@ -0,0 +1,201 @@
+"""
+Server-side sessions: the cookie carries only a random session id and the
+data lives in a store (in-process LRU or a Mongo collection with a TTL
+index). The store is written only when the session changed, or to push
+the expiry forward once per SESSION_TOUCH_INTERVAL while it's in use.
+
+Enabled with SESSION_BACKEND=memory|mongo; "cookie" keeps Flask's default.
+"""
+import copy
+import datetime as dt
+import logging
+import re
+import secrets
+
+from flask import session
+from flask.sessions import SessionInterface, SessionMixin
+from flask_login import user_logged_in
+from werkzeug.datastructures import CallbackDict
+
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+SID_RE = re.compile(r"^[A-Za-z0-9_-]{43}$")
+
+
+def _new_sid() -> str:
+    return secrets.token_urlsafe(32)
+
+
+def _utcnow() -> dt.datetime:
+    return dt.datetime.utcnow().replace(microsecond=0)
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, data=None, sid=None, expires_at=None):
+        def on_update(self):
+            self.modified = True
+        super().__init__(data, on_update)
+        self.new = sid is None
+        self.sid = sid or _new_sid()
+        self.expires_at = expires_at
+        self.modified = False
+        self.stale_sid = None
+
+    def regenerate(self):
+        """New id for the same data (on login, against session fixation)."""
+        if not self.new:
+            self.stale_sid = self.sid
+        self.sid = _new_sid()
+        self.new = True
+        self.modified = True
+
+
+class MemorySessionStore:
+    """Per-process LRU; sessions don't survive restarts or span workers."""
+
+    def __init__(self, maxsize: int, lifetime: dt.timedelta):
+        self._cache = TTLCache(maxsize=maxsize, ttl=lifetime.total_seconds())
+
+    def load(self, sid):
+        rec = self._cache.get(sid)
+        if rec is None or rec["expires_at"] <= _utcnow():
+            return None
+        return copy.deepcopy(rec["data"]), rec["expires_at"]
+
+    def save(self, sid, data, user_id, expires_at):
+        self._cache.set(sid, {"data": copy.deepcopy(data), "user_id": user_id,
+                              "expires_at": expires_at, "updated_at": _utcnow()})
+
+    def touch(self, sid, expires_at):
+        rec = self._cache.get(sid)
+        if rec is not None:
+            self._cache.set(sid, {**rec, "expires_at": expires_at})
+
+    def delete(self, sid):
+        self._cache.pop(sid)
+
+    def list_user(self, user_id):
+        return [{"sid": sid, "expires_at": rec["expires_at"], "updated_at": rec["updated_at"]}
+                for sid, rec in self._cache.items() if rec["user_id"] == user_id]
+
+    def delete_user(self, user_id) -> int:
+        sids = [s["sid"] for s in self.list_user(user_id)]
+        for sid in sids:
+            self._cache.pop(sid)
+        return len(sids)
+
+
+class MongoSessionStore:
+    """
+    `sessions` collection: {_id: sid, data, user_id, expires_at, updated_at}.
+    Mongo's TTL monitor removes expired documents; load() also ignores them
+    in case the monitor hasn't run yet.
+    """
+
+    def __init__(self, db_getter):
+        self._db = db_getter
+
+    def load(self, sid):
+        doc = self._db().sessions.find_one(
+            {"_id": sid, "expires_at": {"$gt": _utcnow()}}, {"data": 1, "expires_at": 1})
+        return (doc["data"], doc["expires_at"]) if doc else None
+
+    def save(self, sid, data, user_id, expires_at):
+        self._db().sessions.replace_one(
+            {"_id": sid},
+            {"data": data, "user_id": user_id, "expires_at": expires_at,
+             "updated_at": _utcnow()},
+            upsert=True)
+
+    def touch(self, sid, expires_at):
+        self._db().sessions.update_one({"_id": sid}, {"$set": {"expires_at": expires_at}})
+
+    def delete(self, sid):
+        self._db().sessions.delete_one({"_id": sid})
+
+    def list_user(self, user_id):
+        cursor = self._db().sessions.find(
+            {"user_id": user_id, "expires_at": {"$gt": _utcnow()}},
+            {"expires_at": 1, "updated_at": 1}).sort("updated_at", -1)
+        return [{"sid": d["_id"], "expires_at": d["expires_at"], "updated_at": d.get("updated_at")}
+                for d in cursor]
+
+    def delete_user(self, user_id) -> int:
+        return self._db().sessions.delete_many({"user_id": user_id}).deleted_count
+
+
+class ServerSessionInterface(SessionInterface):
+    def __init__(self, store, touch_interval: dt.timedelta):
+        self.store = store
+        self.touch_interval = touch_interval
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid and SID_RE.match(sid):
+            try:
+                found = self.store.load(sid)
+            except Exception:
+                logger.exception("Session store load failed")
+                found = None
+            if found is not None:
+                data, expires_at = found
+                return ServerSession(data, sid=sid, expires_at=expires_at)
+        return ServerSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session.accessed:
+            response.vary.add("Cookie")
+        if session.stale_sid:
+            self.store.delete(session.stale_sid)
+
+        if not session:
+            # emptied (e.g. logout without flashes): drop it entirely
+            if session.modified and not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        now = _utcnow()
+        expires_at = now + app.permanent_session_lifetime
+        if session.modified or session.new:
+            self.store.save(session.sid, dict(session), session.get("_user_id"), expires_at)
+        elif (session.expires_at is None
+              or expires_at - session.expires_at >= self.touch_interval):
+            self.store.touch(session.sid, expires_at)
+        else:
+            return              # nothing to write, cookie already current
+
+        response.set_cookie(
+            name, session.sid,
+            expires=expires_at if session.permanent else None,
+            httponly=self.get_cookie_httponly(app),
+            domain=domain, path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+
+def _regenerate_on_login(app, user, **extra):
+    if isinstance(session._get_current_object(), ServerSession):
+        session.regenerate()
+
+
+def init_app(app, backend: str, maxsize: int = 10000,
+             touch_interval: dt.timedelta = dt.timedelta(hours=1)):
+    """Install server-side sessions (backend "memory" or "mongo")."""
+    lifetime = app.permanent_session_lifetime
+    if backend == "mongo":
+        from .db import get_db
+        store = MongoSessionStore(get_db)
+    elif backend == "memory":
+        store = MemorySessionStore(maxsize, lifetime)
+    else:
+        raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
+    app.session_interface = ServerSessionInterface(store, touch_interval)
+    user_logged_in.connect(_regenerate_on_login, app)
+    return store
@@ -7,4 +7,4 @@ stats_bp = Blueprint(
     template_folder="templates",
 )
 
-from app.stats import routes
\ No newline at end of file
+from app.stats import routes, api
\ No newline at end of file
@@ -0,0 +1,97 @@
+"""/stats/api/v1 JSON: the stats page numbers, from the user_stats rollup and stats_buckets."""
+import datetime as dt
+
+from bson import ObjectId
+from flask import request
+from flask_login import current_user
+
+from . import stats_bp
+from . import buckets, events, queries
+from .rollup import get_rollup, summarize
+from .routes import timeline_days
+from ..conditional import conditional_get
+from ..db import get_db
+from ..jsonapi import ApiError, api_login_required
+from ..models.application import to_public
+
+
+@stats_bp.get("/api/v1/summary")
+@api_login_required
+@conditional_get(renders_flashes=False)
+def api_summary():
+    """Counters, plus the recent/upcoming lists unless ?lists=0."""
+    db = get_db()
+    user_oid = ObjectId(current_user.id)
+    summary = summarize(get_rollup(db, user_oid))
+    name, count = summary["top_company"]
+    body = {
+        "total": summary["total"],
+        "status_counts": summary["status_counts"],
+        "top_company": {"name": name, "count": count},
+        "last_7_days": summary["last_7_days"],
+        "last_30_days": summary["last_30_days"],
+    }
+    if request.args.get("lists") != "0":
+        body["recent"] = [to_public(d) for d in queries.recent_applications(db, user_oid)]
+        body["upcoming"] = [to_public(d) for d in queries.upcoming_deadlines(db, user_oid)]
+    return body
+
+
+@stats_bp.get("/api/v1/timeline")
+@api_login_required
+@conditional_get(renders_flashes=False)
+def api_timeline():
+    """Funnel, time in stage and stage-to-stage transitions for ?days=."""
+    report = events.funnel(get_db(), ObjectId(current_user.id), timeline_days())
+    return {
+        "days": report["days"],
+        "stages": report["stages"],
+        "funnel": [{"stage": s, "reached": n, "conversion": c} for s, n, c in report["funnel"]],
+        "transitions": [{"from": f, "to": t, "count": n}
+                        for (f, t), n in sorted(report["transitions"].items())],
+    }
+
+
+SERIES_DEFAULT_DAYS = 30
+SERIES_MAX_DAYS = 366 * 5
+
+
+def _date_arg(name: str, default: dt.date) -> dt.date:
+    raw = request.args.get(name)
+    if not raw:
+        return default
+    try:
+        return dt.date.fromisoformat(raw)
+    except ValueError:
+        raise ApiError(400, f"{name} must be a YYYY-MM-DD date.")
+
+
+@stats_bp.get("/api/v1/series")
+@api_login_required
+@conditional_get(renders_flashes=False)
+def api_series():
+    """
+    Applications created per ?by=day|week|month between ?from= and ?to=
+    (default: the last 30 days by day), by status and company, plus totals.
+    """
+    by = request.args.get("by") or "day"
+    if by not in ("day", "week", "month"):
+        raise ApiError(400, "by must be day, week or month.")
+    end = _date_arg("to", dt.datetime.utcnow().date())
+    start = _date_arg("from", end - dt.timedelta(days=SERIES_DEFAULT_DAYS - 1))
+    if start > end:
+        raise ApiError(400, "from must not be after to.")
+    if (end - start).days > SERIES_MAX_DAYS:
+        raise ApiError(400, f"The range is limited to {SERIES_MAX_DAYS} days.")
+
+    periods = buckets.series(get_db(), ObjectId(current_user.id), start, end, by=by)
+    summary = buckets.totals(periods)
+    return {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "by": by,
+        "periods": [{**p, "start": p["start"].isoformat()} for p in periods],
+        "total": summary["total"],
+        "status_counts": summary["status"],
+        "top_companies": [{"name": n, "count": c} for n, c in summary["top_companies"]],
+    }
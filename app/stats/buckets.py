@@ -0,0 +1,257 @@
+"""
+Time-bucketed application counts for charts and date-range stats.
+
+    stats_buckets: {_id: "<user>:<g>:<YYYY-MM-DD>", u: user_id, g: "d"|"w"|"m",
+                    start: datetime, total: int,
+                    status: {<bucket>: int}, companies: {<company>: int}}
+
+Each bucket counts the applications created in its period, by current
+status and company. Writes $inc the bucket of the application's created
+date (apply_changes, called from record_changes), so a status change
+moves one count between status keys of that bucket.
+
+Recent dates have daily buckets; `flask stats compact` folds daily
+buckets older than DAILY_DAYS into weekly ones (Monday starts) and weekly
+buckets older than WEEKLY_DAYS into monthly ones (by the month the week
+starts in). Writes to old dates go straight to the coarser bucket, and
+counts are only ever added, so daily and coarser buckets for the same
+period can coexist until the next compaction. Range queries cost one
+indexed read of the buckets in the range.
+"""
+import datetime as dt
+import logging
+
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from ..models.application import status_bucket, to_datetime, to_object_id
+from .rollup import _key, _unkey
+
+logger = logging.getLogger(__name__)
+
+DAILY_DAYS = 90
+WEEKLY_DAYS = 730
+BACKFILL_BATCH = 5000
+
+
+def _today() -> dt.date:
+    return dt.datetime.utcnow().date()
+
+
+def week_start(day: dt.date) -> dt.date:
+    return day - dt.timedelta(days=day.weekday())
+
+
+def bucket_start(day: dt.date, today: dt.date = None):
+    """(granularity, start date) of the bucket a created date counts in today."""
+    today = today or _today()
+    if (today - day).days < DAILY_DAYS:
+        return "d", day
+    week = week_start(day)
+    if (today - week).days < WEEKLY_DAYS:
+        return "w", week
+    return "m", week.replace(day=1)
+
+
+def bucket_id(user_oid, g: str, start: dt.date) -> str:
+    return f"{user_oid}:{g}:{start.isoformat()}"
+
+
+def _deltas(doc: dict, sign: int):
+    """(created date, {counter: delta}) for one application, or None."""
+    created = to_datetime(doc.get("created_at"))
+    if created is None:
+        return None
+    return created.date(), {
+        "total": sign,
+        f"status.{_key(status_bucket(doc.get('status')) or 'unknown')}": sign,
+        f"companies.{_key(doc.get('company'))}": sign,
+    }
+
+
+def _upserts(user_oid, incs: dict) -> list:
+    """UpdateOne per bucket from {(g, start): {counter: delta}}."""
+    ops = []
+    for (g, start), inc in incs.items():
+        inc = {k: v for k, v in inc.items() if v}
+        if inc:
+            ops.append(UpdateOne(
+                {"_id": bucket_id(user_oid, g, start)},
+                {"$inc": inc,
+                 "$setOnInsert": {"u": user_oid, "g": g,
+                                  "start": dt.datetime.combine(start, dt.time())}},
+                upsert=True,
+            ))
+    return ops
+
+
+def apply_changes(db, user_oid, changes, today: dt.date = None):
+    """Fold (before, after) application changes into the user's buckets."""
+    today = today or _today()
+    incs = {}
+    for before, after in changes:
+        for doc, sign in ((after, 1), (before, -1)):
+            found = _deltas(doc, sign) if doc else None
+            if found:
+                day, deltas = found
+                inc = incs.setdefault(bucket_start(day, today), {})
+                for k, v in deltas.items():
+                    inc[k] = inc.get(k, 0) + v
+    ops = _upserts(user_oid, incs)
+    if ops:
+        db.stats_buckets.bulk_write(ops, ordered=False)
+
+
+def _merge(db, doc: dict, g: str, start: dt.date):
+    """
+    Add bucket doc into the (g, start) bucket, then delete it. `merged`
+    remembers what was folded in, so a rerun after a crash between the two
+    steps doesn't count it twice.
+    """
+    inc = {"total": doc.get("total", 0)}
+    for field in ("status", "companies"):
+        inc.update({f"{field}.{k}": v for k, v in (doc.get(field) or {}).items() if v})
+    try:
+        db.stats_buckets.update_one(
+            {"_id": bucket_id(doc["u"], g, start), "merged": {"$ne": doc["_id"]}},
+            {"$inc": inc, "$push": {"merged": doc["_id"]},
+             "$setOnInsert": {"u": doc["u"], "g": g,
+                              "start": dt.datetime.combine(start, dt.time())}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        pass            # target exists and already has doc folded in
+    db.stats_buckets.delete_one({"_id": doc["_id"]})
+
+
+def compact(db, today: dt.date = None) -> dict:
+    """
+    Fold aged daily buckets into weeks and aged weekly buckets into months.
+    Only buckets that bucket_start() no longer writes to are touched, so
+    this can run while the app is taking writes.
+    """
+    today = today or _today()
+    counts = {"d": 0, "w": 0}
+    daily_cutoff = dt.datetime.combine(today - dt.timedelta(days=DAILY_DAYS - 1), dt.time())
+    weekly_cutoff = dt.datetime.combine(today - dt.timedelta(days=WEEKLY_DAYS - 1), dt.time())
+    for g, cutoff in (("d", daily_cutoff), ("w", weekly_cutoff)):
+        for doc in db.stats_buckets.find({"g": g, "start": {"$lt": cutoff}}):
+            target_g, start = bucket_start(doc["start"].date(), today)
+            if target_g != g:
+                _merge(db, doc, target_g, start)
+                counts[g] += 1
+    logger.info("stats_buckets compacted: %d daily, %d weekly", counts["d"], counts["w"])
+    return counts
+
+
+def series(db, user_oid, start: dt.date, end: dt.date, by: str = "day") -> list:
+    """
+    Counts per period from the buckets starting between start and end,
+    oldest first. A bucket coarser than `by` (older, compacted data) is
+    reported at its own start.
+    """
+    rows = db.stats_buckets.find(
+        {"u": user_oid,
+         "start": {"$gte": dt.datetime.combine(start, dt.time()),
+                   "$lte": dt.datetime.combine(end, dt.time())}},
+        {"g": 1, "start": 1, "total": 1, "status": 1, "companies": 1},
+    ).sort("start", 1)
+
+    out = {}
+    for doc in rows:
+        day = doc["start"].date()
+        if by == "week" and doc["g"] == "d":
+            day = week_start(day)
+        elif by == "month" and doc["g"] != "m":
+            day = (week_start(day) if doc["g"] == "w" else day).replace(day=1)
+        period = out.setdefault(day, {"start": day, "total": 0, "status": {}, "companies": {}})
+        period["total"] += doc.get("total", 0)
+        for field in ("status", "companies"):
+            for k, v in (doc.get(field) or {}).items():
+                name = _unkey(k)
+                period[field][name] = period[field].get(name, 0) + v
+    for period in out.values():
+        for field in ("status", "companies"):
+            period[field] = {k: v for k, v in period[field].items() if v > 0}
+    return [out[k] for k in sorted(out)]
+
+
+def totals(periods: list, top_companies: int = 10) -> dict:
+    """Sum of a series: total, status counts and the top companies."""
+    status, companies, total = {}, {}, 0
+    for p in periods:
+        total += p["total"]
+        for k, v in p["status"].items():
+            status[k] = status.get(k, 0) + v
+        for k, v in p["companies"].items():
+            companies[k] = companies.get(k, 0) + v
+    top = sorted(companies.items(), key=lambda kv: (-kv[1], kv[0]))[:top_companies]
+    return {"total": total, "status": status, "top_companies": top}
+
+
+def rebuild_user(db, user_oid) -> int:
+    """
+    Recount one user's buckets from their applications. Each bucket is
+    replaced whole and only leftovers are deleted afterwards, so a chart
+    read in between sees the old counts, never an empty range. Returns the
+    number of applications counted.
+    """
+    today = _today()
+    buckets, counted = {}, 0
+    for r in db.applications.find({"user_id": user_oid},
+                                  {"status": 1, "company": 1, "created_at": 1}):
+        found = _deltas(r, 1)
+        if not found:
+            continue
+        day, deltas = found
+        g, start = bucket_start(day, today)
+        doc = buckets.setdefault(bucket_id(user_oid, g, start), {
+            "u": user_oid, "g": g, "start": dt.datetime.combine(start, dt.time()),
+            "total": 0, "status": {}, "companies": {}})
+        for k, v in deltas.items():
+            field, _, name = k.partition(".")
+            if name:
+                doc[field][name] = doc[field].get(name, 0) + v
+            else:
+                doc[field] += v
+        counted += 1
+    ops = [ReplaceOne({"_id": _id}, doc, upsert=True) for _id, doc in buckets.items()]
+    if ops:
+        db.stats_buckets.bulk_write(ops, ordered=False)
+    db.stats_buckets.delete_many({"u": user_oid, "_id": {"$nin": list(buckets)}})
+    return counted
+
+
+def backfill(db, batch_size: int = BACKFILL_BATCH, user_oid=None) -> int:
+    """
+    Rebuild stats_buckets from applications (all users, or one), reading
+    in _id batches. Existing buckets in scope are dropped first, so run it
+    while writes are quiet. Returns the number of applications counted.
+    """
+    scope = {"u": user_oid} if user_oid is not None else {}
+    db.stats_buckets.delete_many(scope)
+    today = _today()
+    counted, last = 0, None
+    base = {"user_id": user_oid} if user_oid is not None else {}
+    while True:
+        match = {**base, "_id": {"$gt": last}} if last is not None else base
+        rows = list(db.applications.find(match, {"user_id": 1, "status": 1, "company": 1,
+                                                 "created_at": 1})
+                    .sort("_id", 1).limit(batch_size))
+        if not rows:
+            return counted
+        last = rows[-1]["_id"]
+        per_user = {}
+        for r in rows:
+            owner = to_object_id(r["user_id"]) or r["user_id"]
+            found = _deltas(r, 1)
+            if found:
+                day, deltas = found
+                inc = per_user.setdefault(owner, {}).setdefault(bucket_start(day, today), {})
+                for k, v in deltas.items():
+                    inc[k] = inc.get(k, 0) + v
+                counted += 1
+        ops = [op for owner, incs in per_user.items() for op in _upserts(owner, incs)]
+        if ops:
+            db.stats_buckets.bulk_write(ops, ordered=False)
+        logger.debug("stats_buckets backfill: %d applications through %s", counted, last)
@@ -0,0 +1,178 @@
+"""
+Append-only `application_events`, written by record_changes() next to the
+rollup update, so the status history of every application is kept.
+
+    {_id, u: user_id, a: application_id, k: kind, s: status, p: previous status,
+     f: [other fields changed], ts: datetime}
+
+kind is "c" created, "s" status changed, "e" edited (no status change) or
+"d" deleted. Statuses are status_bucket() keys; s, p and f are left out
+when they don't apply. Events are never updated.
+
+funnel() answers "how many reached interviewing, and how long did they
+spend in each stage" with one aggregation over a window of recent events:
+$setWindowFields pairs each stage entry with the next one of the same
+application instead of replaying histories in Python.
+"""
+import datetime as dt
+import logging
+
+from pymongo import InsertOne
+
+from ..models.application import EDITABLE_FIELDS, status_bucket, to_datetime, to_object_id
+
+logger = logging.getLogger(__name__)
+
+KINDS = {"c": "created", "s": "status", "e": "edited", "d": "deleted"}
+
+# stages in funnel order; "rejected" ends a history without moving it along
+FUNNEL = ("applied", "interviewing", "offer", "accepted")
+
+DEFAULT_WINDOW_DAYS = 180
+BACKFILL_BATCH = 1000
+
+
+def encode(user_oid, before: dict, after: dict, now: dt.datetime):
+    """The event for one (before, after) change, or None if nothing tracked changed."""
+    doc = after if after is not None else before
+    if not doc or doc.get("_id") is None:
+        return None
+    event = {"u": user_oid, "a": doc["_id"]}
+    if before is None:
+        event.update(k="c", s=status_bucket(after.get("status")))
+        ts = to_datetime(after.get("created_at")) or now
+    elif after is None:
+        event.update(k="d", p=status_bucket(before.get("status")))
+        ts = now
+    else:
+        prev, status = status_bucket(before.get("status")), status_bucket(after.get("status"))
+        # status-only writes pass partial documents: compare what both have
+        changed = [f for f in EDITABLE_FIELDS
+                   if f != "status" and f in before and f in after and before[f] != after[f]]
+        if prev != status:
+            event.update(k="s", s=status, p=prev)
+        elif changed:
+            event["k"] = "e"
+        else:
+            return None
+        if changed:
+            event["f"] = changed
+        ts = now
+    event["ts"] = ts
+    return event
+
+
+def append(db, user_oid, changes, now: dt.datetime = None):
+    """Record the events for a batch of (before, after) changes."""
+    now = now or dt.datetime.utcnow()
+    events = [e for e in (encode(user_oid, b, a, now) for b, a in changes) if e]
+    if events:
+        db.application_events.insert_many(events, ordered=False)
+
+
+def history(db, user_oid, app_oid) -> list:
+    """One application's events, oldest first (a_ts index)."""
+    return list(db.application_events.find({"a": app_oid, "u": user_oid}, {"u": 0, "a": 0})
+                .sort([("ts", 1), ("_id", 1)]))
+
+
+def recent(db, user_oid, limit: int = 20) -> list:
+    """The user's latest events (user_ts index)."""
+    return list(db.application_events.find({"u": user_oid}).sort("ts", -1).limit(limit))
+
+
+def funnel(db, user_oid, days: int = DEFAULT_WINDOW_DAYS, now: dt.datetime = None) -> dict:
+    """
+    Funnel and time-in-stage over the events of the last `days` days.
+
+    stages: {status: {entered, current, avg_days}} where avg_days covers
+    stays that ended in a move to another status; funnel: [(stage, reached,
+    conversion from the previous stage)]; transitions: {(from, to): n}.
+    """
+    now = now or dt.datetime.utcnow()
+    rank = {"$switch": {"branches": [{"case": {"$eq": ["$s", stage]}, "then": i}
+                                     for i, stage in enumerate(FUNNEL)],
+                        "default": -1}}
+    pipeline = [
+        {"$match": {"u": user_oid, "ts": {"$gte": now - dt.timedelta(days=days)},
+                    "k": {"$in": ["c", "s", "d"]}}},
+        {"$setWindowFields": {
+            "partitionBy": "$a",
+            "sortBy": {"ts": 1, "_id": 1},
+            "output": {"next_ts": {"$shift": {"output": "$ts", "by": 1}},
+                       "next_s": {"$shift": {"output": "$s", "by": 1}}},
+        }},
+        # every created/status event starts a stay in status s, which ends
+        # with a move to another status, a deletion, or not yet
+        {"$match": {"k": {"$in": ["c", "s"]}}},
+        {"$set": {"moved": {"$gt": ["$next_s", None]}}},
+        {"$facet": {
+            "stages": [{"$group": {
+                "_id": "$s",
+                "entered": {"$sum": 1},
+                "current": {"$sum": {"$cond": [{"$gt": ["$next_ts", None]}, 0, 1]}},
+                "moved": {"$sum": {"$cond": ["$moved", 1, 0]}},
+                "moved_ms": {"$sum": {"$cond": [
+                    "$moved", {"$subtract": ["$next_ts", "$ts"]}, 0]}},
+            }}],
+            "transitions": [
+                {"$match": {"moved": True}},
+                {"$group": {"_id": {"from": "$s", "to": "$next_s"}, "n": {"$sum": 1}}},
+            ],
+            "reached": [
+                {"$group": {"_id": "$a", "rank": {"$max": rank}}},
+                {"$group": {"_id": "$rank", "n": {"$sum": 1}}},
+            ],
+        }},
+    ]
+    result = next(db.application_events.aggregate(pipeline), None) or {}
+
+    stages = {}
+    for r in result.get("stages", []):
+        stages[r["_id"]] = {
+            "entered": r["entered"],
+            "current": r["current"],
+            "avg_days": round(r["moved_ms"] / r["moved"] / 86_400_000, 1) if r["moved"] else None,
+        }
+
+    by_rank = {r["_id"]: r["n"] for r in result.get("reached", [])}
+    steps, prev = [], None
+    for i, stage in enumerate(FUNNEL):
+        # reaching a later stage counts as having passed this one
+        reached = sum(n for r, n in by_rank.items() if r >= i)
+        steps.append((stage, reached, round(reached / prev, 3) if prev else None))
+        prev = reached
+
+    return {
+        "days": days,
+        "stages": stages,
+        "funnel": steps,
+        "transitions": {(r["_id"]["from"], r["_id"]["to"]): r["n"]
+                        for r in result.get("transitions", [])},
+    }
+
+
+def backfill(db, batch_size: int = BACKFILL_BATCH) -> int:
+    """
+    Give applications that predate the event log a "created" event (at
+    created_at, with their current status). Safe to re-run.
+    """
+    added, last = 0, None
+    while True:
+        match = {"_id": {"$gt": last}} if last is not None else {}
+        rows = list(db.applications.find(match, {"user_id": 1, "status": 1, "created_at": 1})
+                    .sort("_id", 1).limit(batch_size))
+        if not rows:
+            return added
+        last = rows[-1]["_id"]
+        have = set(db.application_events.distinct(
+            "a", {"a": {"$in": [r["_id"] for r in rows]}, "k": "c"}))
+        now = dt.datetime.utcnow()
+        ops = [InsertOne(encode(to_object_id(r["user_id"]) or r["user_id"], None,
+                                {**r, "created_at": r.get("created_at") or r["_id"].generation_time},
+                                now))
+               for r in rows if r["_id"] not in have]
+        if ops:
+            db.application_events.bulk_write(ops, ordered=False)
+            added += len(ops)
+        logger.debug("events backfill: %d added through %s", added, last)
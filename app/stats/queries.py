@@ -0,0 +1,33 @@
+import datetime as dt
+
+RECENT_LIMIT = 5
+UPCOMING_DAYS = 14
+UPCOMING_LIMIT = 3
+
+# Only the fields stats.html renders.
+_CARD_FIELDS = {"company": 1, "role": 1, "status": 1, "link": 1,
+                "created_at": 1, "deadline": 1}
+
+
+def recent_applications(db, user_oid, limit: int = RECENT_LIMIT) -> list:
+    """Newest applications first; walks the (user_id, created_at) index."""
+    return list(
+        db.applications.find({"user_id": user_oid}, _CARD_FIELDS)
+        .sort("created_at", -1)
+        .limit(limit)
+    )
+
+
+def upcoming_deadlines(db, user_oid, days: int = UPCOMING_DAYS,
+                       limit: int = UPCOMING_LIMIT) -> list:
+    """Deadlines from today through the next `days` days, soonest first."""
+    today = dt.datetime.combine(dt.date.today(), dt.time())
+    return list(
+        db.applications.find(
+            {"user_id": user_oid,
+             "deadline": {"$gte": today, "$lte": today + dt.timedelta(days=days)}},
+            _CARD_FIELDS,
+        )
+        .sort("deadline", 1)
+        .limit(limit)
+    )
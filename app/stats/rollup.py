@@ -0,0 +1,161 @@
+"""
+Per-user `user_stats` rollup, kept in step with `applications` by $inc.
+
+    {_id: <user ObjectId>, total: int,
+     status: {<bucket>: int}, companies: {<company>: int},
+     created_days: {"YYYY-MM-DD": int}, updated_at: datetime,
+     version: int, stale: bool}
+
+Writes go through apply_change()/apply_changes(); `flask stats rebuild`
+repairs drift. A write that knows it miscounted calls mark_stale(), and
+the next read rebuilds the rollup instead of the writer. `version` goes up on every write and every rebuild, so it
+identifies the state of the user's applications (see app/conditional.py).
+"""
+import datetime as dt
+import logging
+
+from pymongo.errors import DuplicateKeyError
+
+from ..models.application import STATUS_BUCKET_EXPR, status_bucket, to_datetime
+
+logger = logging.getLogger(__name__)
+
+
+def _key(name) -> str:
+    # '.' and a leading '$' aren't allowed in field names
+    name = (str(name).strip() if name is not None else "") or "Unknown"
+    return name.replace(".", "．").replace("$", "＄")
+
+
+def _unkey(key: str) -> str:
+    return key.replace("．", ".").replace("＄", "$")
+
+
+def _deltas(doc: dict, sign: int) -> dict:
+    inc = {
+        "total": sign,
+        f"status.{_key(status_bucket(doc.get('status')) or 'unknown')}": sign,
+        f"companies.{_key(doc.get('company'))}": sign,
+    }
+    created = to_datetime(doc.get("created_at"))
+    if created:
+        inc[f"created_days.{created.date().isoformat()}"] = sign
+    return inc
+
+
+def apply_change(db, user_oid, before: dict = None, after: dict = None):
+    """
+    Fold one application write into the rollup: before is the document as
+    it was (None for inserts), after as it is now (None for deletes).
+    """
+    apply_changes(db, user_oid, [(before, after)])
+
+
+def apply_changes(db, user_oid, changes):
+    """Fold many (before, after) pairs into the rollup with a single $inc."""
+    inc = {}
+    for before, after in changes:
+        for doc, sign in ((after, 1), (before, -1)):
+            if doc:
+                for k, v in _deltas(doc, sign).items():
+                    inc[k] = inc.get(k, 0) + v
+    inc = {k: v for k, v in inc.items() if v}
+    # bumped even when no counter moved (e.g. only notes were edited)
+    inc["version"] = 1
+
+    res = db.user_stats.update_one(
+        {"_id": user_oid},
+        {"$inc": inc, "$set": {"updated_at": dt.datetime.utcnow()}},
+    )
+    if res.matched_count == 0:
+        # No rollup yet: build it from scratch (includes these writes).
+        rebuild_user(db, user_oid)
+
+
+def rebuild_user(db, user_oid) -> dict:
+    """Recompute one user's rollup from their applications."""
+    pipeline = [
+        {"$match": {"user_id": user_oid}},
+        {"$facet": {
+            "status": [{"$group": {"_id": STATUS_BUCKET_EXPR, "n": {"$sum": 1}}}],
+            "companies": [{"$group": {"_id": "$company", "n": {"$sum": 1}}}],
+            "created_days": [
+                {"$match": {"created_at": {"$type": "date"}}},
+                {"$group": {
+                    "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                    "n": {"$sum": 1},
+                }},
+            ],
+        }},
+    ]
+    result = next(db.applications.aggregate(pipeline), None) or {}
+
+    doc = {"status": {}, "companies": {}, "created_days": {}}
+    for r in result.get("status", []):
+        k = _key(r["_id"] or "unknown")
+        doc["status"][k] = doc["status"].get(k, 0) + r["n"]
+    for r in result.get("companies", []):
+        k = _key(r["_id"])
+        doc["companies"][k] = doc["companies"].get(k, 0) + r["n"]
+    for r in result.get("created_days", []):
+        doc["created_days"][r["_id"]] = r["n"]
+    doc["total"] = sum(doc["status"].values())
+    doc["updated_at"] = dt.datetime.utcnow()
+
+    # $set replaces each counter map whole; version keeps counting up
+    update = {"$set": doc, "$unset": {"stale": ""}, "$inc": {"version": 1}}
+    try:
+        db.user_stats.update_one({"_id": user_oid}, update, upsert=True)
+    except DuplicateKeyError:
+        # a concurrent rebuild won the upsert; overwrite it
+        db.user_stats.update_one({"_id": user_oid}, update)
+    doc["_id"] = user_oid
+    logger.debug("Rebuilt user_stats for %s: total=%d", user_oid, doc["total"])
+    return doc
+
+
+def rebuild_all(db) -> int:
+    """Rebuild every user's rollup. Returns the number of users processed."""
+    user_oids = db.applications.distinct("user_id")
+    for user_oid in user_oids:
+        rebuild_user(db, user_oid)
+    # users whose applications are all gone
+    db.user_stats.update_many(
+        {"_id": {"$nin": user_oids}},
+        {"$set": {"total": 0, "status": {}, "companies": {}, "created_days": {}},
+         "$inc": {"version": 1}},
+    )
+    return len(user_oids)
+
+
+def mark_stale(db, user_oid):
+    """Have the next get_rollup() rebuild the user's rollup."""
+    db.user_stats.update_one({"_id": user_oid},
+                             {"$set": {"stale": True}, "$inc": {"version": 1}})
+
+
+def get_rollup(db, user_oid) -> dict:
+    """The user's rollup document, built on first access or once marked stale."""
+    doc = db.user_stats.find_one({"_id": user_oid})
+    if doc is None or doc.get("stale"):
+        return rebuild_user(db, user_oid)
+    return doc
+
+
+def summarize(rollup: dict, today: dt.date = None) -> dict:
+    """Stats-page numbers from a rollup, in O(#companies + #days)."""
+    today = today or dt.datetime.utcnow().date()
+    companies = {_unkey(k): v for k, v in (rollup.get("companies") or {}).items() if v > 0}
+    top_company = max(companies.items(), key=lambda kv: kv[1]) if companies else ("None", 0)
+
+    days = rollup.get("created_days") or {}
+    week_start = (today - dt.timedelta(days=7)).isoformat()
+    month_start = (today - dt.timedelta(days=30)).isoformat()
+
+    return {
+        "total": rollup.get("total", 0),
+        "status_counts": {_unkey(k): v for k, v in (rollup.get("status") or {}).items() if v > 0},
+        "top_company": top_company,
+        "last_7_days": sum(v for d, v in days.items() if d > week_start),
+        "last_30_days": sum(v for d, v in days.items() if d > month_start),
+    }
@@ -1,84 +1,86 @@
-from flask import request, render_template
+import datetime as dt
+
+from flask import render_template, request
 from flask_login import login_required, current_user
 from . import stats_bp
 from ..db import get_db
-from datetime import datetime, timedelta
-from collections import Counter
-from bson import ObjectId 
-
-
-def to_naive_datetime(dt):
-    """Convert datetime to naive datetime (remove timezone info)"""
-    if isinstance(dt, datetime):
-        return dt.replace(tzinfo=None) if dt.tzinfo else dt
-    try:
-        return datetime.fromisoformat(dt).replace(tzinfo=None)
-    except (ValueError, AttributeError):
-        return None
+from ..conditional import conditional_get
+from ..fragments import fragment_key
+from bson import ObjectId
+from .rollup import get_rollup, summarize
+from . import buckets, events, queries
 
 
 @stats_bp.get("/")
 @login_required
+@conditional_get
 def index():
     db = get_db()
-    applications = list(db.applications.find({
-        "user_id": {"$in": [ObjectId(current_user.id), current_user.id]}
-    }))
-    total_apps = len(applications)
-    now = datetime.now()
-
-    # Last 5 applied jobs (most recent)
-    recent_applications = sorted(applications, key=lambda x: to_naive_datetime(
-        x.get('created_at', now)) or now, reverse=True)
-
-    # Convert created_at to datetime objects for template
-    for app in recent_applications:
-        if app.get('created_at') and isinstance(app.get('created_at'), str):
-            app['created_at'] = datetime.fromisoformat(
-                app.get('created_at')).replace(tzinfo=None)
-        elif not isinstance(app.get('created_at'), datetime):
-            app['created_at'] = now
-
-    # Top company
-    companies = [app.get('company', 'Unknown') for app in applications]
-    company_counts = Counter(companies)
-    top_company = company_counts.most_common(
-        1)[0] if company_counts else ('None', 0)
-
-    # Total last 7 days
-    seven_days_ago = now - timedelta(days=7)
-    last_7_days = sum(1 for app in applications
-                      if app.get('created_at') and (to_naive_datetime(app.get('created_at')) or now) >= seven_days_ago)
-
-    # Total last 30 days
-    thirty_days_ago = now - timedelta(days=30)
-    last_30_days = sum(1 for app in applications
-                       if app.get('created_at') and (to_naive_datetime(app.get('created_at')) or now) >= thirty_days_ago)
-
-    # Status breakdown
-    statuses = [app.get('status', 'unknown') for app in applications]
-    status_counts = Counter(statuses)
-
-    # Upcoming deadlines (next 14 days)
-    upcoming_deadline = now + timedelta(days=14)
-    upcoming_apps = [app for app in applications
-                     if app.get('deadline') and
-                     (datetime.fromisoformat(app['deadline']).replace(tzinfo=None) if isinstance(app['deadline'], str) else app['deadline']) <= upcoming_deadline and
-                     (datetime.fromisoformat(app['deadline']).replace(tzinfo=None) if isinstance(app['deadline'], str) else app['deadline']) >= now]
-    upcoming_apps = sorted(upcoming_apps, key=lambda x: datetime.fromisoformat(
-        x['deadline']).replace(tzinfo=None) if isinstance(x['deadline'], str) else x['deadline'])[:3]
-
-    # Convert deadline to datetime objects for template
-    for app in upcoming_apps:
-        if app.get('deadline') and isinstance(app.get('deadline'), str):
-            app['deadline'] = datetime.fromisoformat(
-                app.get('deadline')).replace(tzinfo=None)
+    user_oid = ObjectId(current_user.id)
+
+    # Counters come from the user_stats rollup
+    summary = summarize(get_rollup(db, user_oid))
+
+    # Lists are small indexed reads with projections
+    recent_applications = queries.recent_applications(db, user_oid)
+    upcoming_apps = queries.upcoming_deadlines(db, user_oid)
+
+    # Weekly chart: one indexed read of the last WEEKLY_CHART_WEEKS weeks of buckets
+    weekly = weekly_chart(db, user_oid)
 
     return render_template("stats.html",
-                           total_apps=total_apps,
+                           frag_key=fragment_key(db, user_oid),
+                           total_apps=summary["total"],
                            recent_applications=recent_applications,
-                           top_company=top_company,
-                           last_7_days=last_7_days,
-                           last_30_days=last_30_days,
-                           status_counts=dict(status_counts),
-                           upcoming_apps=upcoming_apps)
+                           top_company=summary["top_company"],
+                           last_7_days=summary["last_7_days"],
+                           last_30_days=summary["last_30_days"],
+                           status_counts=summary["status_counts"],
+                           upcoming_apps=upcoming_apps,
+                           weekly=weekly,
+                           weekly_max=max([w["total"] for w in weekly] + [1]))
+
+
+WEEKLY_CHART_WEEKS = 12
+
+
+def weekly_chart(db, user_oid) -> list:
+    """Applications created per week for the chart, empty weeks included."""
+    end = dt.datetime.utcnow().date()
+    start = buckets.week_start(end) - dt.timedelta(weeks=WEEKLY_CHART_WEEKS - 1)
+    counts = {p["start"]: p for p in buckets.series(db, user_oid, start, end, by="week")}
+    weeks = [start + dt.timedelta(weeks=i) for i in range(WEEKLY_CHART_WEEKS)]
+    return [counts.get(w, {"start": w, "total": 0, "status": {}}) for w in weeks]
+
+
+TIMELINE_WINDOWS = (30, 90, 180, 365)
+
+
+def timeline_days() -> int:
+    """?days= snapped to one of TIMELINE_WINDOWS (default 180)."""
+    try:
+        days = int(request.args.get("days") or events.DEFAULT_WINDOW_DAYS)
+    except ValueError:
+        days = events.DEFAULT_WINDOW_DAYS
+    return min(TIMELINE_WINDOWS, key=lambda w: abs(w - days))
+
+
+@stats_bp.get("/timeline")
+@login_required
+@conditional_get
+def timeline():
+    db = get_db()
+    user_oid = ObjectId(current_user.id)
+    days = timeline_days()
+    recent = events.recent(db, user_oid)
+    # name the applications the recent events refer to (one $in query)
+    names = {d["_id"]: d for d in db.applications.find(
+        {"_id": {"$in": list({e["a"] for e in recent})}, "user_id": user_oid},
+        {"company": 1, "role": 1})}
+    return render_template("timeline.html",
+                           days=days,
+                           windows=TIMELINE_WINDOWS,
+                           report=events.funnel(db, user_oid, days),
+                           recent=recent,
+                           names=names,
+                           kinds=events.KINDS)
@@ -0,0 +1,140 @@
+"""
+Dashboard throughput: sync PyMongo views vs the ASYNC_MONGO Motor path.
+
+Needs a reachable MongoDB (MONGO_URI). Seeds a throwaway database, serves
+each mode from a threaded local WSGI server and hits the dashboard with
+concurrent clients, then prints requests/sec and p50/p99 latency.
+
+    python benchmarks/async_vs_sync.py --apps 5000 --concurrency 32 --requests 3000
+"""
+import argparse
+import datetime as dt
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+EMAIL = "bench@example.com"
+PASSWORD = "bench-password"
+
+
+def seed(db, n_apps: int):
+    from werkzeug.security import generate_password_hash
+    from app.db import ensure_indexes
+    from app.stats.rollup import rebuild_user
+
+    db.users.delete_many({})
+    db.applications.delete_many({})
+    db.user_stats.delete_many({})
+    ensure_indexes(db)
+
+    user_id = db.users.insert_one({
+        "email": EMAIL, "password_hash": generate_password_hash(PASSWORD),
+    }).inserted_id
+    today = dt.datetime.combine(dt.date.today(), dt.time())
+    statuses = ["applied", "interviewing", "offer", "rejected"]
+    docs = []
+    for i in range(n_apps):
+        created = today - dt.timedelta(days=random.randint(0, 365))
+        docs.append({
+            "user_id": user_id,
+            "company": f"Company {random.randint(1, 200)}",
+            "role": random.choice(["Engineer", "Analyst", "Designer", "PM"]),
+            "status": random.choice(statuses),
+            "deadline": today + dt.timedelta(days=random.randint(-60, 60)),
+            "created_at": created,
+            "updated_at": created,
+        })
+    for i in range(0, len(docs), 1000):
+        db.applications.insert_many(docs[i:i + 1000])
+    rebuild_user(db, user_id)
+
+
+def serve(app):
+    from werkzeug.serving import make_server
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def login(base: str) -> str:
+    """Log in once and return the Cookie header to reuse."""
+    class NoRedirect(urllib.request.HTTPRedirectHandler):
+        def redirect_request(self, *a, **k):
+            return None
+
+    opener = urllib.request.build_opener(NoRedirect)
+    body = urllib.parse.urlencode({"email": EMAIL, "password": PASSWORD}).encode()
+    try:
+        opener.open(base + "/auth/login", body)
+    except urllib.error.HTTPError as e:       # the 302 after login
+        cookies = e.headers.get_all("Set-Cookie") or []
+        return "; ".join(c.split(";", 1)[0] for c in cookies)
+    raise RuntimeError("login did not redirect")
+
+
+def hammer(base: str, cookie: str, total: int, concurrency: int) -> dict:
+    paths = ["/", "/?sort=updated", "/?status=applied", "/?page=3"]
+
+    def one(i):
+        req = urllib.request.Request(base + paths[i % len(paths)], headers={"Cookie": cookie})
+        t0 = time.perf_counter()
+        with urllib.request.urlopen(req) as resp:
+            resp.read()
+            assert resp.status == 200
+        return time.perf_counter() - t0
+
+    one(0)  # warm up connections / templates
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        latencies = sorted(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - t0
+    q = statistics.quantiles(latencies, n=100)
+    return {
+        "requests": total,
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(q[49] * 1000, 2),
+        "p99_ms": round(q[98] * 1000, 2),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--apps", type=int, default=2000)
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--db-name", default="job_trackr_bench")
+    ap.add_argument("--json", help="also write results to this file")
+    args = ap.parse_args()
+
+    os.environ["DB_NAME"] = args.db_name
+    from app import create_app
+    from app.db import get_db
+
+    seed(get_db(), args.apps)
+
+    results = {}
+    for mode in ("sync", "async"):
+        os.environ["ASYNC_MONGO"] = "1" if mode == "async" else "0"
+        server, base = serve(create_app())
+        try:
+            results[mode] = hammer(base, login(base), args.requests, args.concurrency)
+        finally:
+            server.shutdown()
+        print(f"{mode:>5}: {results[mode]}")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Cold start: time from spawning a server process to its first served request.
+
+Each run starts a fresh interpreter that builds the app and serves it on a
+local port, and polls /auth/login until it answers 200. Development and
+production startup (FLASK_ENV) are measured separately; production runs
+reuse the template bytecode cache, as restarted workers would.
+
+    python benchmarks/cold_start.py --runs 10
+    python benchmarks/cold_start.py --mongomock      # no Mongo needed
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+
+def serve(port: int, mongomock: bool):
+    """Child process: build the app and serve it until killed."""
+    if mongomock:
+        import seed as seeding      # benchmarks/seed.py
+        seeding.use_mongomock()
+    from werkzeug.serving import make_server
+    from app import create_app
+    make_server("127.0.0.1", port, create_app(), threaded=True).serve_forever()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def cold_start(env: dict, mongomock: bool, timeout: float) -> float:
+    port = _free_port()
+    cmd = [sys.executable, __file__, "--serve", str(port)] + (["--mongomock"] if mongomock else [])
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, env=env, cwd=ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - t0 < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited with {proc.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/auth/login", timeout=1) as r:
+                    if r.status == 200:
+                        return time.perf_counter() - t0
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.005)
+        raise RuntimeError("server did not answer in time")
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--timeout", type=float, default=30)
+    ap.add_argument("--mongomock", action="store_true")
+    ap.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.mongomock)
+        return
+
+    cache_dir = tempfile.mkdtemp(prefix="jobtrackr-jinja-")
+    for mode in ("development", "production"):
+        env = {**os.environ, "FLASK_ENV": mode, "JINJA_CACHE_DIR": cache_dir if mode == "production" else "",
+               "LOG_LEVEL": "WARNING"}
+        times = [cold_start(env, args.mongomock, args.timeout) for _ in range(args.runs)]
+        print(f"{mode:<12} median {statistics.median(times) * 1000:8.1f} ms  "
+              f"min {min(times) * 1000:8.1f} ms  max {max(times) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
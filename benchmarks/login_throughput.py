@@ -0,0 +1,117 @@
+"""
+Login throughput with password hashing inline vs in the process pool.
+
+Needs a reachable MongoDB (MONGO_URI). Seeds one user in a throwaway
+database, then for each PASSWORD_HASH_WORKERS setting runs a storm of
+concurrent logins against a threaded local server while a second client
+polls a cheap page, and prints login/s plus that page's p50/p99 latency,
+i.e. how much the hashing starves unrelated requests.
+
+    python benchmarks/login_throughput.py --workers 0 2 4 --logins 400 --concurrency 16
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+EMAIL = "bench-login@example.com"
+PASSWORD = "bench-password"
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *a, **k):
+        return None
+
+
+def serve(app):
+    from werkzeug.serving import make_server
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def run(base: str, logins: int, concurrency: int) -> dict:
+    opener = urllib.request.build_opener(_NoRedirect)
+    body = urllib.parse.urlencode({"email": EMAIL, "password": PASSWORD}).encode()
+
+    def login(_):
+        try:
+            opener.open(base + "/auth/login", body)
+        except urllib.error.HTTPError as e:
+            return e.code
+        return 200
+
+    probe_ms, done = [], threading.Event()
+
+    def probe():
+        while not done.is_set():
+            t0 = time.perf_counter()
+            with urllib.request.urlopen(base + "/auth/login") as resp:
+                resp.read()
+            probe_ms.append((time.perf_counter() - t0) * 1000)
+
+    login(0)  # start the pool / warm templates
+    prober = threading.Thread(target=probe)
+    t0 = time.perf_counter()
+    prober.start()
+    with ThreadPoolExecutor(concurrency) as pool:
+        codes = list(pool.map(login, range(logins)))
+    elapsed = time.perf_counter() - t0
+    done.set()
+    prober.join()
+
+    q = statistics.quantiles(probe_ms, n=100) if len(probe_ms) > 1 else [0] * 99
+    return {
+        "logins_per_s": round(codes.count(302) / elapsed, 1),
+        "rejected_503": codes.count(503),
+        "probe_p50_ms": round(q[49], 2),
+        "probe_p99_ms": round(q[98], 2),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--workers", type=int, nargs="+", default=[0, 2, 4])
+    ap.add_argument("--logins", type=int, default=400)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--method", default=os.getenv("PASSWORD_HASH_METHOD", "scrypt"))
+    ap.add_argument("--db-name", default="job_trackr_bench")
+    ap.add_argument("--json", help="also write results to this file")
+    args = ap.parse_args()
+
+    os.environ["DB_NAME"] = args.db_name
+    os.environ["PASSWORD_HASH_METHOD"] = args.method
+    from app import create_app
+    from app.db import get_db
+    from app.models.user import User
+
+    results = {}
+    for workers in args.workers:
+        os.environ["PASSWORD_HASH_WORKERS"] = str(workers)
+        app = create_app()
+        db = get_db()
+        db.users.delete_many({"email": EMAIL})
+        User.create(db, EMAIL, PASSWORD)
+        server, base = serve(app)
+        try:
+            results[workers] = run(base, args.logins, args.concurrency)
+        finally:
+            server.shutdown()
+        print(f"workers={workers}: {results[workers]}")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
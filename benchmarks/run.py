@@ -0,0 +1,250 @@
+"""
+Scripted load test: throughput and p50/p95/p99 per endpoint.
+
+Virtual users log in as seeded users (see seed.py) and loop over a
+weighted mix: dashboard (plain, filtered, searched, deep page), stats,
+edit form + save, and status updates, with the occasional fresh login.
+Results are written as JSON and, given a baseline file, compared against
+it; the exit code is 1 when any scenario regressed past --threshold.
+
+    python benchmarks/run.py --seed-users 200 --apps-per-user 500 --out results.json
+    python benchmarks/run.py --no-seed --baseline results.json --duration 60
+    python benchmarks/run.py --mongomock --concurrency 1     # no Mongo needed
+"""
+import argparse
+import html
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import seed as seeding  # noqa: E402  (benchmarks/seed.py)
+
+HIDDEN_INPUT = re.compile(r'<input type="hidden" name="(rev|base_\w+)" value="([^"]*)">')
+NEXT_LINK = re.compile(r'<a href="([^"]*\bafter=[^"]*)">Next</a>')
+DEEP_PAGE_MAX = 50
+
+MIX = {
+    "dashboard": 25,
+    "dashboard_filter": 10,
+    "dashboard_search": 10,
+    "dashboard_deep_page": 10,
+    "stats": 20,
+    "edit": 5,
+    "status_update": 15,
+    "login": 5,
+}
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds, ok):
+        with self._lock:
+            self.samples.setdefault(name, []).append(seconds)
+            if not ok:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+    def summary(self, elapsed):
+        out = {}
+        for name, xs in sorted(self.samples.items()):
+            xs = sorted(xs)
+            q = statistics.quantiles(xs, n=100) if len(xs) > 1 else [xs[0]] * 99
+            out[name] = {
+                "requests": len(xs),
+                "errors": self.errors.get(name, 0),
+                "rps": round(len(xs) / elapsed, 2),
+                "p50_ms": round(q[49] * 1000, 2),
+                "p95_ms": round(q[94] * 1000, 2),
+                "p99_ms": round(q[98] * 1000, 2),
+            }
+        return out
+
+
+class VirtualUser:
+    """One logged-in client running the mix."""
+
+    def __init__(self, app, email, job_ids, rng, recorder):
+        self.client = app.test_client()
+        self.email = email
+        self.job_ids = job_ids
+        self.rng = rng
+        self.rec = recorder
+        self.next_page, self.depth = None, 0
+
+    def _timed(self, name, fn, ok_codes=(200, 302, 304)):
+        t0 = time.perf_counter()
+        resp = fn()
+        self.rec.add(name, time.perf_counter() - t0, resp.status_code in ok_codes)
+        return resp
+
+    def login(self):
+        return self._timed("login", lambda: self.client.post(
+            "/auth/login", data={"email": self.email, "password": seeding.PASSWORD}))
+
+    def step(self, name):
+        c, rng = self.client, self.rng
+        if name == "login":
+            self.login()
+        elif name == "dashboard":
+            self._timed(name, lambda: c.get("/"))
+        elif name == "dashboard_filter":
+            status = rng.choice(["applied", "interviewing", "offer", "rejected"])
+            sort = rng.choice(["deadline", "updated"])
+            self._timed(name, lambda: c.get(f"/?status={status}&sort={sort}"))
+        elif name == "dashboard_search":
+            term = rng.choice(["Engineer", "Company 1", "referral", "Analyst"])
+            self._timed(name, lambda: c.get("/", query_string={"q": term}))
+        elif name == "dashboard_deep_page":
+            # page through the list the way the Next link does (after= cursor),
+            # one page per step, starting over at DEEP_PAGE_MAX or the end
+            url = self.next_page or "/?sort=updated"
+            resp = self._timed(name, lambda: c.get(url))
+            found = NEXT_LINK.search(resp.get_data(as_text=True))
+            self.depth += 1
+            if found and self.depth < DEEP_PAGE_MAX:
+                self.next_page = html.unescape(found.group(1))
+            else:
+                self.next_page, self.depth = None, 0
+        elif name == "stats":
+            self._timed(name, lambda: c.get("/stats/"))
+        elif name == "edit" and self.job_ids:
+            job = rng.choice(self.job_ids)
+            form = self._timed("edit_form", lambda: c.get(f"/edit/{job}"))
+            # post back the revision and base values the form was loaded with
+            data = {k: html.unescape(v)
+                    for k, v in HIDDEN_INPUT.findall(form.get_data(as_text=True))}
+            data["notes"] = f"bench note {rng.randint(0, 10**6)}"
+            self._timed(name, lambda: c.post(f"/edit/{job}", data=data))
+        elif name == "status_update" and self.job_ids:
+            job = rng.choice(self.job_ids)
+            status = rng.choice(["applied", "interviewing", "offer", "rejected"])
+            self._timed(name, lambda: c.post(f"/status/{job}", data={"status": status}))
+
+
+def _pick_users(db, n, rng):
+    users = list(db.users.find({"email": {"$regex": "^bench"}}, {"email": 1}).limit(max(n * 4, n)))
+    rng.shuffle(users)
+    picked = []
+    for u in users[:n]:
+        ids = [str(d["_id"]) for d in db.applications.find({"user_id": u["_id"]}, {"_id": 1}).limit(50)]
+        picked.append((u["email"], ids))
+    return picked
+
+
+def run(app, db, args, mix):
+    rng = random.Random(args.seed)
+    users = _pick_users(db, args.concurrency, rng)
+    if not users:
+        raise SystemExit("No seeded users found; run without --no-seed first.")
+    rec = Recorder()
+    names, weights = zip(*mix.items())
+    ready = threading.Barrier(args.concurrency)
+
+    def worker(i):
+        email, job_ids = users[i % len(users)]
+        # login and warm-up aren't recorded
+        vu = VirtualUser(app, email, job_ids, random.Random(args.seed + i), Recorder())
+        vu.login()
+        for _ in range(args.warmup):
+            vu.step("dashboard")
+        vu.rec = rec
+        ready.wait()
+        end = time.perf_counter() + args.duration
+        while time.perf_counter() < end:
+            vu.step(vu.rng.choices(names, weights)[0])
+
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        list(pool.map(worker, range(args.concurrency)))
+    return rec.summary(args.duration)
+
+
+def compare(results, baseline, threshold):
+    """Print per-scenario deltas; return the names that regressed."""
+    regressed = []
+    print(f"\n{'scenario':<22}{'p50 Δ':>10}{'p95 Δ':>10}{'p99 Δ':>10}{'rps Δ':>10}")
+    for name, cur in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        deltas = {k: (cur[k] - base[k]) / base[k] * 100 if base[k] else 0.0
+                  for k in ("p50_ms", "p95_ms", "p99_ms", "rps")}
+        worse = deltas["p95_ms"] > threshold or deltas["rps"] < -threshold
+        regressed += [name] if worse else []
+        print(f"{name:<22}" + "".join(f"{deltas[k]:>+9.1f}%" for k in
+                                      ("p50_ms", "p95_ms", "p99_ms", "rps"))
+              + ("  REGRESSED" if worse else ""))
+    return regressed
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--seed-users", type=int, default=50)
+    ap.add_argument("--apps-per-user", type=int, default=200)
+    ap.add_argument("--legacy-fraction", type=float, default=0.1)
+    ap.add_argument("--no-seed", action="store_true", help="reuse the existing dataset")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--duration", type=float, default=30, help="seconds of load")
+    ap.add_argument("--warmup", type=int, default=3, help="dashboard loads per user first")
+    ap.add_argument("--db-name", default="job_trackr_bench")
+    ap.add_argument("--mongomock", action="store_true")
+    ap.add_argument("--out", default="benchmarks/results.json")
+    ap.add_argument("--baseline", help="earlier results JSON to compare against")
+    ap.add_argument("--threshold", type=float, default=10.0, help="regression threshold in %%")
+    args = ap.parse_args()
+
+    os.environ["DB_NAME"] = args.db_name
+    # benchmark traffic all comes from one IP: don't throttle it
+    os.environ.update(LOGIN_RATE_LIMIT_IP="0", LOGIN_RATE_LIMIT_EMAIL="0")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    mix = dict(MIX)
+    if args.mongomock:
+        seeding.use_mongomock()
+        mix.pop("dashboard_search")         # mongomock has no $text
+    from app import create_app
+    from app.db import get_db
+
+    db = get_db()
+    dataset = None
+    if not args.no_seed:
+        dataset = seeding.seed(db, args.seed_users, args.apps_per_user,
+                               args.legacy_fraction, args.seed)
+        print("seeded:", dataset)
+
+    results = run(create_app(), db, args, mix)
+    for name, r in results.items():
+        print(f"{name:<22}{r['requests']:>7} req {r['rps']:>8} req/s  "
+              f"p50 {r['p50_ms']:>8} ms  p95 {r['p95_ms']:>8} ms  p99 {r['p99_ms']:>8} ms"
+              + (f"  errors {r['errors']}" if r["errors"] else ""))
+
+    report = {
+        "meta": {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                 "concurrency": args.concurrency, "duration": args.duration,
+                 "mongomock": args.mongomock, "dataset": dataset},
+        "results": results,
+    }
+    with open(args.out, "w") as fh:
+        json.dump(report, fh, indent=2)
+    print("wrote", args.out)
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            regressed = compare(results, json.load(fh)["results"], args.threshold)
+        if regressed:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
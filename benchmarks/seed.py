@@ -0,0 +1,152 @@
+"""
+Seed a database with synthetic users and applications for benchmarks.
+
+Data looks like production: a skewed company distribution, every status
+spelling the app accepts ("interview", "Offered", ...), and a share of
+legacy users whose applications were written with a string user_id and
+ISO-string dates. The app only reads the migrated shape, so seed() then
+runs the `flask db migrate` conversion on them, and builds the user_stats
+rollups, stats buckets and event log the way `flask stats` does on a
+live database; each of these is timed as its own step.
+
+    python benchmarks/seed.py --users 1000 --apps-per-user 500 --db-name job_trackr_bench
+    python benchmarks/seed.py --mongomock ...   # in-memory, for a quick dry run
+
+All seeded users share the password `bench-password`.
+"""
+import argparse
+import datetime as dt
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+PASSWORD = "bench-password"
+EMAIL_FMT = "bench{:06d}@example.com"
+
+STATUSES = ["applied"] * 6 + ["Applied", "interview", "interviewing", "interviewing",
+                              "offer", "offered", "rejected", "rejected", "rejected"]
+ROLES = ["Software Engineer", "Data Analyst", "Product Manager", "Designer",
+         "SRE", "Backend Engineer", "ML Engineer", "QA Engineer"]
+NOTES = ["referral from alumni", "recruiter reached out", "take-home due soon",
+         "follow up next week", "", "", ""]
+
+
+def use_mongomock():
+    """Point app.db at an in-process mongomock client (no $text support)."""
+    import mongomock
+    import app.db as app_db
+    client = mongomock.MongoClient()
+    app_db.get_client = lambda: client
+    return client
+
+
+def _application(rng, user_id, today, legacy):
+    created = today - dt.timedelta(days=rng.randint(0, 720), minutes=rng.randint(0, 1440))
+    updated = created + dt.timedelta(days=rng.randint(0, 30))
+    deadline = today + dt.timedelta(days=rng.randint(-90, 90)) if rng.random() < 0.7 else None
+    applied = created.date() if rng.random() < 0.8 else None
+    company = f"Company {int(rng.paretovariate(1.2)) % 2000}"
+    doc = {
+        "user_id": str(user_id) if legacy else user_id,
+        "company": company,
+        "role": rng.choice(ROLES),
+        "status": rng.choice(STATUSES),
+        "link": f"https://jobs.example.com/{rng.randint(1, 10**6)}" if rng.random() < 0.5 else "",
+        "notes": rng.choice(NOTES),
+    }
+    if legacy:
+        fmt = rng.choice(["%Y-%m-%d", "%Y/%m/%d"])
+        doc.update({
+            "deadline": deadline.strftime(fmt) if deadline else "",
+            "applied_date": applied.strftime(fmt) if applied else "",
+            "created_at": created.isoformat(),
+            "updated_at": updated.isoformat(),
+        })
+    else:
+        doc.update({
+            "deadline": deadline,
+            "applied_date": dt.datetime.combine(applied, dt.time()) if applied else None,
+            "created_at": created,
+            "updated_at": updated,
+        })
+    return doc
+
+
+def seed(db, users: int, apps_per_user: int, legacy_fraction: float = 0.1,
+         seed_value: int = 42, batch_size: int = 5000, reset: bool = True) -> dict:
+    """Insert the dataset; returns a summary dict."""
+    from werkzeug.security import generate_password_hash
+    from app.db import ensure_indexes, migrate_legacy_types
+    from app.stats import buckets, events, rollup
+
+    rng = random.Random(seed_value)
+    if reset:
+        for name in ("users", "applications", "user_stats", "application_events",
+                     "stats_buckets", "sessions", "rate_limits"):
+            db[name].delete_many({})
+    ensure_indexes(db)
+
+    t0 = time.perf_counter()
+    pwhash = generate_password_hash(PASSWORD)      # hashed once, shared by all
+    today = dt.datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    user_ids = db.users.insert_many(
+        [{"email": EMAIL_FMT.format(i), "password_hash": pwhash} for i in range(users)]
+    ).inserted_ids
+
+    batch, inserted, legacy_users = [], 0, 0
+    for user_id in user_ids:
+        legacy = rng.random() < legacy_fraction
+        legacy_users += legacy
+        n = max(int(rng.gauss(apps_per_user, apps_per_user * 0.3)), 1)
+        for _ in range(n):
+            batch.append(_application(rng, user_id, today, legacy))
+            if len(batch) >= batch_size:
+                db.applications.insert_many(batch, ordered=False)
+                inserted += len(batch)
+                batch = []
+    if batch:
+        db.applications.insert_many(batch, ordered=False)
+        inserted += len(batch)
+
+    seconds = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    migrated = migrate_legacy_types(db) if legacy_users else 0
+    migrate_seconds = time.perf_counter() - t0
+
+    # without these the first requests would pay for the rollup rebuilds
+    # and the stats pages would chart empty buckets and event logs
+    derived = {}
+    for name, build in (("rollups", rollup.rebuild_all), ("buckets", buckets.backfill),
+                        ("events", events.backfill)):
+        t0 = time.perf_counter()
+        derived[name] = build(db)
+        derived[f"{name}_seconds"] = round(time.perf_counter() - t0, 1)
+
+    return {"users": users, "applications": inserted, "legacy_users": legacy_users,
+            "seed": seed_value, "seconds": round(seconds, 1),
+            "migrated": migrated, "migrate_seconds": round(migrate_seconds, 1), **derived}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--users", type=int, default=100)
+    ap.add_argument("--apps-per-user", type=int, default=200)
+    ap.add_argument("--legacy-fraction", type=float, default=0.1)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--db-name", default="job_trackr_bench")
+    ap.add_argument("--mongomock", action="store_true")
+    args = ap.parse_args()
+
+    os.environ["DB_NAME"] = args.db_name
+    if args.mongomock:
+        use_mongomock()
+    from app.db import get_db
+    print(seed(get_db(), args.users, args.apps_per_user, args.legacy_fraction, args.seed))
+
+
+if __name__ == "__main__":
+    main()
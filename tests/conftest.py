@@ -0,0 +1,52 @@
+"""
+Test fixtures: the app on an in-memory mongomock database.
+
+mongomock has no $text index or $setWindowFields, so search and the
+timeline funnel aren't covered here.
+"""
+import mongomock
+import pytest
+from bson import ObjectId
+
+import app.db as app_db
+from app import create_app
+
+PASSWORD = "test-password"
+
+
+@pytest.fixture
+def db(monkeypatch):
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(app_db, "get_client", lambda: client)
+    monkeypatch.setenv("DB_NAME", "job_trackr_test")
+    return app_db.get_db()
+
+
+@pytest.fixture
+def app(db, monkeypatch):
+    for name, value in {"FLASK_ENV": "development", "SECRET_KEY": "test",
+                        "MONGO_AUTO_INDEX": "0", "MONGO_PREWARM": "0",
+                        "SESSION_BACKEND": "cookie", "RATE_LIMIT_BACKEND": "memory",
+                        "LOGIN_RATE_LIMIT_IP": "0", "LOGIN_RATE_LIMIT_EMAIL": "0",
+                        "SIGNUP_RATE_LIMIT_IP": "0",
+                        "PASSWORD_HASH_METHOD": "pbkdf2:sha256:1000"}.items():
+        monkeypatch.setenv(name, value)
+    app = create_app()
+    app.config["TESTING"] = True
+    app_db.ensure_indexes(db)
+    return app
+
+
+def sign_up(client, email):
+    client.post("/auth/signup", data={"email": email, "password": PASSWORD,
+                                      "confirm_password": PASSWORD})
+    client.post("/auth/login", data={"email": email, "password": PASSWORD})
+
+
+@pytest.fixture
+def client(app, db):
+    client = app.test_client()
+    sign_up(client, "user@example.com")
+    client.user_oid = db.users.find_one({"email": "user@example.com"})["_id"]
+    assert isinstance(client.user_oid, ObjectId)
+    return client
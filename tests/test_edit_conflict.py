@@ -0,0 +1,65 @@
+import re
+
+HIDDEN = re.compile(r'<input type="hidden" name="([^"]+)" value="([^"]*)">')
+FORM = {"company": "Acme", "role": "Dev", "status": "applied", "deadline": "",
+        "link": "", "notes": ""}
+
+
+def edit_form(client, job_id):
+    """The hidden rev/base_* fields of the edit form, as the browser posts them."""
+    return dict(HIDDEN.findall(client.get(f"/edit/{job_id}").get_data(as_text=True)))
+
+
+def test_edit_bumps_rev(client, db):
+    job_id = client.post("/api/v1/applications", json={"company": "Acme", "role": "Dev"}).json["id"]
+    hidden = edit_form(client, job_id)
+    assert hidden["rev"] == "1"
+
+    resp = client.post(f"/edit/{job_id}", data={**hidden, **FORM, "notes": "first"})
+    assert resp.status_code == 302
+    doc = db.applications.find_one()
+    assert (doc["rev"], doc["notes"]) == (2, "first")
+
+
+def test_stale_form_gets_merge_view_not_overwrite(client, db):
+    job_id = client.post("/api/v1/applications", json={"company": "Acme", "role": "Dev"}).json["id"]
+    stale = edit_form(client, job_id)
+    # another tab moves the job on after this form was loaded
+    client.post(f"/status/{job_id}", data={"status": "interviewing"})
+    client.patch(f"/api/v1/applications/{job_id}", json={"notes": "theirs"})
+
+    resp = client.post(f"/edit/{job_id}", data={**stale, **FORM, "role": "Senior Dev",
+                                                "notes": "mine"})
+    assert resp.status_code == 200
+    assert "changed somewhere else" in resp.get_data(as_text=True)
+    doc = db.applications.find_one()
+    assert (doc["role"], doc["status"], doc["notes"]) == ("Dev", "interviewing", "theirs")
+
+    # the re-rendered form carries the current revision, so saving it works
+    fresh = dict(HIDDEN.findall(resp.get_data(as_text=True)))
+    assert fresh["rev"] == str(doc["rev"])
+    resp = client.post(f"/edit/{job_id}", data={**fresh, **FORM, "status": "interviewing",
+                                                "role": "Senior Dev", "notes": "mine"})
+    assert resp.status_code == 302
+    doc = db.applications.find_one()
+    assert (doc["role"], doc["status"], doc["notes"]) == ("Senior Dev", "interviewing", "mine")
+
+
+def test_api_patch_with_stale_rev_is_409(client, db):
+    job_id = client.post("/api/v1/applications", json={"company": "Acme", "role": "Dev"}).json["id"]
+    assert client.patch(f"/api/v1/applications/{job_id}",
+                        json={"notes": "a", "rev": 1}).status_code == 200
+    resp = client.patch(f"/api/v1/applications/{job_id}", json={"notes": "b", "rev": 1})
+    assert resp.status_code == 409
+    assert db.applications.find_one()["notes"] == "a"
+
+
+def test_tampered_base_values_dont_skew_the_rollup(client, db):
+    job_id = client.post("/api/v1/applications",
+                         json={"company": "Acme", "role": "Dev", "status": "offer"}).json["id"]
+    hidden = edit_form(client, job_id)
+    # a client claiming the job was "applied" can't move the counts
+    hidden["base_status"] = "applied"
+    client.post(f"/edit/{job_id}", data={**hidden, **FORM, "status": "rejected"})
+    stats = db.user_stats.find_one({"_id": client.user_oid})
+    assert {k: v for k, v in stats["status"].items() if v} == {"rejected": 1}
@@ -0,0 +1,80 @@
+import datetime as dt
+
+import pytest
+from bson import ObjectId
+
+from app.dashboard.queries import dashboard_snapshot, decode_cursor
+from app.stats import rollup
+
+PAGE_SIZE = 4
+
+
+@pytest.fixture
+def user_apps(db):
+    """23 applications with tied sort values and missing deadlines."""
+    user_oid = ObjectId()
+    day = dt.datetime(2026, 3, 1)
+    docs = [{"user_id": user_oid, "company": f"C{i}", "role": "R", "status": "applied",
+             "deadline": day + dt.timedelta(days=i % 5) if i % 4 else None,
+             "updated_at": day + dt.timedelta(hours=i % 3),
+             "created_at": day, "rev": 1}
+            for i in range(23)]
+    db.applications.insert_many(docs)
+    # someone else's, never listed
+    db.applications.insert_one({**docs[0], "_id": ObjectId(), "user_id": ObjectId()})
+    rollup.rebuild_user(db, user_oid)
+    return user_oid, docs
+
+
+def page(db, user_oid, sort, **cursor):
+    return dashboard_snapshot(db, user_oid, sort=sort, page_size=PAGE_SIZE,
+                              **{k: decode_cursor(v) for k, v in cursor.items()})
+
+
+def walk(db, user_oid, sort):
+    """Every page, first to last, following the Next cursors."""
+    pages, snap = [], page(db, user_oid, sort)
+    while True:
+        pages.append([d["_id"] for d in snap["applications"]])
+        if not snap["has_next"]:
+            return pages, snap
+        snap = page(db, user_oid, sort, after=snap["next"])
+
+
+@pytest.mark.parametrize("sort", ["deadline", "updated"])
+def test_cursor_pages_cover_the_list_once(db, user_apps, sort):
+    user_oid, docs = user_apps
+    pages, _ = walk(db, user_oid, sort)
+    ids = [i for p in pages for i in p]
+    assert len(ids) == len(set(ids)) == len(docs)
+    assert all(len(p) == PAGE_SIZE for p in pages[:-1])
+
+
+@pytest.mark.parametrize("sort", ["deadline", "updated"])
+def test_cursor_order_matches_the_sort(db, user_apps, sort):
+    user_oid, docs = user_apps
+    ids = [i for p in walk(db, user_oid, sort)[0] for i in p]
+    if sort == "deadline":
+        # ascending; Mongo sorts null lowest, so undated ones come first
+        key = [(d["deadline"] is not None, d["deadline"] or dt.datetime.min, d["_id"])
+               for d in docs]
+        expected = [k[2] for k in sorted(key)]
+    else:
+        expected = [d["_id"] for d in sorted(docs, key=lambda d: (d["updated_at"], d["_id"]),
+                                             reverse=True)]
+    assert ids == expected
+
+
+def test_prev_cursor_returns_the_same_pages(db, user_apps):
+    user_oid, _ = user_apps
+    forward, snap = walk(db, user_oid, "updated")
+    backward = [[d["_id"] for d in snap["applications"]]]
+    while snap["has_prev"]:
+        snap = page(db, user_oid, "updated", before=snap["prev"])
+        backward.append([d["_id"] for d in snap["applications"]])
+    assert backward[::-1] == forward
+
+
+def test_malformed_cursor_is_ignored():
+    assert decode_cursor("not-a-cursor") is None
+    assert decode_cursor("") is None
@@ -0,0 +1,99 @@
+import pytest
+
+from app import ratelimit
+from app.ratelimit import Limit, MemoryStore, MongoStore, RateLimiter
+
+from conftest import PASSWORD, sign_up
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ratelimit.time, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "mongo"])
+def limiter(request, db):
+    store = MemoryStore() if request.param == "memory" else MongoStore(lambda: db)
+    return RateLimiter(store)
+
+
+def test_limit_parse():
+    limit = Limit.parse("x", "20/60")
+    assert (limit.limit, limit.window) == (20, 60)
+    assert Limit.parse("x", "").limit == 0
+    assert Limit.parse("x", "5").window == 60
+
+
+def test_hits_over_the_limit_get_a_retry_after(limiter, clock):
+    limit = Limit("login-ip", 3, 60)
+    assert [limiter.hit([(limit, "1.2.3.4")]) for _ in range(3)] == [0, 0, 0]
+    assert 0 < limiter.hit([(limit, "1.2.3.4")]) <= 60
+    # other keys and disabled limits are unaffected
+    assert limiter.hit([(limit, "5.6.7.8")]) == 0
+    assert limiter.hit([(Limit("off", 0, 60), "1.2.3.4"), (limit, None)]) == 0
+
+
+def test_previous_window_slides_out(limiter, clock):
+    limit = Limit("login-email", 4, 60)
+    clock.now = 60 * 1000           # start of a window
+    for _ in range(4):
+        limiter.hit([(limit, "a@example.com")])
+    # halfway into the next window half the previous hits still count
+    clock.now += 90
+    assert limiter.hit([(limit, "a@example.com")]) == 0
+    assert limiter.hit([(limit, "a@example.com")]) == 0
+    assert limiter.hit([(limit, "a@example.com")]) > 0
+
+
+def test_failing_store_lets_hits_through(clock):
+    class Broken:
+        def incr(self, key, ttl):
+            raise RuntimeError("down")
+    assert RateLimiter(Broken()).hit([(Limit("x", 1, 60), "k")]) == 0
+
+
+def test_memory_store_evicts_expired_keys_first(clock):
+    store = MemoryStore(max_keys=3)
+    store.incr("long", ttl=600)
+    store.incr("short-1", ttl=10)
+    store.incr("short-2", ttl=10)
+    clock.now += 11
+    store.incr("new", ttl=10)
+    assert store.get("long") == 1
+    assert store.get("new") == 1
+    assert len(store._data) == 2
+
+
+def test_memory_store_drops_the_soonest_expiring_when_full(clock):
+    store = MemoryStore(max_keys=2)
+    store.incr("long", ttl=600)
+    store.incr("short", ttl=10)
+    store.incr("new", ttl=10)
+    assert store.get("long") == 1
+    assert store.get("short") == 0
+    assert store.get("new") == 1
+
+
+def test_login_is_throttled_per_email(app, db, monkeypatch):
+    monkeypatch.setattr(ratelimit, "limiter", RateLimiter(MemoryStore()))
+    monkeypatch.setattr(ratelimit, "LOGIN_PER_EMAIL", Limit("login-email", 3, 60))
+    client = app.test_client()
+    sign_up(client, "throttled@example.com")       # the first of the 3 logins
+    codes = [client.post("/auth/login", data={"email": "throttled@example.com",
+                                              "password": "wrong"}).status_code
+             for _ in range(2)]
+    resp = client.post("/auth/login", data={"email": "throttled@example.com",
+                                            "password": PASSWORD})
+    assert codes == [302, 302]
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) > 0
@@ -0,0 +1,67 @@
+import io
+
+from app.stats import buckets, rollup
+
+COUNTERS = ("total", "status", "companies", "created_days")
+
+
+def counters(doc):
+    """The counter fields of a rollup, without zeroed-out keys."""
+    return {k: {n: v for n, v in doc[k].items() if v} if isinstance(doc[k], dict) else doc[k]
+            for k in COUNTERS}
+
+
+def assert_in_step(db, user_oid):
+    """The $inc-maintained rollup equals a rebuild from the applications."""
+    incremental = counters(db.user_stats.find_one({"_id": user_oid}))
+    assert incremental == counters(rollup.rebuild_user(db, user_oid))
+
+
+def test_rollup_follows_every_write_path(client, db):
+    ids = [client.post("/api/v1/applications",
+                       json={"company": c, "role": "Dev", "status": s}).json["id"]
+           for c, s in [("Acme", "applied"), ("Acme", "Interview"), ("Globex", "offer"),
+                        ("Initech", "applied")]]
+    assert_in_step(db, client.user_oid)
+
+    client.post(f"/status/{ids[0]}", data={"status": "interviewing"})
+    client.patch(f"/api/v1/applications/{ids[1]}", json={"company": "Globex"})
+    client.post("/bulk", data={"action": "status", "bulk_status": "rejected",
+                               "job_ids": ids[2:]})
+    assert_in_step(db, client.user_oid)
+
+    client.post(f"/delete/{ids[3]}")
+    client.post("/import", data={"file": (io.BytesIO(
+        b"company,role,status,created_at\nHooli,PM,offer,2025-01-02\n"), "jobs.csv")})
+    assert_in_step(db, client.user_oid)
+
+    stats = counters(db.user_stats.find_one({"_id": client.user_oid}))
+    assert stats["total"] == 4
+    assert stats["status"] == {"interviewing": 2, "rejected": 1, "offer": 1}
+    assert stats["companies"] == {"Acme": 1, "Globex": 2, "Hooli": 1}
+
+
+def test_version_goes_up_on_every_write(client, db):
+    job_id = client.post("/api/v1/applications", json={"company": "Acme", "role": "Dev"}).json["id"]
+    before = db.user_stats.find_one({"_id": client.user_oid})["version"]
+    client.patch(f"/api/v1/applications/{job_id}", json={"notes": "only notes"})
+    assert db.user_stats.find_one({"_id": client.user_oid})["version"] == before + 1
+
+
+def test_stale_rollup_is_rebuilt_on_read(client, db):
+    client.post("/api/v1/applications", json={"company": "Acme", "role": "Dev"})
+    db.user_stats.update_one({"_id": client.user_oid}, {"$set": {"total": 99}})
+    rollup.mark_stale(db, client.user_oid)
+    assert rollup.get_rollup(db, client.user_oid)["total"] == 1
+    assert "stale" not in db.user_stats.find_one({"_id": client.user_oid})
+
+
+def test_bucket_rebuild_keeps_counts_and_drops_leftovers(client, db):
+    for c in ("Acme", "Acme", "Globex"):
+        client.post("/api/v1/applications", json={"company": c, "role": "Dev"})
+    kept = list(db.stats_buckets.find({}, {"merged": 0}))
+    db.stats_buckets.insert_one({"_id": f"{client.user_oid}:d:2001-01-01", "u": client.user_oid,
+                                 "g": "d", "total": 5, "status": {}, "companies": {}})
+
+    assert buckets.rebuild_user(db, client.user_oid) == 3
+    assert list(db.stats_buckets.find({}, {"merged": 0})) == kept
@@ -0,0 +1,70 @@
+import csv
+import io
+
+from bson import ObjectId
+
+from app.dashboard.transfer import detect_format, export_csv, import_rows, iter_rows
+
+
+def run_import(db, data: bytes, fmt: str, **kwargs):
+    user_oid = ObjectId()
+    return user_oid, import_rows(db, user_oid, iter_rows(io.BytesIO(data), fmt), **kwargs)
+
+
+def test_csv_row_errors_are_reported_by_line(db):
+    data = (b"Company,Role,Status,Deadline\n"
+            b"Acme,Dev,applied,2026-05-01\n"
+            b"Globex,PM,maybe,\n"
+            b",QA,applied,\n"
+            b"Initech,SRE,offer,next week\n"
+            b"Hooli,Dev,Interview,2026/06/01\n")
+    user_oid, result = run_import(db, data, "csv")
+    assert (result.inserted, result.failed) == (2, 3)
+    assert [line for line, _ in result.errors] == [3, 4, 5]
+    assert result.errors[0][1] == "Invalid status."
+    assert result.errors[1][1] == "Company and role are required."
+    assert "yyyy-mm-dd" in result.errors[2][1]
+    assert sorted(d["status"] for d in db.applications.find({"user_id": user_oid})) \
+        == ["applied", "interviewing"]
+
+
+def test_rows_are_written_in_batches(db):
+    data = b"company,role\n" + b"".join(b"C%d,R\n" % i for i in range(7))
+    user_oid, result = run_import(db, data, "csv", batch_size=3)
+    assert (result.inserted, result.failed) == (7, 0)
+    assert db.user_stats.find_one({"_id": user_oid})["total"] == 7
+
+
+def test_jsonl_bad_lines_dont_stop_the_import(db):
+    data = (b'{"company": "Acme", "role": "Dev"}\n'
+            b"\n"
+            b"{not json\n"
+            b'["a list"]\n'
+            b'{"company": "Globex", "role": "PM", "status": 2}\n'
+            b'{"company": "Hooli", "role": "PM"}\n')
+    _, result = run_import(db, data, "jsonl")
+    assert (result.inserted, result.failed) == (2, 3)
+    assert [line for line, _ in result.errors] == [3, 4, 5]
+    assert result.errors[0][1].startswith("Invalid JSON")
+    assert result.errors[1][1] == "Expected a JSON object."
+
+
+def test_non_utf8_file_stops_with_a_file_error(db):
+    data = "company,role\nSoci\xe9t\xe9,Dev\n".encode("cp1252")
+    _, result = run_import(db, data, "csv")
+    assert result.inserted == 0
+    assert "UTF-8" in result.file_error
+
+
+def test_detect_format():
+    assert detect_format("jobs.JSONL") == "jsonl"
+    assert detect_format("jobs.csv") == detect_format("") == "csv"
+
+
+def test_export_round_trips_through_import(db):
+    data = b"company,role,status,notes\nAcme,Dev,offer,\"multi\nline\"\nGlobex,PM,applied,\n"
+    user_oid, _ = run_import(db, data, "csv")
+    exported = "".join(export_csv(db, user_oid))
+    rows = list(csv.DictReader(io.StringIO(exported)))
+    assert [(r["company"], r["status"]) for r in rows] == [("Acme", "offer"), ("Globex", "applied")]
+    assert rows[0]["notes"] == "multi\nline"